@@ -1,98 +1,67 @@
 import asyncio
+import logging
+import time
 from datetime import timedelta
 
-import openpyxl
 from celery import Celery
 from google_sheets.google_sheets import GoogleSheet
+from project.admin_sources import iter_excel_records, iter_record_batches
+from project.admin_sync_state import (
+    get_data_fingerprint,
+    get_file_stat,
+    is_data_unchanged,
+    is_file_unchanged,
+    record_run,
+    save_file_stat,
+    save_fingerprint,
+)
+from project.config import settings
 from project.database import get_async_redis_client
+from project.prices import refresh_rule_windows
 from project.repository_overal_for_admin_task import (
     DishType,
     MenuType,
+    RecordType,
     SubmenuType,
-    update_dish_data_from_file_to_db,
-    update_menu_data_from_file_to_db,
-    update_submenu_data_from_file_to_db,
+    sync_data_from_file_to_db,
 )
 
 filename = 'project/admin/Menu.xlsx'
+logger = logging.getLogger(__name__)
 loop = asyncio.get_event_loop()
 
 
-async def read_excel_to_data(
-    filename: str,
-) -> dict[str, list[MenuType] | list[SubmenuType] | list[DishType]]:
+async def read_gs_to_data() -> list[RecordType]:
     """
-    Чтение файла Excel и преобразование его в нужный формат данных.
-    """
-    wb = openpyxl.load_workbook(filename)
-    sheet = wb.active
-
-    menus = []
-    submenus = []
-    dishes = []
-
-    last_menu_id = None
-    last_submenu_id = None
-
-    for row in sheet.iter_rows(values_only=True):
-        if row[0] is not None:  # Это меню
-            last_menu_id = str(row[0])
-            menus.append((str(row[0]), str(row[1]), str(row[2])))
-        elif row[1] is not None:  # Это подменю
-            last_submenu_id = str(row[1])
-            submenus.append((last_menu_id, str(row[1]), str(row[2]), str(row[3])))
-        elif row[2] is not None:  # Это блюдо
-            try:
-                discount = row[6]  # Смотрим есть ли столбец скидок
-            except IndexError:
-                discount = None
-            dishes.append(
-                (
-                    last_menu_id,
-                    last_submenu_id,
-                    str(row[2]),
-                    str(row[3]),
-                    str(row[4]),
-                    str(row[5]),
-                    discount,
-                )
-            )
-        else:
-            pass
-    return {'menus': menus, 'submenus': submenus, 'dishes': dishes}
-
-
-async def read_gs_to_data() -> dict[
-    str, list[MenuType] | list[SubmenuType] | list[DishType]
-]:
-    """
-    Чтение файла Google sheet и преобразование его в нужный формат данных.
+    Чтение файла Google sheet и преобразование его в записи меню, подменю
+    и блюд в порядке файла.
     """
     range = 'Test List!A1:G18'
     gs = GoogleSheet()
     values_from_gs = gs.download(range_name=range)
 
-    menus = []
-    submenus = []
-    dishes = []
+    records: list[RecordType] = []
 
-    last_menu_id = None
-    last_submenu_id = None
+    # id родителей последних прочитанных меню и подменю
+    last_menu_id = ''
+    last_submenu_id = ''
 
     for row in values_from_gs:
         if row[0]:  # Это меню
             last_menu_id = str(row[0])
-            menus.append((str(row[0]), str(row[1]), str(row[2])))
+            records.append(MenuType(str(row[0]), str(row[1]), str(row[2])))
         elif row[1]:  # Это подменю
             last_submenu_id = str(row[1])
-            submenus.append((last_menu_id, str(row[1]), str(row[2]), str(row[3])))
+            records.append(
+                SubmenuType(last_menu_id, str(row[1]), str(row[2]), str(row[3]))
+            )
         elif row[2]:  # Это блюдо
             try:
                 discount = float(row[6])  # Смотрим есть ли столбец скидок
             except IndexError:
                 discount = None
-            dishes.append(
-                (
+            records.append(
+                DishType(
                     last_menu_id,
                     last_submenu_id,
                     str(row[2]),
@@ -104,7 +73,7 @@ async def read_gs_to_data() -> dict[
             )
         else:
             pass
-    return {'menus': menus, 'submenus': submenus, 'dishes': dishes}
+    return records
 
 
 celery_app = Celery('admin_task')
@@ -122,23 +91,72 @@ celery_app.conf.update(
             'task': 'admin_task.main',
             'schedule': timedelta(seconds=15),
         },
+        'refresh_discounts': {
+            'task': 'admin_task.refresh_discounts',
+            'schedule': timedelta(seconds=settings.discount_refresh_interval),
+        },
     },
 )
 
 
-async def main_async() -> None:
-    # Закомментировать ненужное и оставить нужный сервис - чтение их exel/google sheets
-    # current_data = await read_excel_to_data(filename=filename)
-    current_data = await read_gs_to_data()
-
+async def main_async() -> dict[str, dict[str, int] | int] | None:
+    """
+    Синхронизирует БД с файлом, если файл изменился с прошлого запуска.
+    Возвращает итог изменений или None, если запуск пропущен.
+    """
+    started = time.perf_counter()
     redis_client = await get_async_redis_client()
-    await redis_client.flushdb()
-    await update_menu_data_from_file_to_db(menus=current_data['menus'])
-    await update_submenu_data_from_file_to_db(submenus=current_data['submenus'])
-    await update_dish_data_from_file_to_db(dishes=current_data['dishes'])
+
+    file_stat = None
+    if settings.admin_sync_source == 'excel':
+        file_stat = get_file_stat(filename)
+        if await is_file_unchanged(redis_client, file_stat):
+            await record_run(redis_client, False, time.perf_counter() - started)
+            return None
+        # файл читается дважды: для отпечатка и для синхронизации,
+        # чтобы не держать его в памяти целиком
+        fingerprint = await asyncio.to_thread(
+            get_data_fingerprint, iter_excel_records(filename)
+        )
+        batches = iter_record_batches(iter_excel_records(filename))
+    else:
+        records = await read_gs_to_data()
+        fingerprint = get_data_fingerprint(records)
+        batches = iter_record_batches(records)
+
+    if await is_data_unchanged(redis_client, fingerprint):
+        if file_stat is not None:
+            await save_file_stat(redis_client, file_stat)
+        await record_run(redis_client, False, time.perf_counter() - started)
+        return None
+
+    change_set = await sync_data_from_file_to_db(redis_client, batches)
+    await save_fingerprint(redis_client, fingerprint, file_stat)
+    await record_run(redis_client, True, time.perf_counter() - started)
+    summary = change_set.summary()
+    logger.info('admin sync applied %s', summary)
+    return summary
 
 
 @celery_app.task
-def main() -> None:
+def main() -> dict[str, dict[str, int] | int] | None:
     result = loop.run_until_complete(main_async())
     return result
+
+
+async def refresh_discounts_async() -> int:
+    """
+    Пересчитывает цены блюд под правилами скидок, срок которых начался
+    или закончился с прошлого запуска. Возвращает число блюд с новой ценой.
+    """
+    redis_client = await get_async_redis_client()
+    paths = await refresh_rule_windows(redis_client)
+    if paths:
+        logger.info('discount windows changed %s dish prices', len(paths))
+    return len(paths)
+
+
+@celery_app.task
+def refresh_discounts() -> int:
+    result = loop.run_until_complete(refresh_discounts_async())
+    return result
@@ -4,7 +4,7 @@ import project.models as models
 from alembic import context
 from project.config import DB_HOST, DB_NAME, DB_PASS, DB_PORT, DB_USER
 from project.database import Base
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config, pool, text
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -72,6 +72,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # триграммный индекс блюд требует расширения pg_trgm; без него на
+        # сервере индекса нет, как и при создании таблиц по моделям
+        if models.is_pg_trgm_available(None, None, connection):
+            connection.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            connection.commit()
         context.configure(connection=connection, target_metadata=target_metadata)
 
         with context.begin_transaction():
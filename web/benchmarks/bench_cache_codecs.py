@@ -0,0 +1,96 @@
+"""
+bench_cache_codecs.py
+----------
+Микробенчмарк кодеков кеша: размер закодированного значения и время
+кодирования/декодирования для типичных значений кеша.
+
+Запуск из каталога web:
+    python -m benchmarks.bench_cache_codecs --dishes 1000
+
+"""
+
+import argparse
+import timeit
+from typing import Any
+
+from project.cache_codecs import CODECS, CacheCodec
+from project.dishes.schemas import DishOutSchema
+from project.menus.schemas import MenuFullListOutSchema, MenuOutSchema
+
+
+def build_values(dishes_total: int) -> dict[str, Any]:
+    dishes = [
+        DishOutSchema(
+            id=f'00000000-0000-0000-0000-{i:012}',
+            title=f'Блюдо {i}',
+            description=f'Описание блюда {i} для проверки размера значения в кеше',
+            price=f'{i % 1000}.50',
+        )
+        for i in range(dishes_total)
+    ]
+    submenus = [
+        {
+            'id': f'submenu-{i}',
+            'title': f'Подменю {i}',
+            'description': 'Описание подменю',
+            'dishes': dishes[i::10],
+        }
+        for i in range(10)
+    ]
+    return {
+        'menu': MenuOutSchema(
+            id='menu-0',
+            title='Меню',
+            description='Описание меню',
+            submenus_count=10,
+            dishes_count=dishes_total,
+        ),
+        'dishes': dishes[:100],
+        'all_menus_whole': MenuFullListOutSchema(
+            menus=[
+                {
+                    'id': 'menu-0',
+                    'title': 'Меню',
+                    'description': 'Описание меню',
+                    'submenus': submenus,
+                }
+            ]
+        ),
+    }
+
+
+def main(dishes_total: int, number: int) -> None:
+    values = build_values(dishes_total)
+    print(
+        f'{"value":>16} {"codec":>8} {"zlib":>5} {"bytes":>9}'
+        f' {"encode, us":>11} {"decode, us":>11}'
+    )
+    for value_name, value in values.items():
+        for codec_name in CODECS:
+            for compress_min_size in (0, 1):
+                cache_codec = CacheCodec(
+                    codec=codec_name,
+                    schema_version='1',
+                    compress_min_size=compress_min_size,
+                )
+                raw = cache_codec.encode(value)
+                encode_time = timeit.timeit(
+                    lambda: cache_codec.encode(value), number=number
+                )
+                decode_time = timeit.timeit(
+                    lambda: cache_codec.decode(raw), number=number
+                )
+                print(
+                    f'{value_name:>16} {codec_name:>8}'
+                    f' {"yes" if compress_min_size else "no":>5} {len(raw):>9}'
+                    f' {encode_time / number * 1e6:>11.1f}'
+                    f' {decode_time / number * 1e6:>11.1f}'
+                )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dishes', type=int, default=1000)
+    parser.add_argument('--number', type=int, default=200)
+    args = parser.parse_args()
+    main(dishes_total=args.dishes, number=args.number)
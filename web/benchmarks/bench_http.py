@@ -0,0 +1,464 @@
+"""
+bench_http.py
+----------
+Нагрузочный бенчмарк HTTP API: пропускная способность (RPS) и задержки
+p50/p95/p99 каждого маршрута меню, подменю и блюд, включая /menus/whole/,
+при смешанной нагрузке чтения и записи.
+
+Для каждого размера каталога в базу из .env добавляются тестовые меню
+(как в bench_menus_whole), затем для каждого уровня конкурентности
+выполняются два замера по --requests запросов:
+    cold - перед замером redis и кеш первого уровня очищаются, кеш
+           заполняется самой нагрузкой;
+    warm - перед замером каждый читающий маршрут запрашивается для всех
+           объектов каталога, кеш прогрет.
+Маршрут каждого запроса выбирается случайно по весам WORKLOAD, доля
+записей задается --write-ratio. Созданные нагрузкой блюда удаляются
+вместе с тестовыми меню после замеров.
+
+Запросы идут в project.main:app в том же процессе через ASGI, без сети,
+или в запущенный сервер по --base-url (его кеш первого уровня бенчмарк не
+очищает). Нужны запущенные postgres и redis; redis очищается перед
+каждым cold-замером, поэтому бенчмарк запускается на отдельных базах.
+
+Результаты печатаются таблицей и сохраняются в JSON (--output);
+--compare печатает изменение RPS и p95 относительно сохраненного запуска.
+
+Запуск из каталога web:
+    python -m benchmarks.bench_http --sizes 100 10000 --concurrency 1 16 64 \\
+        --requests 2000 --output bench_http.json --compare bench_http_old.json
+
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, NamedTuple
+
+from httpx import AsyncClient
+from sqlalchemy import delete
+
+from benchmarks.bench_menus_whole import build_catalog, seed
+from project.cache_local import local_cache
+from project.config import settings
+from project.counters import recount_counters
+from project.database import (
+    Base,
+    async_session,
+    close_redis_pool,
+    engine,
+    get_async_redis_client,
+)
+from project.main import app
+from project.models import Menu
+
+API_PREFIX = '/api/v1'
+WHOLE_URL = f'{API_PREFIX}/menus/whole/'
+PHASES = ('cold', 'warm')
+WARMUP_CONCURRENCY = 16
+
+# запрос маршрута: метод, url и тело
+RequestType = tuple[str, str, dict[str, Any] | None]
+
+
+@dataclass
+class Catalog:
+    """Пути объектов тестового каталога, к которым обращается нагрузка"""
+
+    menus: list[tuple[str]]
+    submenus: list[tuple[str, str]]
+    dishes: list[tuple[str, str, str]]
+    # блюда, созданные нагрузкой, их удаляет DELETE-маршрут
+    created: list[tuple[str, str, str]] = field(default_factory=list)
+
+    @classmethod
+    def from_rows(cls, rows: dict[str, list[dict[str, Any]]]) -> 'Catalog':
+        submenu_menu = {row['id']: row['menu_id'] for row in rows['submenus']}
+        return cls(
+            menus=[(row['id'],) for row in rows['menus']],
+            submenus=[(row['menu_id'], row['id']) for row in rows['submenus']],
+            dishes=[
+                (submenu_menu[row['submenu_id']], row['submenu_id'], row['id'])
+                for row in rows['dishes']
+            ],
+        )
+
+
+def menus_url(*ids: str) -> str:
+    """url объекта по пути (меню, подменю, блюдо), без пути - списка меню"""
+    parts = [API_PREFIX]
+    for name, entity_id in zip(('menus', 'submenus', 'dishes'), ids):
+        parts += [name, entity_id]
+    return '/'.join(parts) if ids else f'{API_PREFIX}/menus'
+
+
+def get_dish_body(rng: random.Random) -> dict[str, str]:
+    return {
+        'title': f'bench dish {rng.randrange(10**6)}',
+        'description': 'bench dish description',
+        'price': f'{rng.randrange(1, 1000)}.{rng.randrange(100):02}',
+    }
+
+
+def get_title_body(rng: random.Random) -> dict[str, str]:
+    return {'title': f'bench {rng.randrange(10**6)}', 'description': 'bench'}
+
+
+def post_dish(catalog: Catalog, rng: random.Random) -> RequestType:
+    menu_id, submenu_id = rng.choice(catalog.submenus)
+    return 'POST', menus_url(menu_id, submenu_id) + '/dishes', get_dish_body(rng)
+
+
+def delete_dish(catalog: Catalog, rng: random.Random) -> RequestType:
+    """удаляет блюдо, созданное нагрузкой; пока их нет - создает блюдо"""
+    if not catalog.created:
+        return post_dish(catalog, rng)
+    path = catalog.created.pop(rng.randrange(len(catalog.created)))
+    return 'DELETE', menus_url(*path), None
+
+
+class Operation(NamedTuple):
+    route: str
+    weight: float
+    is_write: bool
+    build: Callable[[Catalog, random.Random], RequestType]
+
+
+WORKLOAD = [
+    Operation('GET /menus', 10, False, lambda c, r: ('GET', menus_url(), None)),
+    Operation(
+        'GET /menus/{id}',
+        10,
+        False,
+        lambda c, r: ('GET', menus_url(*r.choice(c.menus)), None),
+    ),
+    Operation(
+        'GET /submenus',
+        10,
+        False,
+        lambda c, r: ('GET', menus_url(*r.choice(c.menus)) + '/submenus', None),
+    ),
+    Operation(
+        'GET /submenus/{id}',
+        10,
+        False,
+        lambda c, r: ('GET', menus_url(*r.choice(c.submenus)), None),
+    ),
+    Operation(
+        'GET /dishes',
+        15,
+        False,
+        lambda c, r: ('GET', menus_url(*r.choice(c.submenus)) + '/dishes', None),
+    ),
+    Operation(
+        'GET /dishes/{id}',
+        25,
+        False,
+        lambda c, r: ('GET', menus_url(*r.choice(c.dishes)), None),
+    ),
+    Operation(
+        'GET /menus/whole/',
+        2,
+        False,
+        lambda c, r: ('GET', WHOLE_URL, None),
+    ),
+    Operation(
+        'PATCH /menus/{id}',
+        1,
+        True,
+        lambda c, r: ('PATCH', menus_url(*r.choice(c.menus)), get_title_body(r)),
+    ),
+    Operation(
+        'PATCH /submenus/{id}',
+        1,
+        True,
+        lambda c, r: ('PATCH', menus_url(*r.choice(c.submenus)), get_title_body(r)),
+    ),
+    Operation(
+        'PATCH /dishes/{id}',
+        4,
+        True,
+        lambda c, r: ('PATCH', menus_url(*r.choice(c.dishes)), get_dish_body(r)),
+    ),
+    Operation('POST /dishes', 2, True, post_dish),
+    Operation('DELETE /dishes/{id}', 2, True, delete_dish),
+]
+
+
+def get_weights(write_ratio: float) -> list[float]:
+    """веса WORKLOAD, у которых доля записей равна write_ratio"""
+    reads = sum(op.weight for op in WORKLOAD if not op.is_write)
+    writes = sum(op.weight for op in WORKLOAD if op.is_write)
+    return [
+        op.weight * (write_ratio / writes if op.is_write else (1 - write_ratio) / reads)
+        for op in WORKLOAD
+    ]
+
+
+def get_percentiles(timings: list[float]) -> dict[str, float | None]:
+    if len(timings) < 2:
+        value = timings[0] if timings else None
+        return {'p50_ms': value, 'p95_ms': value, 'p99_ms': value}
+    quantiles = statistics.quantiles(timings, n=100, method='inclusive')
+    return {
+        'p50_ms': quantiles[49],
+        'p95_ms': quantiles[94],
+        'p99_ms': quantiles[98],
+    }
+
+
+def summarize(
+    timings: dict[str, list[float]], errors: dict[str, int], seconds: float
+) -> dict[str, Any]:
+    def route_summary(route_timings: list[float], route_errors: int) -> dict:
+        return {
+            'requests': len(route_timings) + route_errors,
+            'errors': route_errors,
+            'rps': (len(route_timings) + route_errors) / seconds,
+            **get_percentiles(route_timings),
+        }
+
+    routes = sorted(set(timings) | set(errors))
+    return {
+        'seconds': seconds,
+        'total': route_summary(
+            [timing for route in routes for timing in timings[route]],
+            sum(errors.values()),
+        ),
+        'routes': {
+            route: route_summary(timings[route], errors[route]) for route in routes
+        },
+    }
+
+
+async def run_phase(
+    client: AsyncClient,
+    catalog: Catalog,
+    weights: list[float],
+    requests_total: int,
+    concurrency: int,
+    rng: random.Random,
+) -> dict[str, Any]:
+    """
+    Выполняет requests_total запросов в concurrency параллельных потоков.
+    Задержки ответов с ошибкой не попадают в перцентили
+    """
+    timings = defaultdict(list)
+    errors: defaultdict[str, int] = defaultdict(int)
+    remaining = requests_total
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            operation = rng.choices(WORKLOAD, weights)[0]
+            method, url, body = operation.build(catalog, rng)
+            # блюд для удаления еще нет - запрос записывается как POST
+            route = 'POST /dishes' if method == 'POST' else operation.route
+            started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code >= 400:
+                errors[route] += 1
+                continue
+            timings[route].append(elapsed)
+            if method == 'POST':
+                path = url.removeprefix(API_PREFIX).split('/')
+                catalog.created.append((path[2], path[4], response.json()['id']))
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(timings, errors, time.perf_counter() - started)
+
+
+async def warm_up(client: AsyncClient, catalog: Catalog) -> None:
+    """запрашивает все читающие маршруты для всех объектов каталога"""
+    urls = [menus_url(), WHOLE_URL]
+    urls += [menus_url(*path) for path in catalog.menus]
+    urls += [menus_url(*path) + '/submenus' for path in catalog.menus]
+    urls += [menus_url(*path) for path in catalog.submenus]
+    urls += [menus_url(*path) + '/dishes' for path in catalog.submenus]
+    urls += [menus_url(*path) for path in catalog.dishes]
+    semaphore = asyncio.Semaphore(WARMUP_CONCURRENCY)
+
+    async def get(url: str) -> None:
+        async with semaphore:
+            await client.get(url)
+
+    await asyncio.gather(*[get(url) for url in urls])
+
+
+async def clear_cache(in_process: bool) -> None:
+    redis_client = await get_async_redis_client()
+    await redis_client.flushdb()
+    if in_process:
+        local_cache.clear()
+
+
+def get_git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_run(run: dict[str, Any]) -> None:
+    print(
+        f'\ndishes={run["size"]} concurrency={run["concurrency"]}'
+        f' phase={run["phase"]} seconds={run["seconds"]:.2f}'
+    )
+    print(
+        f'{"route":<22} {"requests":>8} {"errors":>6} {"rps":>9}'
+        f' {"p50, ms":>8} {"p95, ms":>8} {"p99, ms":>8}'
+    )
+    for route, result in [*run['routes'].items(), ('total', run['total'])]:
+        if result['p50_ms'] is None:
+            latencies = f'{"-":>8} {"-":>8} {"-":>8}'
+        else:
+            latencies = (
+                f'{result["p50_ms"]:>8.1f} {result["p95_ms"]:>8.1f}'
+                f' {result["p99_ms"]:>8.1f}'
+            )
+        print(
+            f'{route:<22} {result["requests"]:>8} {result["errors"]:>6}'
+            f' {result["rps"]:>9.1f} {latencies}'
+        )
+
+
+def get_change(old: float | None, new: float | None) -> str:
+    if not old or new is None:
+        return '-'
+    return f'{(new - old) / old * 100:+.1f}%'
+
+
+def print_comparison(old_report: dict[str, Any], report: dict[str, Any]) -> None:
+    """изменение RPS и p95 запусков с одинаковым размером, конкурентностью и фазой"""
+    old_runs = {
+        (run['size'], run['concurrency'], run['phase']): run
+        for run in old_report['runs']
+    }
+    print(f'\ncompared with {old_report["meta"].get("git_commit")}')
+    print(f'{"run":<24} {"route":<22} {"rps":>9} {"p95":>9}')
+    for run in report['runs']:
+        old_run = old_runs.get((run['size'], run['concurrency'], run['phase']))
+        if old_run is None:
+            continue
+        name = f'{run["size"]}/{run["concurrency"]}/{run["phase"]}'
+        for route, result in [*run['routes'].items(), ('total', run['total'])]:
+            old_result = (
+                old_run['total'] if route == 'total' else old_run['routes'].get(route)
+            )
+            if old_result is None:
+                continue
+            print(
+                f'{name:<24} {route:<22}'
+                f' {get_change(old_result["rps"], result["rps"]):>9}'
+                f' {get_change(old_result["p95_ms"], result["p95_ms"]):>9}'
+            )
+
+
+async def bench_size(
+    client: AsyncClient, size: int, args: argparse.Namespace, rng: random.Random
+) -> list[dict[str, Any]]:
+    rows = build_catalog(size)
+    async with async_session() as session:
+        await seed(session, rows)
+        await recount_counters(session, menu_ids=[row['id'] for row in rows['menus']])
+        await session.commit()
+    catalog = Catalog.from_rows(rows)
+    weights = get_weights(args.write_ratio)
+    runs = []
+    try:
+        for concurrency in args.concurrency:
+            for phase in PHASES:
+                if phase == 'cold':
+                    await clear_cache(in_process=args.base_url is None)
+                else:
+                    await warm_up(client, catalog)
+                result = await run_phase(
+                    client, catalog, weights, args.requests, concurrency, rng
+                )
+                run = {
+                    'size': size,
+                    'concurrency': concurrency,
+                    'phase': phase,
+                    **result,
+                }
+                print_run(run)
+                runs.append(run)
+    finally:
+        async with async_session() as session:
+            menu_ids = [row['id'] for row in rows['menus']]
+            await session.execute(delete(Menu).where(Menu.id.in_(menu_ids)))
+            await session.commit()
+    return runs
+
+
+async def main(args: argparse.Namespace) -> None:
+    # sql-лог движка (echo) в замерах в том же процессе мерил бы логирование
+    engine.sync_engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    rng = random.Random(args.seed)
+    report: dict[str, Any] = {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'git_commit': get_git_commit(),
+            'target': args.base_url or 'asgi',
+            'requests': args.requests,
+            'write_ratio': args.write_ratio,
+            'seed': args.seed,
+            'settings': {
+                'menus_whole_mode': settings.menus_whole_mode,
+                'cache_codec': settings.cache_codec,
+                'cache_l1_enabled': settings.cache_l1_enabled,
+                'page_size': settings.page_size,
+            },
+        },
+        'runs': [],
+    }
+    client = (
+        AsyncClient(base_url=args.base_url, timeout=None)
+        if args.base_url
+        else AsyncClient(app=app, base_url='http://bench', timeout=None)
+    )
+    async with client:
+        for size in args.sizes:
+            report['runs'] += await bench_size(client, size, args, rng)
+    await engine.dispose()
+    await close_redis_pool()
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f'\nresults saved to {args.output}')
+    if args.compare:
+        with open(args.compare) as old_output:
+            print_comparison(json.load(old_output), report)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 10000])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--base-url', default=None)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--compare', default=None)
+    asyncio.run(main(parser.parse_args()))
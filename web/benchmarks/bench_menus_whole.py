@@ -0,0 +1,125 @@
+"""
+bench_menus_whole.py
+----------
+Сравнение сборки дерева /menus/whole/ в python (orm) и в postgres (sql).
+
+Для каждого размера каталога в базу из .env добавляются тестовые меню,
+оба способа выполняются несколько раз, после замера тестовые меню удаляются.
+Нужны запущенные postgres и redis.
+
+Запуск из каталога web:
+    python -m benchmarks.bench_menus_whole --sizes 10 1000 100000 --repeat 5
+
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from project.config import settings
+from project.database import Base
+from project.menus.repository import MenuRepository
+from project.models import Dish, Menu, Submenu
+
+INSERT_CHUNK_SIZE = 5000
+
+
+def build_catalog(dishes_total: int) -> dict[str, list[dict[str, Any]]]:
+    submenus_total = max(1, min(100, dishes_total // 10))
+    menus_total = max(1, min(10, submenus_total // 10))
+    menus = [
+        {'id': str(uuid.uuid4()), 'title': f'bench menu {i}', 'description': 'bench'}
+        for i in range(menus_total)
+    ]
+    submenus = [
+        {
+            'id': str(uuid.uuid4()),
+            'title': f'bench submenu {i}',
+            'description': 'bench',
+            'menu_id': menus[i % menus_total]['id'],
+        }
+        for i in range(submenus_total)
+    ]
+    dishes = [
+        {
+            'id': str(uuid.uuid4()),
+            'title': f'bench dish {i}',
+            'description': 'bench dish description',
+            'price': f'{i % 1000}.50',
+            'submenu_id': submenus[i % submenus_total]['id'],
+        }
+        for i in range(dishes_total)
+    ]
+    return {'menus': menus, 'submenus': submenus, 'dishes': dishes}
+
+
+async def seed(session: AsyncSession, catalog: dict[str, list[dict[str, Any]]]) -> None:
+    for model, rows in (
+        (Menu, catalog['menus']),
+        (Submenu, catalog['submenus']),
+        (Dish, catalog['dishes']),
+    ):
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            end = start + INSERT_CHUNK_SIZE
+            await session.execute(insert(model), rows[start:end])
+    await session.commit()
+
+
+async def measure(func: Callable[[], Awaitable[Any]], repeat: int) -> dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'min_ms': min(timings), 'median_ms': statistics.median(timings)}
+
+
+async def main(sizes: list[int], repeat: int) -> None:
+    engine = create_async_engine(settings.url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    print(f'{"dishes":>8} {"mode":>5} {"min, ms":>10} {"median, ms":>11}')
+    for size in sizes:
+        catalog = build_catalog(size)
+        async with session_factory() as session:
+            await seed(session, catalog)
+        try:
+            for mode in ('orm', 'sql'):
+                async with session_factory() as session:
+                    repository = MenuRepository(db=session)
+                    read = (
+                        repository.read_menus_whole
+                        if mode == 'orm'
+                        else repository.read_menus_whole_sql
+                    )
+                    result = await measure(read, repeat)
+                print(
+                    f'{size:>8} {mode:>5} {result["min_ms"]:>10.1f}'
+                    f' {result["median_ms"]:>11.1f}'
+                )
+        finally:
+            async with session_factory() as session:
+                menu_ids = [menu['id'] for menu in catalog['menus']]
+                await session.execute(delete(Menu).where(Menu.id.in_(menu_ids)))
+                await session.commit()
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(sizes=args.sizes, repeat=args.repeat))
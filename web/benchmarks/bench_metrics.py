@@ -0,0 +1,122 @@
+"""
+bench_metrics.py
+----------
+Микробенчмарк накладных расходов метрик: время запроса к минимальному
+приложению starlette с MetricsMiddleware и без нее, стоимость учета одного
+sql-запроса хуками движка и время отдачи /metrics.
+
+Запросы отправляются прямо в ASGI-приложение, без сети и http-клиента,
+поэтому разница времени - это расходы самой middleware.
+
+Запуск из каталога web:
+    python -m benchmarks.bench_metrics --requests 20000 --repeat 10
+
+"""
+
+import argparse
+import asyncio
+import time
+import timeit
+from types import SimpleNamespace
+from typing import Any
+
+from project.metrics import (
+    MetricsMiddleware,
+    RequestMetrics,
+    RequestTimings,
+    current_timings,
+    on_after_cursor_execute,
+    on_before_cursor_execute,
+    render_metrics,
+)
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.types import ASGIApp, Message
+
+
+async def get_item(request: Request) -> PlainTextResponse:
+    return PlainTextResponse('ok')
+
+
+def build_app(metrics: RequestMetrics | None) -> ASGIApp:
+    middleware = []
+    if metrics is not None:
+        middleware.append(Middleware(MetricsMiddleware, metrics=metrics))
+    return Starlette(
+        routes=[Route('/items/{item_id}', get_item)], middleware=middleware
+    )
+
+
+async def run_requests(app: ASGIApp, requests_total: int) -> float:
+    """секунд на запрос при requests_total запросах подряд"""
+
+    async def receive() -> Message:
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: Message) -> None:
+        pass
+
+    started = time.perf_counter()
+    for i in range(requests_total):
+        scope: dict[str, Any] = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': f'/items/{i % 100}',
+            'raw_path': f'/items/{i % 100}'.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [],
+            'client': ('127.0.0.1', 1),
+            'server': ('127.0.0.1', 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / requests_total
+
+
+def measure_query_hooks(number: int) -> float:
+    """секунд на учет одного sql-запроса внутри запроса к API"""
+    connection = SimpleNamespace(info={})
+    token = current_timings.set(RequestTimings())
+
+    def run_hooks() -> None:
+        on_before_cursor_execute(connection, None, 'SELECT 1')
+        on_after_cursor_execute(connection)
+
+    try:
+        return timeit.timeit(run_hooks, number=number) / number
+    finally:
+        current_timings.reset(token)
+
+
+async def main(requests_total: int, repeat: int) -> None:
+    metrics = RequestMetrics()
+    plain_app, metrics_app = build_app(None), build_app(metrics)
+    # прогрев: импорты, кеш маршрутов middleware
+    await run_requests(plain_app, 1000)
+    await run_requests(metrics_app, 1000)
+    # прогоны без метрик и с ними чередуются, чтобы шум машины влиял на оба
+    plain_runs, metrics_runs = [], []
+    for _ in range(repeat):
+        plain_runs.append(await run_requests(plain_app, requests_total))
+        metrics_runs.append(await run_requests(metrics_app, requests_total))
+    plain, with_metrics = min(plain_runs), min(metrics_runs)
+    print(f'request without metrics: {plain * 1e6:8.2f} us')
+    print(f'request with metrics:    {with_metrics * 1e6:8.2f} us')
+    print(f'middleware overhead:     {(with_metrics - plain) * 1e6:8.2f} us')
+    print(f'sql query hooks:         {measure_query_hooks(100000) * 1e6:8.2f} us')
+    render_time = timeit.timeit(lambda: render_metrics(metrics), number=100) / 100
+    print(f'render /metrics:         {render_time * 1e6:8.2f} us')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(requests_total=args.requests, repeat=args.repeat))
@@ -0,0 +1,386 @@
+"""
+gen_catalog.py
+----------
+Генератор синтетических каталогов для проверки запросов на больших данных.
+
+Каталог - menus меню, в среднем submenus подменю на меню и dishes блюд на
+подменю. При skew > 0 размеры неравные: подменю и блюда делятся с весами
+1/rank**skew, часть меню и подменю получает большую долю. discount_ratio
+блюд получают скидку из столбца скидок файла. Один и тот же seed дает
+тот же каталог с теми же id, поэтому каталог можно воспроизвести и удалить
+по параметрам генерации.
+
+Каталог отдается записями админской синхронизации (MenuType, SubmenuType,
+DishType) в порядке файла и может быть:
+    загружен в postgres через COPY вместе со счетчиками, скидками и ценами
+    со скидкой - миллион блюд загружается за десятки секунд, большую часть
+    времени занимает обновление индексов блюд;
+    записан файлом Excel в формате Menu.xlsx;
+    записан JSON-списком строк в формате Google Sheets.
+
+Запуск из каталога web:
+    python -m benchmarks.gen_catalog --menus 100 --submenus 10 --dishes 1000 \\
+        --skew 1 --discount-ratio 0.1 --db --excel Menu.xlsx --sheet rows.json
+    python -m benchmarks.gen_catalog --menus 100 --submenus 10 --dishes 1000 \\
+        --skew 1 --discount-ratio 0.1 --delete
+
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import permutations
+from typing import Any, Iterator
+
+import openpyxl
+from project.database import Base, async_session, engine
+from project.models import DiscountRule, Dish, Menu, Submenu
+from project.prices import refresh_effective_prices
+from project.repository_overal_for_admin_task import (
+    DishType,
+    MenuType,
+    RecordType,
+    SubmenuType,
+)
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DISH_NAMES = [
+    'Борщ',
+    'Солянка',
+    'Уха',
+    'Салат',
+    'Пельмени',
+    'Вареники',
+    'Блины',
+    'Плов',
+    'Котлета',
+    'Стейк',
+    'Паста',
+    'Пицца',
+    'Шашлык',
+    'Сырники',
+    'Запеканка',
+]
+DESCRIPTION_WORDS = [
+    'домашний',
+    'острый',
+    'сливочный',
+    'с грибами',
+    'с говядиной',
+    'с курицей',
+    'с зеленью',
+    'на углях',
+    'по-деревенски',
+    'с соусом',
+    'из печи',
+    'со сметаной',
+]
+DISCOUNTS = [5, 10, 15, 20, 25, 30, 50]
+# описания и цены блюд выбираются из готовых списков одним случайным числом,
+# генерация блюда - основная часть времени загрузки большого каталога
+DESCRIPTIONS = [
+    ', '.join(words)
+    for length in (1, 2, 3)
+    for words in permutations(DESCRIPTION_WORDS, length)
+]
+PRICES = [
+    f'{rubles}.{kopecks}'
+    for rubles in range(50, 2001)
+    for kopecks in ('00', '50', '90', '99')
+]
+
+
+@dataclass(frozen=True)
+class CatalogSpec:
+    """
+    Параметры генерации каталога
+
+    Parameters
+    ----------
+    menus: int
+        количество меню
+    submenus: int
+        среднее количество подменю в меню
+    dishes: int
+        среднее количество блюд в подменю
+    skew: float
+        неравномерность размеров меню и подменю, 0 - все одного размера
+    discount_ratio: float
+        доля блюд со скидкой из файла
+    seed: int
+        зерно генератора случайных чисел
+    """
+
+    menus: int
+    submenus: int
+    dishes: int
+    skew: float = 0.0
+    discount_ratio: float = 0.0
+    seed: int = 0
+
+
+def allocate(total: int, parts: int, skew: float, rng: random.Random) -> list[int]:
+    """
+    Делит total на parts частей с весами 1/rank**skew в случайном порядке.
+    Сумма частей ровно total, остаток деления получают части с наибольшей
+    дробной долей
+    """
+    if parts == 0:
+        return []
+    weights = [1 / (rank + 1) ** skew for rank in range(parts)]
+    rng.shuffle(weights)
+    shares = [weight * total / sum(weights) for weight in weights]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(
+        range(parts), key=lambda i: shares[i] - counts[i], reverse=True
+    )
+    for i in by_remainder[: total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def generate_id(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+class SyntheticCatalog:
+    """
+    Детерминированный каталог. Меню и подменю хранятся в памяти, блюда
+    каждого подменю генерируются заново при обходе из собственного зерна,
+    поэтому каталог с миллионом блюд не держится в памяти целиком
+    """
+
+    def __init__(self, spec: CatalogSpec) -> None:
+        self.spec = spec
+        rng = random.Random(spec.seed)
+        self.menus = [
+            MenuType(generate_id(rng), f'Меню {i}', f'Описание меню {i}')
+            for i in range(spec.menus)
+        ]
+        submenu_counts = allocate(
+            spec.menus * spec.submenus, spec.menus, spec.skew, rng
+        )
+        self.submenus: dict[str, list[SubmenuType]] = {}
+        for menu, submenus_total in zip(self.menus, submenu_counts):
+            self.submenus[menu.id] = [
+                SubmenuType(
+                    menu.id,
+                    generate_id(rng),
+                    f'{menu.title}, подменю {j}',
+                    f'Описание подменю {j}',
+                )
+                for j in range(submenus_total)
+            ]
+        all_submenus = [s for submenus in self.submenus.values() for s in submenus]
+        self.dish_counts = dict(
+            zip(
+                [submenu.id for submenu in all_submenus],
+                allocate(
+                    spec.menus * spec.submenus * spec.dishes,
+                    len(all_submenus),
+                    spec.skew,
+                    rng,
+                ),
+            )
+        )
+
+    def iter_dishes(self, submenu: SubmenuType) -> Iterator[DishType]:
+        rng = random.Random(f'{self.spec.seed}/{submenu.id}')
+        for k in range(self.dish_counts[submenu.id]):
+            bits = rng.getrandbits(64)
+            is_discounted = rng.random() < self.spec.discount_ratio
+            yield DishType(
+                submenu.menu_id,
+                submenu.id,
+                generate_id(rng),
+                f'{DISH_NAMES[bits % len(DISH_NAMES)]} {k}',
+                DESCRIPTIONS[(bits >> 8) % len(DESCRIPTIONS)],
+                PRICES[(bits >> 24) % len(PRICES)],
+                DISCOUNTS[(bits >> 48) % len(DISCOUNTS)] if is_discounted else None,
+            )
+
+    def iter_records(self) -> Iterator[RecordType]:
+        """записи в порядке файла: меню, его подменю, блюда подменю"""
+        for menu in self.menus:
+            yield menu
+            for submenu in self.submenus[menu.id]:
+                yield submenu
+                yield from self.iter_dishes(submenu)
+
+    def iter_excel_rows(self) -> Iterator[list[Any]]:
+        """строки в формате Menu.xlsx: уровень записи задает первый непустой столбец"""
+        for record in self.iter_records():
+            if isinstance(record, MenuType):
+                yield [record.id, record.title, record.description]
+            elif isinstance(record, SubmenuType):
+                yield [None, record.id, record.title, record.description]
+            else:
+                row: list[Any] = [None, None, *record[2:6]]
+                yield row if record.discount is None else [*row, record.discount]
+
+    def iter_sheet_rows(self) -> Iterator[list[str]]:
+        """строки в формате Google Sheets API: все значения строки, пустые - ''"""
+        for row in self.iter_excel_rows():
+            yield ['' if value is None else str(value) for value in row]
+
+    def write_excel(self, filename: str) -> None:
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet()
+        for row in self.iter_excel_rows():
+            ws.append(row)
+        wb.save(filename)
+
+    def write_sheet_rows(self, filename: str) -> None:
+        """JSON-список строк, записывается построчно"""
+        with open(filename, 'w') as output:
+            output.write('[')
+            for i, row in enumerate(self.iter_sheet_rows()):
+                output.write(
+                    (',\n' if i else '\n') + json.dumps(row, ensure_ascii=False)
+                )
+            output.write('\n]\n')
+
+    def menu_ids(self) -> list[str]:
+        return [menu.id for menu in self.menus]
+
+
+async def copy_catalog(session: AsyncSession, catalog: SyntheticCatalog) -> None:
+    """
+    Загружает каталог в транзакции сессии через COPY с готовыми счетчиками
+    и скидками из файла, затем пересчитывает цены со скидкой
+    """
+    # запрос через сессию открывает ее транзакцию: COPY через соединение
+    # драйвера идет мимо sqlalchemy и без открытой транзакции применился бы
+    # сразу, не дожидаясь commit
+    loaded = (
+        await session.execute(
+            select(func.count()).where(Menu.id.in_(catalog.menu_ids()))
+        )
+    ).scalar_one()
+    if loaded:
+        raise ValueError('catalog is already loaded, delete it first')
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver = raw_connection.driver_connection
+    assert driver is not None
+    all_submenus = [s for submenus in catalog.submenus.values() for s in submenus]
+    await driver.copy_records_to_table(
+        Menu.__tablename__,
+        columns=['id', 'title', 'description', 'submenus_count', 'dishes_count'],
+        records=[
+            (
+                menu.id,
+                menu.title,
+                menu.description,
+                len(catalog.submenus[menu.id]),
+                sum(catalog.dish_counts[s.id] for s in catalog.submenus[menu.id]),
+            )
+            for menu in catalog.menus
+        ],
+    )
+    await driver.copy_records_to_table(
+        Submenu.__tablename__,
+        columns=['menu_id', 'id', 'title', 'description', 'dishes_count'],
+        records=[
+            (*submenu, catalog.dish_counts[submenu.id]) for submenu in all_submenus
+        ],
+    )
+    discounts = []
+
+    def iter_dish_rows() -> Iterator[tuple]:
+        for submenu in all_submenus:
+            for dish in catalog.iter_dishes(submenu):
+                if dish.discount is not None:
+                    discounts.append((dish.id, dish.discount))
+                yield (
+                    dish.id,
+                    dish.submenu_id,
+                    dish.title,
+                    dish.description,
+                    Decimal(dish.price),
+                )
+
+    await driver.copy_records_to_table(
+        Dish.__tablename__,
+        columns=['id', 'submenu_id', 'title', 'description', 'price'],
+        records=iter_dish_rows(),
+    )
+    rng = random.Random(f'{catalog.spec.seed}/discounts')
+    await driver.copy_records_to_table(
+        DiscountRule.__tablename__,
+        columns=['id', 'dish_id', 'percent', 'from_sheet'],
+        records=[
+            (generate_id(rng), dish_id, Decimal(percent), True)
+            for dish_id, percent in discounts
+        ],
+    )
+    if discounts:
+        await refresh_effective_prices(
+            session, dish_ids=[dish_id for dish_id, _ in discounts]
+        )
+
+
+async def load_catalog(catalog: SyntheticCatalog) -> None:
+    async with async_session() as session:
+        await copy_catalog(session, catalog)
+        await session.commit()
+
+
+async def delete_catalog(catalog: SyntheticCatalog) -> None:
+    """удаляет меню каталога, подменю, блюда и скидки удаляются каскадно"""
+    async with async_session() as session:
+        await session.execute(delete(Menu).where(Menu.id.in_(catalog.menu_ids())))
+        await session.commit()
+
+
+async def main(args: argparse.Namespace) -> None:
+    # sql-лог движка (echo) на миллионе строк занял бы больше самой загрузки
+    engine.sync_engine.echo = False
+    catalog = SyntheticCatalog(
+        CatalogSpec(
+            menus=args.menus,
+            submenus=args.submenus,
+            dishes=args.dishes,
+            skew=args.skew,
+            discount_ratio=args.discount_ratio,
+            seed=args.seed,
+        )
+    )
+    if args.delete:
+        await delete_catalog(catalog)
+    if args.db:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        started = time.perf_counter()
+        await load_catalog(catalog)
+        print(f'loaded into postgres in {time.perf_counter() - started:.1f} s')
+    if args.excel:
+        catalog.write_excel(args.excel)
+        print(f'excel written to {args.excel}')
+    if args.sheet:
+        catalog.write_sheet_rows(args.sheet)
+        print(f'sheet rows written to {args.sheet}')
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--menus', type=int, default=10)
+    parser.add_argument('--submenus', type=int, default=10)
+    parser.add_argument('--dishes', type=int, default=10)
+    parser.add_argument('--skew', type=float, default=0.0)
+    parser.add_argument('--discount-ratio', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', action='store_true', help='загрузить в postgres')
+    parser.add_argument('--delete', action='store_true', help='удалить из postgres')
+    parser.add_argument('--excel', default=None, help='записать файл Excel')
+    parser.add_argument('--sheet', default=None, help='записать строки Google Sheets')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,74 @@
+"""
+admin_sources.py
+----------
+Модуль читает меню, подменю и блюда из файла Excel для админской
+синхронизации.
+
+Файл читается openpyxl в режиме read_only построчно: записи отдаются
+генератором, а пачки записей собираются в отдельном потоке, чтобы чтение
+не блокировало цикл событий и в памяти не было всего файла целиком.
+
+"""
+
+import asyncio
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator
+
+import openpyxl
+
+from .config import settings
+from .repository_overal_for_admin_task import (
+    DishType,
+    MenuType,
+    RecordType,
+    SubmenuType,
+)
+
+
+def iter_excel_records(filename: str) -> Iterator[RecordType]:
+    """
+    Читает файл Excel построчно и отдает записи меню, подменю и блюд
+    в порядке файла.
+    """
+    wb = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+    try:
+        # id родителей последних прочитанных меню и подменю
+        last_menu_id = ''
+        last_submenu_id = ''
+        for row in wb.active.iter_rows(values_only=True):
+            if row[0] is not None:  # Это меню
+                last_menu_id = str(row[0])
+                yield MenuType(str(row[0]), str(row[1]), str(row[2]))
+            elif row[1] is not None:  # Это подменю
+                last_submenu_id = str(row[1])
+                yield SubmenuType(last_menu_id, str(row[1]), str(row[2]), str(row[3]))
+            elif row[2] is not None:  # Это блюдо
+                # Смотрим есть ли столбец скидок
+                discount = row[6] if len(row) > 6 else None
+                yield DishType(
+                    last_menu_id,
+                    last_submenu_id,
+                    str(row[2]),
+                    str(row[3]),
+                    str(row[4]),
+                    str(row[5]),
+                    discount,
+                )
+    finally:
+        wb.close()
+
+
+async def iter_record_batches(
+    records: Iterable[RecordType], batch_size: int | None = None
+) -> AsyncIterator[list[RecordType]]:
+    """
+    Собирает записи в пачки не больше batch_size. Каждая пачка читается
+    в отдельном потоке, генератор записей продолжается с того же места.
+    """
+    batch_size = batch_size or settings.admin_sync_batch_size
+    iterator = iter(records)
+    while True:
+        batch = await asyncio.to_thread(lambda: list(islice(iterator, batch_size)))
+        if not batch:
+            return
+        yield batch
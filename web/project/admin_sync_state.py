@@ -0,0 +1,98 @@
+"""
+admin_sync_state.py
+----------
+Модуль хранит в redis отпечаток последних примененных данных админской
+синхронизации и статистику ее запусков.
+
+Если отпечаток данных файла совпадает с сохраненным, синхронизация
+пропускается, не открывая сессий с БД. Для Excel сначала сравниваются время
+изменения и размер файла - при совпадении файл даже не читается. Отпечаток
+хранится не дольше admin_sync_force_interval секунд, после чего запуск
+снова сравнивает файл с БД и возвращает изменения, сделанные через API.
+
+"""
+
+import hashlib
+import json
+import os
+from typing import Any, Iterable
+
+import redis.asyncio as redis
+
+from .config import settings
+
+FINGERPRINT_KEY = 'admin_sync:fingerprint'
+FILE_STAT_KEY = 'admin_sync:file_stat'
+STATS_KEY = 'admin_sync:stats'
+
+
+def get_data_fingerprint(records: Iterable[tuple]) -> str:
+    """sha256 записей меню, подменю и блюд, записи читаются по одной"""
+    fingerprint = hashlib.sha256()
+    for record in records:
+        fingerprint.update(json.dumps(record, ensure_ascii=False, default=str).encode())
+        fingerprint.update(b'\n')
+    return fingerprint.hexdigest()
+
+
+def get_file_stat(filename: str) -> str:
+    stat = os.stat(filename)
+    return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+
+async def is_file_unchanged(redis_client: redis.Redis, file_stat: str) -> bool:
+    return await redis_client.get(FILE_STAT_KEY) == file_stat.encode()
+
+
+async def is_data_unchanged(redis_client: redis.Redis, fingerprint: str) -> bool:
+    return await redis_client.get(FINGERPRINT_KEY) == fingerprint.encode()
+
+
+async def save_fingerprint(
+    redis_client: redis.Redis, fingerprint: str, file_stat: str | None = None
+) -> None:
+    """запоминает примененные данные, вызывается после успешной синхронизации"""
+    expire = settings.admin_sync_force_interval or None
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.set(FINGERPRINT_KEY, fingerprint, ex=expire)
+        if file_stat is not None:
+            pipe.set(FILE_STAT_KEY, file_stat, ex=expire)
+        await pipe.execute()
+
+
+async def save_file_stat(redis_client: redis.Redis, file_stat: str) -> None:
+    """
+    запоминает время изменения и размер файла, содержимое которого не
+    изменилось; срок хранения берется у отпечатка, чтобы не отложить сверку
+    """
+    ttl = await redis_client.pttl(FINGERPRINT_KEY)
+    if ttl == -2:
+        return
+    await redis_client.set(FILE_STAT_KEY, file_stat, px=ttl if ttl > 0 else None)
+
+
+async def record_run(redis_client: redis.Redis, applied: bool, seconds: float) -> None:
+    """считает запуски синхронизации и их суммарное время"""
+    status = 'applied' if applied else 'skipped'
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hincrby(STATS_KEY, f'{status}_runs', 1)
+        pipe.hincrbyfloat(STATS_KEY, f'{status}_seconds', seconds)
+        pipe.hset(STATS_KEY, mapping={'last_status': status, 'last_seconds': seconds})
+        await pipe.execute()
+
+
+async def get_sync_stats(redis_client: redis.Redis) -> dict[str, Any]:
+    stats = {
+        key.decode(): value.decode()
+        for key, value in (await redis_client.hgetall(STATS_KEY)).items()
+    }
+    return {
+        'applied_runs': int(stats.get('applied_runs', 0)),
+        'applied_seconds': float(stats.get('applied_seconds', 0)),
+        'skipped_runs': int(stats.get('skipped_runs', 0)),
+        'skipped_seconds': float(stats.get('skipped_seconds', 0)),
+        'last_status': stats.get('last_status'),
+        'last_seconds': (
+            float(stats['last_seconds']) if 'last_seconds' in stats else None
+        ),
+    }
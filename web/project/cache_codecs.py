@@ -0,0 +1,127 @@
+"""
+cache_codecs.py
+----------
+Модуль реализует кодеки для хранения данных в кеше redis.
+
+Значение в кеше - заголовок и данные:
+    v<версия схемы>|<кодек><флаг сжатия>|<данные>
+Записи с другой версией схемы считаются отсутствующими в кеше, поэтому
+после изменения pydantic-схем достаточно поменять CACHE_SCHEMA_VERSION.
+
+"""
+
+import json
+import pickle
+import zlib
+from typing import Any
+
+import msgpack
+from pydantic.json import pydantic_encoder
+
+from .config import settings
+
+COMPRESSED = b'z'
+NOT_COMPRESSED = b'-'
+
+
+class JsonCodec:
+    """Компактный json, pydantic-схемы сохраняются как словари"""
+
+    name = b'j'
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(
+            value, default=pydantic_encoder, separators=(',', ':'), ensure_ascii=False
+        ).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackCodec:
+    """msgpack, pydantic-схемы сохраняются как словари"""
+
+    name = b'm'
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=pydantic_encoder)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data)
+
+
+class PickleCodec:
+    """pickle, сохраняет объекты python целиком"""
+
+    name = b'p'
+
+    def dumps(self, value: Any) -> bytes:
+        return pickle.dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+Codec = JsonCodec | MsgpackCodec | PickleCodec
+
+CODECS: dict[str, Codec] = {
+    'json': JsonCodec(),
+    'msgpack': MsgpackCodec(),
+    'pickle': PickleCodec(),
+}
+CODECS_BY_NAME: dict[bytes, Codec] = {codec.name: codec for codec in CODECS.values()}
+
+
+class CacheCodec:
+    """
+    Кодирует значения для кеша выбранным кодеком, сжимает большие значения
+    и проверяет версию схемы при чтении.
+
+    Parameters
+    ----------
+    codec: str
+        кодек для записи: json, msgpack или pickle
+    schema_version: str
+        версия схемы данных в кеше
+    compress_min_size: int
+        значения от этого размера в байтах сжимаются zlib, 0 - не сжимать
+    """
+
+    def __init__(self, codec: str, schema_version: str, compress_min_size: int) -> None:
+        if codec not in CODECS:
+            raise ValueError(f'unknown cache codec: {codec}')
+        self.codec = CODECS[codec]
+        self.prefix = b'v' + schema_version.encode() + b'|'
+        self.compress_min_size = compress_min_size
+
+    def encode(self, value: Any) -> bytes:
+        data = self.codec.dumps(value)
+        flag = NOT_COMPRESSED
+        if self.compress_min_size and len(data) >= self.compress_min_size:
+            data = zlib.compress(data)
+            flag = COMPRESSED
+        return self.prefix + self.codec.name + flag + b'|' + data
+
+    def decode(self, raw: bytes) -> Any | None:
+        """Возвращает None, если запись другой версии схемы или не читается"""
+        if not raw.startswith(self.prefix):
+            return None
+        # после префикса: кодек, флаг сжатия и '|' - по одному байту
+        codec_at = len(self.prefix)
+        flag_at = codec_at + 1
+        separator_at = flag_at + 1
+        data_at = separator_at + 1
+        codec = CODECS_BY_NAME.get(raw[codec_at:flag_at])
+        if codec is None:
+            return None
+        data = raw[data_at:]
+        if raw[flag_at:separator_at] == COMPRESSED:
+            data = zlib.decompress(data)
+        return codec.loads(data)
+
+
+cache_codec = CacheCodec(
+    codec=settings.cache_codec,
+    schema_version=settings.cache_schema_version,
+    compress_min_size=settings.cache_compress_min_size,
+)
@@ -0,0 +1,133 @@
+"""
+cache_local.py
+----------
+Модуль реализует кеш первого уровня в памяти процесса перед кешем redis
+и его сброс во всех процессах через pub/sub redis.
+
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Iterable
+
+import redis.asyncio as redis
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'cache_invalidation'
+# Отличает сообщения этого процесса от сообщений других процессов
+PROCESS_ID = uuid.uuid4().hex
+
+
+class LocalCache:
+    """
+    LRU-кеш в памяти процесса с ограничением по количеству ключей и ttl
+
+    Parameters
+    ----------
+    max_size: int
+        максимальное количество ключей
+    ttl: float
+        время жизни значения в секундах
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any | None:
+        item = self.data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self.data[key]
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: str, value: Any) -> None:
+        self.data[key] = (time.monotonic() + self.ttl, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.max_size:
+            self.data.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.data.pop(key, None)
+
+    def clear_namespace(self, namespace: str) -> None:
+        """удаляет ключ namespace и все ключи, начинающиеся на namespace/"""
+        prefix = namespace + '/'
+        for key in [
+            key for key in self.data if key == namespace or key.startswith(prefix)
+        ]:
+            del self.data[key]
+
+    def clear(self) -> None:
+        self.data.clear()
+
+
+local_cache = LocalCache(max_size=settings.cache_l1_max_size, ttl=settings.cache_l1_ttl)
+
+
+def apply_invalidation(message: dict[str, Any]) -> None:
+    if message.get('clear'):
+        local_cache.clear()
+        return
+    local_cache.delete(*message.get('keys', []))
+    for namespace in message.get('namespaces', []):
+        local_cache.clear_namespace(namespace)
+
+
+async def publish_invalidation(
+    redis_client: redis.Redis,
+    keys: Iterable[str] = (),
+    namespaces: Iterable[str] = (),
+    clear: bool = False,
+) -> None:
+    """
+    Сбрасывает ключи в кеше этого процесса и рассылает сброс остальным
+    процессам. Без включенного кеша первого уровня ничего не делает.
+    """
+    if not settings.cache_l1_enabled:
+        return
+    message = {
+        'origin': PROCESS_ID,
+        'keys': list(keys),
+        'namespaces': list(namespaces),
+        'clear': clear,
+    }
+    apply_invalidation(message)
+    await redis_client.publish(INVALIDATION_CHANNEL, json.dumps(message))
+
+
+async def listen_invalidations(redis_client: redis.Redis) -> None:
+    """
+    Применяет к кешу процесса сбросы, разосланные другими процессами.
+    После потери соединения кеш процесса очищается целиком: сообщения,
+    пришедшие за это время, потеряны.
+    """
+    while True:
+        try:
+            async with redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                local_cache.clear()
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    data = json.loads(message['data'])
+                    if data.get('origin') != PROCESS_ID:
+                        apply_invalidation(data)
+        except redis.ConnectionError:
+            logger.warning('cache invalidation channel lost, reconnecting')
+            await asyncio.sleep(1)
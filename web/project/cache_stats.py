@@ -0,0 +1,105 @@
+"""
+cache_stats.py
+----------
+Модуль считает статистику кеша по семействам ключей: попадания в кеш
+процесса и в redis, промахи, записи, сбросы, байты прочитанных и
+записанных значений, время чтения из redis и декодирования значений.
+
+Семейство ключа определяется по его виду:
+    all_menus        - страницы списка меню
+    all_menus_whole  - дерево всех меню
+    menu             - меню (ключ - id меню)
+    submenus         - страницы списка подменю меню
+    submenu          - подменю
+    dishes           - страницы списка блюд подменю
+    dish             - блюдо
+    search           - результаты поиска блюд
+
+Счетчики хранятся в памяти процесса, как и попадания по уровням кеша.
+
+"""
+
+from typing import Any
+
+# семейства ключей, заданные первой частью ключа
+NAMED_FAMILIES = ('all_menus', 'all_menus_whole', 'search')
+PAGE_PREFIX = 'page:'
+
+
+def get_key_family(key: str) -> str:
+    """семейство ключа кеша или пространства имен"""
+    parts = key.split('/')
+    if parts[-1].startswith(PAGE_PREFIX):
+        parts.pop()
+    if parts[0] in NAMED_FAMILIES:
+        return parts[0]
+    if len(parts) == 1:
+        return 'menu'
+    if len(parts) == 2:
+        return 'submenus' if parts[1] == 'submenus' else 'submenu'
+    if len(parts) == 3:
+        return 'dishes' if parts[2] == 'dishes' else 'dish'
+    return 'other'
+
+
+class CacheFamilyStats:
+    """счетчики одного семейства ключей"""
+
+    __slots__ = (
+        'local_hits',
+        'hits',
+        'misses',
+        'sets',
+        'invalidations',
+        'read_bytes',
+        'written_bytes',
+        'get_seconds',
+        'decode_seconds',
+    )
+
+    def __init__(self) -> None:
+        self.local_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.invalidations = 0
+        self.read_bytes = 0
+        self.written_bytes = 0
+        self.get_seconds = 0.0
+        self.decode_seconds = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        lookups = self.local_hits + self.hits + self.misses
+        result = {name: getattr(self, name) for name in self.__slots__}
+        result['hit_ratio'] = (self.local_hits + self.hits) / lookups if lookups else 0
+        return result
+
+
+class CacheStats:
+    """статистика кеша процесса по семействам ключей"""
+
+    def __init__(self) -> None:
+        self.families: dict[str, CacheFamilyStats] = {}
+
+    def __getitem__(self, key: str) -> CacheFamilyStats:
+        """счетчики семейства ключа key"""
+        family = get_key_family(key)
+        stats = self.families.get(family)
+        if stats is None:
+            stats = self.families[family] = CacheFamilyStats()
+        return stats
+
+    def add_invalidations(self, *keys: str) -> None:
+        for key in keys:
+            self[key].invalidations += 1
+
+    def as_dict(self) -> dict[str, dict[str, Any]]:
+        return {
+            family: stats.as_dict() for family, stats in sorted(self.families.items())
+        }
+
+    def clear(self) -> None:
+        self.families.clear()
+
+
+cache_stats = CacheStats()
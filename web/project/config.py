@@ -12,11 +12,68 @@ DB_PASS = os.environ.get('POSTGRES_PASSWORD')
 
 REDIS_HOST = os.environ.get('REDIS_HOST')
 REDIS_PORT = os.environ.get('REDIS_PORT')
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 64))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 5))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.environ.get('REDIS_SOCKET_CONNECT_TIMEOUT', 5))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', 30))
 
 
 class Config:
     url = f'postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
-    echo = True
+    # лог каждого sql-запроса, только для отладки
+    echo = os.environ.get('DB_ECHO', '0') == '1'
+    # пул соединений с postgres одного процесса: постоянные соединения, сверх
+    # них временные, сколько секунд ждать свободного соединения
+    db_pool_size = int(os.environ.get('DB_POOL_SIZE', 5))
+    db_max_overflow = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    db_pool_timeout = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    # через сколько секунд соединение переоткрывается, -1 - не переоткрывать
+    db_pool_recycle = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    # проверка соединения перед выдачей из пула
+    db_pool_pre_ping = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+    # таймауты подключения и выполнения запроса в секундах, 0 - без таймаута
+    db_connect_timeout = float(os.environ.get('DB_CONNECT_TIMEOUT', 10))
+    db_command_timeout = float(os.environ.get('DB_COMMAND_TIMEOUT', 0))
+    # подготовленных запросов в кеше одного соединения asyncpg
+    db_statement_cache_size = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', 100))
+    # работа через PgBouncer в режиме transaction: кеши подготовленных
+    # запросов выключаются, соединение сервера меняется между транзакциями
+    db_pgbouncer = os.environ.get('DB_PGBOUNCER', '0') == '1'
+    # orm - дерево /menus/whole/ собирается в python, sql - json собирает postgres
+    menus_whole_mode = os.environ.get('MENUS_WHOLE_MODE', 'orm')
+    cache_codec = os.environ.get('CACHE_CODEC', 'json')
+    cache_schema_version = os.environ.get('CACHE_SCHEMA_VERSION', '1')
+    cache_compress_min_size = int(os.environ.get('CACHE_COMPRESS_MIN_SIZE', 16384))
+    cache_ttl = int(os.environ.get('CACHE_TTL', 86400))
+    # срок блокировки пересчета горячих ключей в redis, 0 - без блокировки
+    cache_lock_lease_ms = int(os.environ.get('CACHE_LOCK_LEASE_MS', 5000))
+    # кеш первого уровня в памяти процесса перед redis
+    cache_l1_enabled = os.environ.get('CACHE_L1_ENABLED', '0') == '1'
+    cache_l1_max_size = int(os.environ.get('CACHE_L1_MAX_SIZE', 1024))
+    cache_l1_ttl = float(os.environ.get('CACHE_L1_TTL', 5))
+    # клиенты и прокси могут хранить ответы, но проверяют их по ETag
+    http_cache_control = os.environ.get('HTTP_CACHE_CONTROL', 'public, no-cache')
+    # источник админской синхронизации: gs - google sheets, excel - Menu.xlsx
+    admin_sync_source = os.environ.get('ADMIN_SYNC_SOURCE', 'gs')
+    # через сколько секунд синхронизация сверит с БД даже неизмененный файл
+    admin_sync_force_interval = int(os.environ.get('ADMIN_SYNC_FORCE_INTERVAL', 300))
+    # записей файла в одной пачке синхронизации
+    admin_sync_batch_size = int(os.environ.get('ADMIN_SYNC_BATCH_SIZE', 1000))
+    # строк на странице списков меню, подменю и блюд по умолчанию и наибольшее
+    page_size = int(os.environ.get('PAGE_SIZE', 100))
+    page_size_max = int(os.environ.get('PAGE_SIZE_MAX', 1000))
+    # блюд в ответе поиска по умолчанию и срок хранения результатов поиска в кеше
+    search_limit = int(os.environ.get('SEARCH_LIMIT', 20))
+    search_cache_ttl = int(os.environ.get('SEARCH_CACHE_TTL', 30))
+    # как часто периодическая задача пересчитывает цены правил скидок, начавших
+    # или закончивших действовать; на столько же может опоздать их срок
+    discount_refresh_interval = int(os.environ.get('DISCOUNT_REFRESH_INTERVAL', 60))
+    # метрики запросов к API для Prometheus на /metrics
+    metrics_enabled = os.environ.get('METRICS_ENABLED', '1') == '1'
+    # заголовки X-DB-Queries и Server-Timing с sql-запросами каждого ответа
+    debug_query_headers = os.environ.get('DEBUG_QUERY_HEADERS', '0') == '1'
+    # сколько повторов одного sql-запроса за запрос к API считать N+1, 0 - не искать
+    n_plus_one_threshold = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
 
 
 settings = Config()
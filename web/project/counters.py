@@ -0,0 +1,62 @@
+"""
+counters.py
+----------
+Модуль пересчитывает денормализованные счетчики подменю и блюд
+в таблицах меню и подменю.
+
+Запуск пересчета для всей базы:
+    python -m project.counters
+
+"""
+
+import asyncio
+from typing import Collection
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import async_session
+from .models import Dish, Menu, Submenu
+
+
+async def recount_counters(
+    db: AsyncSession, menu_ids: Collection[str] | None = None
+) -> None:
+    """
+    Пересчитывает dishes_count подменю и submenus_count, dishes_count меню.
+    Если передан menu_ids - только для этих меню и их подменю.
+    """
+    dishes_in_submenu = (
+        select(func.count(Dish.id))
+        .where(Dish.submenu_id == Submenu.id)
+        .scalar_subquery()
+    )
+    submenus_in_menu = (
+        select(func.count(Submenu.id))
+        .where(Submenu.menu_id == Menu.id)
+        .scalar_subquery()
+    )
+    dishes_in_menu = (
+        select(func.coalesce(func.sum(Submenu.dishes_count), 0))
+        .where(Submenu.menu_id == Menu.id)
+        .scalar_subquery()
+    )
+    update_submenus = update(Submenu).values(dishes_count=dishes_in_submenu)
+    update_menus = update(Menu).values(
+        submenus_count=submenus_in_menu, dishes_count=dishes_in_menu
+    )
+    if menu_ids is not None:
+        update_submenus = update_submenus.where(Submenu.menu_id.in_(menu_ids))
+        update_menus = update_menus.where(Menu.id.in_(menu_ids))
+    await db.execute(update_submenus)
+    await db.execute(update_menus)
+
+
+async def main() -> None:
+    async with async_session() as session:
+        await recount_counters(session)
+        await session.commit()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
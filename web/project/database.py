@@ -1,22 +1,111 @@
-from typing import AsyncIterator
+from typing import Any, AsyncIterator, cast
 
 import redis.asyncio as redis
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 
-from .config import REDIS_HOST, REDIS_PORT, settings
+from .config import (
+    REDIS_HEALTH_CHECK_INTERVAL,
+    REDIS_HOST,
+    REDIS_MAX_CONNECTIONS,
+    REDIS_PORT,
+    REDIS_SOCKET_CONNECT_TIMEOUT,
+    REDIS_SOCKET_TIMEOUT,
+    settings,
+)
+from .metrics import TimedQueuePool, TimedRedis, db_pool_stats
 
-engine = create_async_engine(settings.url, echo=settings.echo)
+
+def get_engine_options() -> dict[str, Any]:
+    """параметры движка и пула соединений postgres из настроек"""
+    statement_cache_size = (
+        0 if settings.db_pgbouncer else settings.db_statement_cache_size
+    )
+    return {
+        'echo': settings.echo,
+        'poolclass': TimedQueuePool,
+        'pool_size': settings.db_pool_size,
+        'max_overflow': settings.db_max_overflow,
+        'pool_timeout': settings.db_pool_timeout,
+        'pool_recycle': settings.db_pool_recycle,
+        'pool_pre_ping': settings.db_pool_pre_ping,
+        'connect_args': {
+            'timeout': settings.db_connect_timeout or None,
+            'command_timeout': settings.db_command_timeout or None,
+            # кеш подготовленных запросов sqlalchemy и кеш самого asyncpg
+            'prepared_statement_cache_size': statement_cache_size,
+            'statement_cache_size': statement_cache_size,
+        },
+    }
+
+
+engine = create_async_engine(settings.url, **get_engine_options())
 
 async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 session = async_session()
 Base = declarative_base()
 
+redis_pool: redis.ConnectionPool | None = None
+
 
 async def get_db() -> AsyncIterator:
     async with async_session() as db:
         yield db
 
 
+def get_redis_pool() -> redis.ConnectionPool:
+    """Возвращает общий для процесса пул соединений с redis, создавая его при первом обращении"""
+    global redis_pool
+    if redis_pool is None:
+        redis_pool = redis.ConnectionPool(
+            host=f'{REDIS_HOST}',
+            port=int(f'{REDIS_PORT}'),
+            encoding='utf8',
+            max_connections=REDIS_MAX_CONNECTIONS,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT,
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        )
+    return redis_pool
+
+
+async def close_redis_pool() -> None:
+    """Закрывает все соединения пула redis"""
+    global redis_pool
+    if redis_pool is not None:
+        await redis_pool.disconnect()
+        redis_pool = None
+
+
+def get_redis_pool_stats() -> dict[str, int]:
+    """Возвращает данные о загрузке пула соединений с redis"""
+    pool = get_redis_pool()
+    return {
+        'max_connections': pool.max_connections,
+        # счетчики пула не входят в публичный API redis-py
+        'created_connections': pool._created_connections,  # type: ignore[attr-defined]
+        'in_use_connections': len(pool._in_use_connections),  # type: ignore[attr-defined]
+        'available_connections': len(
+            pool._available_connections  # type: ignore[attr-defined]
+        ),
+    }
+
+
+def get_db_pool_stats() -> dict[str, int | float]:
+    """Возвращает данные о загрузке пула соединений с postgres"""
+    pool = cast(QueuePool, engine.pool)
+    return {
+        'pool_size': pool.size(),
+        'max_overflow': settings.db_max_overflow,
+        'checked_out_connections': pool.checkedout(),
+        'checked_in_connections': pool.checkedin(),
+        'overflow_connections': max(pool.overflow(), 0),
+        'checkouts': db_pool_stats.checkouts,
+        'timeouts': db_pool_stats.timeouts,
+        'checkout_seconds': db_pool_stats.checkout_seconds.sum,
+    }
+
+
 async def get_async_redis_client() -> redis.Redis:
-    return redis.Redis(host=f'{REDIS_HOST}', port=int(f'{REDIS_PORT}'), encoding='utf8')
+    return TimedRedis(connection_pool=get_redis_pool())
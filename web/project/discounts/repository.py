@@ -0,0 +1,93 @@
+from operator import attrgetter
+
+from fastapi import Depends, HTTPException
+from project.database import get_db
+from project.models import DiscountRule, Dish, Menu, Submenu
+from project.pagination import Page, get_page, paginate
+from project.prices import DishPathType, get_rules_scope, refresh_effective_prices
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .schemas import DiscountRuleInSchema, DiscountRuleOutSchema
+
+
+class DiscountRepository:
+    """
+    Правила скидок. Запись правила в той же транзакции пересчитывает цены
+    со скидкой затронутых блюд и возвращает пути блюд с изменившейся ценой
+    """
+
+    def __init__(self, db: AsyncSession = Depends(get_db)):
+        self.db = db
+
+    async def get_rule(self, target_rule_id: str) -> DiscountRule:
+        rule = await self.db.get(DiscountRule, target_rule_id)
+        if rule is None:
+            raise HTTPException(status_code=404, detail='discount rule not found')
+        return rule
+
+    async def validate_target(self, rule: DiscountRuleInSchema) -> None:
+        for id_column, target_id, name in (
+            (Menu.id, rule.menu_id, 'menu'),
+            (Submenu.id, rule.submenu_id, 'submenu'),
+            (Dish.id, rule.dish_id, 'dish'),
+        ):
+            if target_id is None:
+                continue
+            q = await self.db.execute(select(id_column).where(id_column == target_id))
+            if q.scalar_one_or_none() is None:
+                raise HTTPException(status_code=404, detail=f'{name} not found')
+
+    async def read_rule(self, target_rule_id: str) -> DiscountRuleOutSchema:
+        return DiscountRuleOutSchema.from_orm(await self.get_rule(target_rule_id))
+
+    async def read_rules(self, limit: int, after_id: str | None) -> Page:
+        q = await self.db.execute(
+            paginate(select(DiscountRule), DiscountRule.id, limit, after_id)
+        )
+        page = get_page(q.scalars().all(), limit, get_id=attrgetter('id'))
+        page['items'] = [DiscountRuleOutSchema.from_orm(rule) for rule in page['items']]
+        return page
+
+    async def create_rule(
+        self, rule: DiscountRuleInSchema
+    ) -> tuple[DiscountRuleOutSchema, set[DishPathType]]:
+        await self.validate_target(rule)
+        new_rule = DiscountRule(**rule.dict())
+        self.db.add(new_rule)
+        await self.db.flush()
+        paths = await refresh_effective_prices(self.db, **get_rules_scope([rule]))
+        result = DiscountRuleOutSchema.from_orm(new_rule)
+        await self.db.commit()
+        return result, paths
+
+    async def update_rule(
+        self, target_rule_id: str, rule: DiscountRuleInSchema
+    ) -> tuple[DiscountRuleOutSchema, set[DishPathType]]:
+        current_rule = await self.get_rule(target_rule_id)
+        await self.validate_target(rule)
+        scope = get_rules_scope([current_rule, rule])
+        for name, value in rule.dict().items():
+            setattr(current_rule, name, value)
+        await self.db.flush()
+        paths = await refresh_effective_prices(self.db, **scope)
+        result = DiscountRuleOutSchema.from_orm(current_rule)
+        await self.db.commit()
+        return result, paths
+
+    async def del_rule(
+        self, target_rule_id: str
+    ) -> tuple[dict[str, str | bool], set[DishPathType]]:
+        q = await self.db.execute(
+            delete(DiscountRule.__table__)
+            .where(DiscountRule.id == target_rule_id)
+            .returning(
+                DiscountRule.menu_id, DiscountRule.submenu_id, DiscountRule.dish_id
+            )
+        )
+        deleted = q.all()
+        if not deleted:
+            raise HTTPException(status_code=404, detail='discount rule not found')
+        paths = await refresh_effective_prices(self.db, **get_rules_scope(deleted))
+        await self.db.commit()
+        return {'status': True, 'message': 'The discount rule has been deleted'}, paths
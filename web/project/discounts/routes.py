@@ -0,0 +1,148 @@
+"""
+routes.py
+----------
+Модуль реализует эндпоинты FastApi для взамодействия с правилами скидок.
+
+"""
+
+from typing import Union
+
+from fastapi import APIRouter, Depends
+from project.pagination import PageParams
+from project.schemas_overal import CorrectDeleteSchema, NotFoundSchema
+
+from .schemas import DiscountRuleInSchema, DiscountRuleOutSchema
+from .services import DiscountService
+
+router = APIRouter(prefix='/discounts', tags=['Discounts'])
+
+
+@router.get(
+    '',
+    summary='Получение правил скидок',
+    response_description='список правил скидок',
+    response_model=list[DiscountRuleOutSchema],
+    status_code=200,
+)
+async def get_discounts_handler(
+    response: DiscountService = Depends(),
+    page: PageParams = Depends(),
+) -> list[DiscountRuleOutSchema]:
+    """
+    Эндпоинт возвращает страницу правил скидок по порядку id
+    \f
+    :param response: DiscountService
+         Обьект ответа на запрос из сервиса скидок
+    :param page: PageParams
+         Размер страницы и курсор, курсор следующей страницы - в X-Next-Cursor
+
+    :return: List[DiscountRuleOutSchema]
+        Pydantic-схема для фронтенда с правилами скидок
+    """
+    return page.get_items(
+        await response.read_rules(limit=page.limit, after_id=page.after_id)
+    )
+
+
+@router.get(
+    '/{target_rule_id}',
+    summary='Получение правила скидки по id',
+    response_description='Данные правила скидки',
+    response_model=Union[DiscountRuleOutSchema, NotFoundSchema],
+    status_code=200,
+)
+async def get_discount_handler(
+    target_rule_id: str,
+    response: DiscountService = Depends(),
+) -> DiscountRuleOutSchema:
+    """
+    Эндпоинт возвращает правило скидки по идентификатору или сообщение об ошибке
+    \f
+    :param target_rule_id: str
+        Идентификатор правила скидки в БД
+    :param response: DiscountService
+         Обьект ответа на запрос из сервиса скидок
+
+    :return: Union[DiscountRuleOutSchema, NotFoundSchema]
+        Pydantic-схема для фронтенда с правилом скидки или ошибкой
+    """
+    return await response.read_rule(target_rule_id=target_rule_id)
+
+
+@router.post(
+    '',
+    summary='Публикация правила скидки',
+    response_description='Данные правила скидки',
+    response_model=Union[DiscountRuleOutSchema, NotFoundSchema],
+    status_code=201,
+)
+async def post_discounts_handler(
+    rule: DiscountRuleInSchema,
+    response: DiscountService = Depends(),
+) -> DiscountRuleOutSchema:
+    """
+    Эндпоинт публикации правила скидки на блюдо, подменю или меню.
+    Цены со скидкой затронутых блюд пересчитываются сразу
+    \f
+    :param rule: DiscountRuleInSchema
+        данные правила из pedantic-схемы ввода данных
+    :param response: DiscountService
+         Обьект ответа на запрос из сервиса скидок
+
+    :return: Union[DiscountRuleOutSchema, NotFoundSchema]
+        Pydantic-схема для фронтенда с правилом скидки или ошибкой
+    """
+    return await response.create_rule(rule=rule)
+
+
+@router.patch(
+    '/{target_rule_id}',
+    summary='Изменение правила скидки',
+    response_description='Данные правила скидки',
+    response_model=Union[DiscountRuleOutSchema, NotFoundSchema],
+    status_code=200,
+)
+async def patch_discount_handler(
+    target_rule_id: str,
+    rule: DiscountRuleInSchema,
+    response: DiscountService = Depends(),
+) -> DiscountRuleOutSchema:
+    """
+    Эндпоинт изменения правила скидки
+    \f
+    :param target_rule_id: str
+        Идентификатор правила скидки в БД
+    :param rule: DiscountRuleInSchema
+        данные правила из pedantic-схемы ввода данных
+    :param response: DiscountService
+         Обьект ответа на запрос из сервиса скидок
+
+    :return: Union[DiscountRuleOutSchema, NotFoundSchema]
+        Pydantic-схема для фронтенда с правилом скидки или ошибкой
+    """
+    return await response.update_rule(target_rule_id=target_rule_id, rule=rule)
+
+
+@router.delete(
+    '/{target_rule_id}',
+    summary='Удаление правила скидки',
+    response_description='Сообщение о результате',
+    response_model=Union[CorrectDeleteSchema, NotFoundSchema],
+    status_code=200,
+)
+async def delete_discount_handler(
+    target_rule_id: str,
+    response: DiscountService = Depends(),
+) -> dict[str, bool | str]:
+    """
+    Эндпоинт удаления правила скидки по его id
+    \f
+    :param target_rule_id: str
+        Идентификатор правила скидки в БД
+    :param response: DiscountService
+         Обьект ответа на запрос из сервиса скидок
+
+    :return: Union[CorrectDeleteSchema, NotFoundSchema]
+        Pydantic-схема для фронтенда с флагом об удачной операции или ошибкой
+    """
+    return await response.del_rule(target_rule_id=target_rule_id)
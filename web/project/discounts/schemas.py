@@ -0,0 +1,80 @@
+"""
+schemas.py
+----------
+Модуль реализует pydantic-схемы для валидации данных
+ и обмена данных между сервисами.
+
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any
+
+from pydantic import BaseModel, condecimal, root_validator, validator
+
+
+class DiscountRuleInSchema(BaseModel):
+    """
+    Pydantic-схема правила скидки для ввода данных. Указывается ровно одна
+    цель правила: меню, подменю или блюдо; время без часового пояса - UTC
+
+    Parameters
+    ----------
+    menu_id: str | None
+        Идентификатор меню, на все блюда которого действует скидка
+    submenu_id: str | None
+        Идентификатор подменю, на все блюда которого действует скидка
+    dish_id: str | None
+        Идентификатор блюда, на которое действует скидка
+    percent: Decimal
+        Скидка в процентах
+    starts_at: datetime | None
+        Начало действия скидки, без него - действует сразу
+    ends_at: datetime | None
+        Конец действия скидки, без него - действует бессрочно
+    """
+
+    menu_id: str | None = None
+    submenu_id: str | None = None
+    dish_id: str | None = None
+    percent: condecimal(gt=0, le=100, max_digits=5, decimal_places=2)  # type: ignore[valid-type]
+    starts_at: datetime | None = None
+    ends_at: datetime | None = None
+
+    @validator('starts_at', 'ends_at')
+    def set_timezone(cls, value: datetime | None) -> datetime | None:
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+    @root_validator(skip_on_failure=True)
+    def check_target_and_window(cls, values: dict[str, Any]) -> dict[str, Any]:
+        targets = [values.get(name) for name in ('menu_id', 'submenu_id', 'dish_id')]
+        if sum(target is not None for target in targets) != 1:
+            raise ValueError('exactly one of menu_id, submenu_id, dish_id is required')
+        starts_at, ends_at = values.get('starts_at'), values.get('ends_at')
+        if starts_at is not None and ends_at is not None and starts_at >= ends_at:
+            raise ValueError('starts_at must be earlier than ends_at')
+        return values
+
+
+class DiscountRuleOutSchema(DiscountRuleInSchema):
+    """
+    Pydantic-схема для вывода данных о правиле скидки
+
+    Parameters
+    ----------
+    id: str
+        Идентификатор правила в СУБД
+    percent: Decimal
+        Скидка в процентах
+    from_sheet: bool
+        Скидка из файла админской синхронизации, синхронизация ее перезапишет
+    """
+
+    id: str
+    percent: Decimal
+    from_sheet: bool = False
+
+    class Config:
+        orm_mode = True
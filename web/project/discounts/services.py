@@ -0,0 +1,50 @@
+import redis.asyncio as redis
+from fastapi import Depends
+from project.database import get_async_redis_client
+from project.pagination import Page
+from project.prices import invalidate_prices
+
+from .repository import DiscountRepository
+from .schemas import DiscountRuleInSchema, DiscountRuleOutSchema
+
+
+class DiscountService:
+    """
+    Правила скидок не кешируются; запись правила сбрасывает кеш и версии
+    ответов только с теми блюдами, цена со скидкой которых изменилась
+    """
+
+    def __init__(
+        self,
+        discount_repository: DiscountRepository = Depends(),
+        redis_client: redis.Redis = Depends(get_async_redis_client),
+    ):
+        self.discount_repository = discount_repository
+        self.redis_client = redis_client
+
+    async def read_rule(self, target_rule_id: str) -> DiscountRuleOutSchema:
+        return await self.discount_repository.read_rule(target_rule_id=target_rule_id)
+
+    async def read_rules(self, limit: int, after_id: str | None) -> Page:
+        return await self.discount_repository.read_rules(limit=limit, after_id=after_id)
+
+    async def create_rule(self, rule: DiscountRuleInSchema) -> DiscountRuleOutSchema:
+        result, paths = await self.discount_repository.create_rule(rule=rule)
+        await invalidate_prices(self.redis_client, paths)
+        return result
+
+    async def update_rule(
+        self, target_rule_id: str, rule: DiscountRuleInSchema
+    ) -> DiscountRuleOutSchema:
+        result, paths = await self.discount_repository.update_rule(
+            target_rule_id=target_rule_id, rule=rule
+        )
+        await invalidate_prices(self.redis_client, paths)
+        return result
+
+    async def del_rule(self, target_rule_id: str) -> dict[str, str | bool]:
+        result, paths = await self.discount_repository.del_rule(
+            target_rule_id=target_rule_id
+        )
+        await invalidate_prices(self.redis_client, paths)
+        return result
@@ -1,15 +1,23 @@
+from operator import attrgetter
+from typing import Collection
+
 from fastapi import Depends
 from project.database import get_db
-from project.models import Dish
+from project.models import Dish, Menu, Submenu, generate_uuid
+from project.pagination import Page, get_page, paginate
+from project.prices import refresh_effective_prices
 from project.services_overal import (
-    get_dish_price_with_discount,
+    check_path,
+    id_in,
+    select_path,
     validate_dish,
     validate_submenu,
+    values_table,
 )
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import cast, delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .schemas import DishInSchema, DishOutSchema
+from .schemas import DishBulkUpdateSchema, DishInSchema, DishOutSchema
 
 
 class DishRepository:
@@ -19,47 +27,53 @@ class DishRepository:
     async def read_dish(
         self, target_menu_id: str, target_submenu_id: str, target_dish_id: str
     ) -> DishOutSchema:
-        await validate_dish(
-            db=self.db,
-            target_menu_id=target_menu_id,
-            target_submenu_id=target_submenu_id,
-            target_dish_id=target_dish_id,
+        q = await self.db.execute(
+            select_path(
+                target_menu_id=target_menu_id,
+                target_submenu_id=target_submenu_id,
+                target_dish_id=target_dish_id,
+            ).add_columns(Dish)
         )
-        q = await self.db.execute(select(Dish).where(Dish.id == target_dish_id))
         dish = q.one_or_none()
+        check_path(
+            dish, target_submenu_id=target_submenu_id, target_dish_id=target_dish_id
+        )
 
         return DishOutSchema(
             id=dish.Dish.id,
             title=dish.Dish.title,
             description=dish.Dish.description,
-            price=await get_dish_price_with_discount(
-                dish_id=dish.Dish.id, dish_price=dish.Dish.price
-            ),
+            price=dish.Dish.current_price,
         )
 
     async def read_dishes(
-        self, target_menu_id: str, target_submenu_id: str
-    ) -> list[DishOutSchema]:
+        self,
+        target_menu_id: str,
+        target_submenu_id: str,
+        limit: int,
+        after_id: str | None,
+    ) -> Page:
         q = await self.db.execute(
-            select(Dish).where(
-                Dish.submenu_id == target_submenu_id,
+            paginate(
+                select(Dish).where(
+                    Dish.submenu_id == target_submenu_id,
+                ),
+                Dish.id,
+                limit,
+                after_id,
             )
         )
-        dishes_result = q.all()
-        if not dishes_result:
-            return []
-        dishes = []
-        for dish in dishes_result:
-            dish_schema = DishOutSchema(
-                id=dish.Dish.id,
-                title=dish.Dish.title,
-                description=dish.Dish.description,
-                price=await get_dish_price_with_discount(
-                    dish_id=dish.Dish.id, dish_price=dish.Dish.price
-                ),
+        page = get_page(q.scalars().all(), limit, get_id=attrgetter('id'))
+        page['items'] = [
+            DishOutSchema(
+                id=dish.id,
+                title=dish.title,
+                description=dish.description,
+                price=dish.current_price,
             )
-            dishes.append(dish_schema)
-        return dishes
+            for dish in page['items']
+        ]
+        return page
 
     async def create_dish(
         self, target_menu_id: str, target_submenu_id: str, dish: DishInSchema
@@ -78,6 +92,17 @@ class DishRepository:
             )
         )
         new_dish_id = insert_dish_query.inserted_primary_key[0]
+        await self.db.execute(
+            update(Submenu)
+            .values(dishes_count=Submenu.dishes_count + 1)
+            .where(Submenu.id == target_submenu_id)
+        )
+        await self.db.execute(
+            update(Menu)
+            .values(dishes_count=Menu.dishes_count + 1)
+            .where(Menu.id == target_menu_id)
+        )
+        await refresh_effective_prices(self.db, dish_ids=[new_dish_id])
         await self.db.commit()
         q = await self.db.execute(select(Dish).where(Dish.id == new_dish_id))
         inserted_dish = q.scalars().one_or_none()
@@ -85,7 +110,7 @@ class DishRepository:
             id=inserted_dish.id,
             title=inserted_dish.title,
             description=inserted_dish.description,
-            price=inserted_dish.price,
+            price=inserted_dish.current_price,
         )
 
     async def update_dish(
@@ -106,6 +131,7 @@ class DishRepository:
             .values(title=dish.title, description=dish.description, price=dish.price)
             .where(Dish.id == target_dish_id)
         )
+        await refresh_effective_prices(self.db, dish_ids=[target_dish_id])
         await self.db.commit()
 
         return await self.read_dish(
@@ -124,5 +150,153 @@ class DishRepository:
             target_dish_id=target_dish_id,
         )
         await self.db.execute(delete(Dish).where(Dish.id == target_dish_id))
+        await self.db.execute(
+            update(Submenu)
+            .values(dishes_count=Submenu.dishes_count - 1)
+            .where(Submenu.id == target_submenu_id)
+        )
+        await self.db.execute(
+            update(Menu)
+            .values(dishes_count=Menu.dishes_count - 1)
+            .where(Menu.id == target_menu_id)
+        )
         await self.db.commit()
         return {'status': True, 'message': 'The dish has been deleted'}
+
+    async def update_counters(
+        self, target_menu_id: str, target_submenu_id: str, delta: int
+    ) -> None:
+        await self.db.execute(
+            update(Submenu)
+            .values(dishes_count=Submenu.dishes_count + delta)
+            .where(Submenu.id == target_submenu_id)
+        )
+        await self.db.execute(
+            update(Menu)
+            .values(dishes_count=Menu.dishes_count + delta)
+            .where(Menu.id == target_menu_id)
+        )
+
+    async def refresh_prices(self, dish_ids: Collection[str]) -> dict[str, Dish]:
+        """пересчитывает цены со скидкой блюд и возвращает блюда по id"""
+        await refresh_effective_prices(self.db, dish_ids=dish_ids)
+        q = await self.db.execute(select(Dish).where(id_in(Dish.id, dish_ids)))
+        return {dish.id: dish for dish in q.scalars()}
+
+    async def create_dishes(
+        self, target_menu_id: str, target_submenu_id: str, dishes: list[DishInSchema]
+    ) -> list[dict[str, str | bool | DishOutSchema]]:
+        await validate_submenu(
+            db=self.db,
+            target_menu_id=target_menu_id,
+            target_submenu_id=target_submenu_id,
+        )
+        new_dishes = [(generate_uuid(), dish) for dish in dishes]
+        await self.db.execute(
+            insert(Dish).values(
+                [
+                    dict(
+                        id=dish_id,
+                        title=dish.title,
+                        description=dish.description,
+                        price=dish.price,
+                        submenu_id=target_submenu_id,
+                    )
+                    for dish_id, dish in new_dishes
+                ]
+            )
+        )
+        await self.update_counters(target_menu_id, target_submenu_id, len(dishes))
+        inserted = await self.refresh_prices([dish_id for dish_id, _ in new_dishes])
+        await self.db.commit()
+        return [
+            {
+                'id': dish_id,
+                'message': 'The dish has been created',
+                'dish': DishOutSchema(
+                    id=dish_id,
+                    title=inserted[dish_id].title,
+                    description=inserted[dish_id].description,
+                    price=inserted[dish_id].current_price,
+                ),
+            }
+            for dish_id, _ in new_dishes
+        ]
+
+    async def update_dishes(
+        self,
+        target_menu_id: str,
+        target_submenu_id: str,
+        dishes: list[DishBulkUpdateSchema],
+    ) -> list[dict[str, str | bool | DishOutSchema | None]]:
+        await validate_submenu(
+            db=self.db,
+            target_menu_id=target_menu_id,
+            target_submenu_id=target_submenu_id,
+        )
+        data = values_table(
+            'data',
+            'id',
+            'title',
+            'description',
+            'price',
+            rows=[
+                (dish.id, dish.title, dish.description, dish.price) for dish in dishes
+            ],
+        )
+        q = await self.db.execute(
+            update(Dish.__table__)
+            .where(Dish.id == data.c.id, Dish.submenu_id == target_submenu_id)
+            .values(
+                title=data.c.title,
+                description=data.c.description,
+                price=cast(data.c.price, Dish.price.type),
+            )
+            .returning(Dish.id)
+        )
+        updated = await self.refresh_prices(q.scalars().all())
+        await self.db.commit()
+        return [
+            (
+                {
+                    'id': dish.id,
+                    'message': 'The dish has been updated',
+                    'dish': DishOutSchema(
+                        id=dish.id,
+                        title=updated[dish.id].title,
+                        description=updated[dish.id].description,
+                        price=updated[dish.id].current_price,
+                    ),
+                }
+                if dish.id in updated
+                else {'id': dish.id, 'status': False, 'message': 'dish not found'}
+            )
+            for dish in dishes
+        ]
+
+    async def del_dishes(
+        self, target_menu_id: str, target_submenu_id: str, target_dish_ids: list[str]
+    ) -> list[dict[str, str | bool]]:
+        await validate_submenu(
+            db=self.db,
+            target_menu_id=target_menu_id,
+            target_submenu_id=target_submenu_id,
+        )
+        q = await self.db.execute(
+            delete(Dish)
+            .where(
+                Dish.submenu_id == target_submenu_id, id_in(Dish.id, target_dish_ids)
+            )
+            .returning(Dish.id)
+        )
+        deleted = set(q.scalars().all())
+        await self.update_counters(target_menu_id, target_submenu_id, -len(deleted))
+        await self.db.commit()
+        return [
+            (
+                {'id': dish_id, 'message': 'The dish has been deleted'}
+                if dish_id in deleted
+                else {'id': dish_id, 'status': False, 'message': 'dish not found'}
+            )
+            for dish_id in target_dish_ids
+        ]
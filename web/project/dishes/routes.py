@@ -7,18 +7,144 @@ routes.py
 
 from typing import Union
 
-from fastapi import APIRouter, Depends
-from project.schemas_overal import CorrectDeleteSchema, NotFoundSchema
+from fastapi import APIRouter, Depends, Response
+from project.pagination import PageParams
+from project.schemas_overal import (
+    BULK_MAX_ITEMS,
+    BulkDeleteSchema,
+    CorrectDeleteSchema,
+    NotFoundSchema,
+)
+from project.versions import ConditionalGet
+from pydantic import conlist
 
-from .schemas import DishInSchema, DishOutSchema
+from .schemas import (
+    DishBulkResultSchema,
+    DishBulkUpdateSchema,
+    DishInSchema,
+    DishOutSchema,
+)
 from .services import DishService
 
+# тела bulk-запросов: от 1 до BULK_MAX_ITEMS блюд
+DishesInBulk = conlist(DishInSchema, min_items=1, max_items=BULK_MAX_ITEMS)
+DishesUpdateBulk = conlist(DishBulkUpdateSchema, min_items=1, max_items=BULK_MAX_ITEMS)
+
 router = APIRouter(
     prefix='/menus/{target_menu_id}/submenus/{target_submenu_id}/dishes',
     tags=['Dishes'],
 )
 
 
+# bulk-эндпоинты объявлены раньше эндпоинтов с {target_dish_id},
+# иначе PATCH /bulk попадет в patch_dish_handler
+
+
+@router.post(
+    '/bulk',
+    summary='Публикация нескольких блюд',
+    response_description='Результаты по каждому блюду в порядке запроса',
+    response_model=Union[list[DishBulkResultSchema], NotFoundSchema],
+    status_code=201,
+)
+async def post_dishes_bulk_handler(
+    target_menu_id: str,
+    target_submenu_id: str,
+    dishes: DishesInBulk,  # type: ignore[valid-type]
+    response: DishService = Depends(),
+) -> list[dict[str, str | bool | DishOutSchema]]:
+    """
+    Эндпоинт публикации нескольких блюд одним запросом и одной транзакцией
+    \f
+    :param target_menu_id: str
+        Идентификатор меню в БД
+    :param target_submenu_id: str
+        Идентификатор подменю в БД
+    :param dishes: list[DishInSchema]
+        данные блюд из pedantic-схемы ввода данных
+    :param response: DishService
+        Обьект ответа на запрос из сервиса блюд
+
+    :return: Union[list[DishBulkResultSchema], NotFoundSchema]
+        Pydantic-схема для фронтенда с блюдами или ошибкой
+    """
+    return await response.create_dishes(
+        target_menu_id=target_menu_id,
+        target_submenu_id=target_submenu_id,
+        dishes=dishes,
+    )
+
+
+@router.patch(
+    '/bulk',
+    summary='Изменение нескольких блюд',
+    response_description='Результаты по каждому блюду в порядке запроса',
+    response_model=Union[list[DishBulkResultSchema], NotFoundSchema],
+    status_code=200,
+)
+async def patch_dishes_bulk_handler(
+    target_menu_id: str,
+    target_submenu_id: str,
+    dishes: DishesUpdateBulk,  # type: ignore[valid-type]
+    response: DishService = Depends(),
+) -> list[dict[str, str | bool | DishOutSchema | None]]:
+    """
+    Эндпоинт изменения нескольких блюд одним запросом и одной транзакцией
+    \f
+    :param target_menu_id: str
+        Идентификатор меню в СУБД
+    :param target_submenu_id: str
+        Идентификатор подменю в СУБД
+    :param dishes: list[DishBulkUpdateSchema]
+        идентификаторы и данные блюд из pedantic-схемы ввода данных
+    :param response: DishService
+        Обьект ответа на запрос из сервиса блюд
+
+    :return: Union[list[DishBulkResultSchema], NotFoundSchema]
+        Pydantic-схема для фронтенда с блюдами или ошибкой
+    """
+    return await response.update_dishes(
+        target_menu_id=target_menu_id,
+        target_submenu_id=target_submenu_id,
+        dishes=dishes,
+    )
+
+
+@router.post(
+    '/bulk/delete',
+    summary='Удаление нескольких блюд',
+    response_description='Результаты по каждому блюду в порядке запроса',
+    response_model=Union[list[DishBulkResultSchema], NotFoundSchema],
+    status_code=200,
+)
+async def delete_dishes_bulk_handler(
+    target_menu_id: str,
+    target_submenu_id: str,
+    dishes: BulkDeleteSchema,
+    response: DishService = Depends(),
+) -> list[dict[str, str | bool]]:
+    """
+    Эндпоинт удаления нескольких блюд по их id одним запросом
+    \f
+    :param target_menu_id: str
+        Идентификатор меню в СУБД
+    :param target_submenu_id: str
+        Идентификатор подменю в СУБД
+    :param dishes: BulkDeleteSchema
+        идентификаторы удаляемых блюд
+    :param response: DishService
+        Обьект ответа на запрос из сервиса блюд
+
+    :return: Union[list[DishBulkResultSchema], NotFoundSchema]
+        Pydantic-схема для фронтенда с результатами удаления или ошибкой
+    """
+    return await response.del_dishes(
+        target_menu_id=target_menu_id,
+        target_submenu_id=target_submenu_id,
+        target_dish_ids=dishes.ids,
+    )
+
+
 @router.get(
     '/{target_dish_id}',
     summary='Получение блюда по id',
@@ -31,7 +157,8 @@ async def get_dish_handler(
     target_submenu_id: str,
     target_dish_id: str,
     response: DishService = Depends(),
-) -> DishOutSchema:
+    conditional: ConditionalGet = Depends(),
+) -> DishOutSchema | Response:
     """
      Эндпоинт возвращает блюдо по идентификатору или сообщение об ошибке
      \f
@@ -43,11 +170,16 @@ async def get_dish_handler(
          Идентификатор блюда в БД
     :param response: DishService
          Обьект ответа на запрос из сервиса блюд
+    :param conditional: ConditionalGet
+         Проверка If-None-Match по версии ресурса
 
      :return: Union[DishOutSchema, NotFoundSchema]
          Pydantic-схема для фронтенда с блюдом или ошибкой
     """
-
+    if await conditional.is_not_modified(
+        target_menu_id, target_submenu_id, target_dish_id
+    ):
+        return conditional.not_modified_response()
     return await response.read_dish(
         target_menu_id=target_menu_id,
         target_submenu_id=target_submenu_id,
@@ -66,9 +198,11 @@ async def get_dishes_handler(
     target_menu_id: str,
     target_submenu_id: str,
     response: DishService = Depends(),
-) -> list[DishOutSchema]:
+    conditional: ConditionalGet = Depends(),
+    page: PageParams = Depends(),
+) -> list[DishOutSchema] | Response:
     """
-     Эндпоинт возвращает все блюда
+     Эндпоинт возвращает страницу блюд по порядку id
      \f
      :param target_menu_id: str
          Идентификатор меню в БД
@@ -76,12 +210,23 @@ async def get_dishes_handler(
          Идентификатор подменю в БД
     :param response: DishService
          Обьект ответа на запрос из сервиса блюд
+    :param conditional: ConditionalGet
+         Проверка If-None-Match по версии ресурса
+    :param page: PageParams
+         Размер страницы и курсор, курсор следующей страницы - в X-Next-Cursor
 
      :return: List[DishOutSchema]
          Pydantic-схема для фронтенда с блюдами
     """
-    return await response.read_dishes(
-        target_menu_id=target_menu_id, target_submenu_id=target_submenu_id
+    if await conditional.is_not_modified(target_menu_id, target_submenu_id):
+        return conditional.not_modified_response()
+    return page.get_items(
+        await response.read_dishes(
+            target_menu_id=target_menu_id,
+            target_submenu_id=target_submenu_id,
+            limit=page.limit,
+            after_id=page.after_id,
+        )
     )
 
 
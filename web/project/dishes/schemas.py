@@ -6,6 +6,7 @@ schemas.py
 
 """
 
+from project.schemas_overal import BulkResultSchema
 from pydantic import BaseModel
 
 
@@ -50,3 +51,29 @@ class DishOutSchema(DishInSchema):
 
     class Config:
         orm_mode = True
+
+
+class DishBulkUpdateSchema(DishInSchema):
+    """
+    Pydantic-схема блюда для изменения нескольких блюд одним запросом
+
+    Parameters
+    ----------
+    id: str
+        Идентификатор изменяемого блюда в СУБД
+    """
+
+    id: str
+
+
+class DishBulkResultSchema(BulkResultSchema):
+    """
+    Pydantic-схема результата bulk-операции над одним блюдом
+
+    Parameters
+    ----------
+    dish: DishOutSchema | None
+        данные блюда после создания или изменения
+    """
+
+    dish: DishOutSchema | None = None
@@ -1,10 +1,12 @@
 import redis.asyncio as redis
 from fastapi import BackgroundTasks, Depends
 from project.database import get_async_redis_client
+from project.pagination import Page, get_page_key
 from project.service_redis import AsyncRedisCache
+from project.versions import EntityVersions, get_version_paths
 
 from .repository import DishRepository
-from .schemas import DishInSchema, DishOutSchema
+from .schemas import DishBulkUpdateSchema, DishInSchema, DishOutSchema
 
 
 class DishService:
@@ -16,6 +18,7 @@ class DishService:
     ):
         self.dish_repository = dish_repository
         self.cache = AsyncRedisCache(redis_client)
+        self.versions = EntityVersions(redis_client)
         self.background_tasks = background_tasks
 
     async def read_dish(
@@ -39,14 +42,23 @@ class DishService:
         return result
 
     async def read_dishes(
-        self, target_menu_id: str, target_submenu_id: str
-    ) -> list[DishOutSchema]:
-        key_dishes = '/'.join([target_menu_id, target_submenu_id, 'dishes'])
+        self,
+        target_menu_id: str,
+        target_submenu_id: str,
+        limit: int,
+        after_id: str | None,
+    ) -> Page:
+        key_dishes = get_page_key(
+            '/'.join([target_menu_id, target_submenu_id, 'dishes']), limit, after_id
+        )
         data = await self.cache.get_data_from_cache(key=key_dishes)
         if data is not None:
             return data
         result = await self.dish_repository.read_dishes(
-            target_menu_id=target_menu_id, target_submenu_id=target_submenu_id
+            target_menu_id=target_menu_id,
+            target_submenu_id=target_submenu_id,
+            limit=limit,
+            after_id=after_id,
         )
         await self.cache.set_data_to_cache(
             key=key_dishes, value=result, background_tasks=self.background_tasks
@@ -68,14 +80,18 @@ class DishService:
         key_submenu = '/'.join([target_menu_id, target_submenu_id])
         key_dishes = '/'.join([target_menu_id, target_submenu_id, 'dishes'])
         await self.cache.delete_data_from_cache(
-            'all_menus',
             'all_menus_whole',
             target_menu_id,
             key_submenu,
+            background_tasks=None,
+        )
+        await self.cache.clear_namespace_from_cache(
+            'all_menus',
             key_submenus,
             key_dishes,
-            background_tasks=self.background_tasks,
+            background_tasks=None,
         )
+        await self.versions.bump(*get_version_paths(target_menu_id, target_submenu_id))
         return result
 
     async def del_dish(
@@ -94,14 +110,20 @@ class DishService:
         key_dishes = '/'.join([target_menu_id, target_submenu_id, 'dishes'])
         key_dish = '/'.join([target_menu_id, target_submenu_id, target_dish_id])
         await self.cache.delete_data_from_cache(
-            'all_menus',
             'all_menus_whole',
             target_menu_id,
             key_submenu,
+            key_dish,
+            background_tasks=None,
+        )
+        await self.cache.clear_namespace_from_cache(
+            'all_menus',
             key_submenus,
             key_dishes,
-            key_dish,
-            background_tasks=self.background_tasks,
+            background_tasks=None,
+        )
+        await self.versions.bump(
+            *get_version_paths(target_menu_id, target_submenu_id, target_dish_id)
         )
         return result
 
@@ -120,10 +142,83 @@ class DishService:
         )
         key_dish = '/'.join([target_menu_id, target_submenu_id, target_dish_id])
         key_dishes = '/'.join([target_menu_id, target_submenu_id, 'dishes'])
+        await self.cache.delete_data_from_cache(
+            'all_menus_whole', key_dish, background_tasks=None
+        )
+        await self.cache.clear_namespace_from_cache(key_dishes, background_tasks=None)
+        await self.versions.bump(
+            *get_version_paths(target_menu_id, target_submenu_id, target_dish_id)
+        )
+        return result
+
+    async def invalidate_dishes(
+        self, target_menu_id: str, target_submenu_id: str, target_dish_ids: list[str]
+    ) -> None:
+        """один раз сбрасывает кеш и версии после bulk-операции над блюдами"""
         await self.cache.delete_data_from_cache(
             'all_menus_whole',
-            key_dishes,
-            key_dish,
-            background_tasks=self.background_tasks,
+            target_menu_id,
+            '/'.join([target_menu_id, target_submenu_id]),
+            *[
+                '/'.join([target_menu_id, target_submenu_id, dish_id])
+                for dish_id in target_dish_ids
+            ],
+            background_tasks=None,
+        )
+        await self.cache.clear_namespace_from_cache(
+            'all_menus',
+            '/'.join([target_menu_id, 'submenus']),
+            '/'.join([target_menu_id, target_submenu_id, 'dishes']),
+            background_tasks=None,
+        )
+        await self.versions.bump(
+            *get_version_paths(target_menu_id, target_submenu_id),
+            *[
+                '/'.join([target_menu_id, target_submenu_id, dish_id])
+                for dish_id in target_dish_ids
+            ],
+        )
+
+    async def create_dishes(
+        self, target_menu_id: str, target_submenu_id: str, dishes: list[DishInSchema]
+    ) -> list[dict[str, str | bool | DishOutSchema]]:
+        result = await self.dish_repository.create_dishes(
+            target_menu_id=target_menu_id,
+            target_submenu_id=target_submenu_id,
+            dishes=dishes,
+        )
+        await self.invalidate_dishes(target_menu_id, target_submenu_id, [])
+        return result
+
+    async def update_dishes(
+        self,
+        target_menu_id: str,
+        target_submenu_id: str,
+        dishes: list[DishBulkUpdateSchema],
+    ) -> list[dict[str, str | bool | DishOutSchema | None]]:
+        result = await self.dish_repository.update_dishes(
+            target_menu_id=target_menu_id,
+            target_submenu_id=target_submenu_id,
+            dishes=dishes,
+        )
+        await self.invalidate_dishes(
+            target_menu_id,
+            target_submenu_id,
+            [str(item['id']) for item in result if item.get('status', True)],
+        )
+        return result
+
+    async def del_dishes(
+        self, target_menu_id: str, target_submenu_id: str, target_dish_ids: list[str]
+    ) -> list[dict[str, str | bool]]:
+        result = await self.dish_repository.del_dishes(
+            target_menu_id=target_menu_id,
+            target_submenu_id=target_submenu_id,
+            target_dish_ids=target_dish_ids,
+        )
+        await self.invalidate_dishes(
+            target_menu_id,
+            target_submenu_id,
+            [str(item['id']) for item in result if item.get('status', True)],
         )
         return result
@@ -1,19 +1,54 @@
+import asyncio
+
 from fastapi import APIRouter, FastAPI
 
-from .database import engine
+from .cache_local import listen_invalidations
+from .config import settings
+from .database import (
+    close_redis_pool,
+    engine,
+    get_async_redis_client,
+    get_redis_pool,
+)
+from .discounts import routes as routes_discounts
 from .dishes import routes as routes_dishes
 from .menus import routes as routes_menus
+from .metrics import MetricsMiddleware, instrument_engine
+from .monitoring import routes as routes_monitoring
+from .search import routes as routes_search
 from .submenus import routes as routes_submenus
 
 api_router = APIRouter()
 api_router.include_router(routes_menus.router)
 api_router.include_router(routes_submenus.router)
 api_router.include_router(routes_dishes.router)
+api_router.include_router(routes_search.router)
+api_router.include_router(routes_discounts.router)
+api_router.include_router(routes_monitoring.router)
 
 app = FastAPI(title='Menu_app')
 app.include_router(api_router, prefix='/api/v1')
+app.include_router(routes_monitoring.metrics_router)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+
+background_listeners: list[asyncio.Task] = []
+
+
+@app.on_event('startup')
+async def startup() -> None:
+    get_redis_pool()
+    if settings.cache_l1_enabled:
+        redis_client = await get_async_redis_client()
+        background_listeners.append(
+            asyncio.create_task(listen_invalidations(redis_client))
+        )
 
 
 @app.on_event('shutdown')
 async def shutdown() -> None:
+    for listener in background_listeners:
+        listener.cancel()
     await engine.dispose()
+    await close_redis_pool()
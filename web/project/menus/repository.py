@@ -1,106 +1,165 @@
-from typing import Any, Sequence
+from operator import attrgetter
+from typing import Any, AsyncIterator, Sequence
 
 from fastapi import Depends
 from project.database import get_db
 from project.models import Dish, Menu, Submenu
-from project.services_overal import get_dish_price_with_discount, validate_menu
-from sqlalchemy import Row, RowMapping, delete, distinct, func, insert, select, update
+from project.pagination import Page, get_page, paginate
+from project.services_overal import check_path, validate_menu
+from sqlalchemy import (
+    JSON,
+    String,
+    cast,
+    delete,
+    func,
+    insert,
+    literal_column,
+    select,
+    type_coerce,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from .schemas import MenuInSchema, MenuOutSchema
 
+MENUS_STREAM_CHUNK_SIZE = 50
+
+
+def json_array_of(**fields: Any) -> Any:
+    """json-массив объектов с полями fields, собранный postgres; [] вместо NULL"""
+    pairs = [item for name, value in fields.items() for item in (name, value)]
+    return func.coalesce(
+        func.json_agg(func.json_build_object(*pairs)),
+        literal_column("'[]'::json"),
+    )
+
+
+def menus_to_data(menus_q: Sequence[Menu]) -> list[dict[str, Any]]:
+    """Собирает данные дерева меню с подменю и блюдами, цены - со скидкой"""
+    menus = []
+    for menu in menus_q:
+        submenus = []
+        menu_data: dict[str, Any] = {
+            'id': menu.id,
+            'title': menu.title,
+            'description': menu.description,
+        }
+        for submenu in menu.submenus:
+            dishes = []
+            submenu_data: dict[str, Any] = {
+                'id': submenu.id,
+                'title': submenu.title,
+                'description': submenu.description,
+            }
+            for dish in submenu.dishes:
+                dish_data = {
+                    'id': dish.id,
+                    'title': dish.title,
+                    'description': dish.description,
+                    'price': str(dish.current_price),
+                }
+                dishes.append(dish_data)
+            submenu_data['dishes'] = dishes
+            submenus.append(submenu_data)
+        menu_data['submenus'] = submenus
+        menus.append(menu_data)
+    return menus
+
 
 class MenuRepository:
     def __init__(self, db: AsyncSession = Depends(get_db)):
         self.db = db
 
     async def read_menu(self, target_menu_id: str) -> MenuOutSchema:
-        await validate_menu(db=self.db, target_menu_id=target_menu_id)
-        q = (
-            select(
-                Menu,
-                func.count(distinct(Submenu.id)).label('submenus_count'),
-                func.count(distinct(Dish.id)).label('dishes_count'),
-            )
-            .where(Menu.id == target_menu_id)
-            .outerjoin(Submenu, Submenu.menu_id == Menu.id)
-            .outerjoin(Dish, Dish.submenu_id == Submenu.id)
-            .group_by(Menu.id)
-        )
-        res_q = await self.db.execute(q)
-        result = res_q.one_or_none()
+        res_q = await self.db.execute(select(Menu).where(Menu.id == target_menu_id))
+        menu = res_q.scalars().one_or_none()
+        check_path(menu)
         return MenuOutSchema(
-            id=result.Menu.id,
-            title=result.Menu.title,
-            description=result.Menu.description,
-            submenus_count=result.submenus_count,
-            dishes_count=result.dishes_count,
+            id=menu.id,
+            title=menu.title,
+            description=menu.description,
+            submenus_count=menu.submenus_count,
+            dishes_count=menu.dishes_count,
         )
 
-    async def read_menus(self) -> list[MenuOutSchema]:
-        q = (
-            select(
-                Menu,
-                func.count(distinct(Submenu.id)).label('submenus_count'),
-                func.count(distinct(Dish.id)).label('dishes_count'),
-            )
-            .outerjoin(Submenu, Menu.id == Submenu.menu_id)
-            .outerjoin(Dish, Dish.submenu_id == Submenu.id)
-            .group_by(Menu.id)
+    async def read_menus(self, limit: int, after_id: str | None) -> Page:
+        res_q = await self.db.execute(paginate(select(Menu), Menu.id, limit, after_id))
+        menus_result = res_q.scalars().all()
+        return get_page(
+            [
+                MenuOutSchema(
+                    id=menu.id,
+                    title=menu.title,
+                    description=menu.description,
+                    submenus_count=menu.submenus_count,
+                    dishes_count=menu.dishes_count,
+                )
+                for menu in menus_result
+            ],
+            limit,
+            get_id=attrgetter('id'),
         )
-        res_q = await self.db.execute(q)
-        menus_result = res_q.all()
-        return [
-            MenuOutSchema(
-                id=result.Menu.id,
-                title=result.Menu.title,
-                description=result.Menu.description,
-                submenus_count=result.submenus_count,
-                dishes_count=result.dishes_count,
-            )
-            for result in menus_result
-        ]
 
-    async def read_menus_whole(self) -> Sequence[Row | RowMapping | Any]:
+    async def read_menus_whole(self) -> list[dict[str, Any]]:
         q = select(Menu).options(
             selectinload(Menu.submenus).options(selectinload(Submenu.dishes))
         )
 
         res_q = await self.db.execute(q)
-        menus_q = res_q.scalars().all()
-        menus = []
-        for menu in menus_q:
-            submenus = []
-            menu_data = {
-                'id': menu.id,
-                'title': menu.title,
-                'description': menu.description,
-            }
-            for submenu in menu.submenus:
-                dishes = []
-                submenu_data = {
-                    'id': submenu.id,
-                    'title': submenu.title,
-                    'description': submenu.description,
-                }
-                for dish in submenu.dishes:
-                    dish_price = await get_dish_price_with_discount(
-                        dish_id=dish.id, dish_price=dish.price
-                    )
-                    dish_data = {
-                        'id': dish.id,
-                        'title': dish.title,
-                        'description': dish.description,
-                        'price': dish_price,
-                    }
-                    dishes.append(dish_data)
-                submenu_data['dishes'] = dishes
-                submenus.append(submenu_data)
-            menu_data['submenus'] = submenus
-            menus.append(menu_data)
-
-        return menus
+        return menus_to_data(res_q.scalars().all())
+
+    async def stream_menus_whole(
+        self, chunk_size: int = MENUS_STREAM_CHUNK_SIZE
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """Отдает дерево меню частями по chunk_size меню через серверный курсор"""
+        q = (
+            select(Menu)
+            .options(selectinload(Menu.submenus).options(selectinload(Submenu.dishes)))
+            .execution_options(yield_per=chunk_size)
+        )
+        res_q = await self.db.stream_scalars(q)
+        async for menus_q in res_q.partitions():
+            yield menus_to_data(menus_q)
+
+    async def read_menus_whole_sql(self) -> list[dict[str, Any]]:
+        dishes_json = (
+            select(
+                json_array_of(
+                    id=Dish.id,
+                    title=Dish.title,
+                    description=Dish.description,
+                    price=cast(Dish.current_price, String),
+                )
+            )
+            .where(Dish.submenu_id == Submenu.id)
+            .scalar_subquery()
+        )
+        submenus_json = (
+            select(
+                json_array_of(
+                    id=Submenu.id,
+                    title=Submenu.title,
+                    description=Submenu.description,
+                    dishes=dishes_json,
+                )
+            )
+            .where(Submenu.menu_id == Menu.id)
+            .scalar_subquery()
+        )
+        menus_json = select(
+            type_coerce(
+                json_array_of(
+                    id=Menu.id,
+                    title=Menu.title,
+                    description=Menu.description,
+                    submenus=submenus_json,
+                ),
+                JSON,
+            )
+        )
+        res_q = await self.db.execute(menus_json)
+        return res_q.scalar_one()
 
     async def create_menu(self, menu: MenuInSchema) -> MenuOutSchema:
         insert_menu_query = await self.db.execute(
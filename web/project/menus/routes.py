@@ -6,8 +6,11 @@ routes.py
 """
 from typing import Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import StreamingResponse
+from project.pagination import PageParams
 from project.schemas_overal import CorrectDeleteSchema, NotFoundSchema
+from project.versions import ConditionalGet
 
 from .schemas import MenuFullListOutSchema, MenuInSchema, MenuOutSchema
 from .services import MenuService
@@ -25,7 +28,8 @@ router = APIRouter(prefix='/menus', tags=['Menus'])
 async def get_menu_handler(
     target_menu_id: str,
     response: MenuService = Depends(),
-) -> MenuOutSchema:
+    conditional: ConditionalGet = Depends(),
+) -> MenuOutSchema | Response:
     """
     Эндпоинт возвращает меню по идентификатору или сообщение об ошибке
     \f
@@ -33,12 +37,15 @@ async def get_menu_handler(
         Идентификатор меню в БД
     :param response: MenuService
          Обьект ответа на запрос из сервиса меню
+    :param conditional: ConditionalGet
+         Проверка If-None-Match по версии ресурса
 
     :return: Union[MenuOutSchema, NotFoundSchema]
         Pydantic-схема для фронтенда с меню или ошибкой
 
     """
-
+    if await conditional.is_not_modified(target_menu_id):
+        return conditional.not_modified_response()
     return await response.read_menu(target_menu_id=target_menu_id)
 
 
@@ -51,18 +58,27 @@ async def get_menu_handler(
 )
 async def get_menus_handler(
     response: MenuService = Depends(),
-) -> list[MenuOutSchema]:
+    conditional: ConditionalGet = Depends(),
+    page: PageParams = Depends(),
+) -> list[MenuOutSchema] | Response:
     """
-    Эндпоинт возвращает все меню
+    Эндпоинт возвращает страницу меню по порядку id
     \f
     :param response: MenuService
          Обьект ответа на запрос из сервиса меню
+    :param conditional: ConditionalGet
+         Проверка If-None-Match по версии ресурса
+    :param page: PageParams
+         Размер страницы и курсор, курсор следующей страницы - в X-Next-Cursor
 
     :return: List[MenuOutSchema]
         Pydantic-схема для фронтенда с меню
     """
-
-    return await response.read_menus()
+    if await conditional.is_not_modified():
+        return conditional.not_modified_response()
+    return page.get_items(
+        await response.read_menus(limit=page.limit, after_id=page.after_id)
+    )
 
 
 @router.post(
@@ -154,14 +170,51 @@ async def delete_menu_handler(
 )
 async def get_menus_whole_handler(
     response: MenuService = Depends(),
-) -> MenuFullListOutSchema:
+    conditional: ConditionalGet = Depends(),
+) -> MenuFullListOutSchema | Response:
     """
     Эндпоинт возвращает все меню с подменю и блюдами
     \f
     :param response: MenuService
          Обьект ответа на запрос из сервиса меню
+    :param conditional: ConditionalGet
+         Проверка If-None-Match по версии ресурса
 
     :return: MenuFullListOutSchema
         Pydantic-схема для фронтенда с меню с подменю и блюдами
     """
+    if await conditional.is_not_modified():
+        return conditional.not_modified_response()
     return await response.read_menus_whole()
+
+
+@router.get(
+    '/whole/stream',
+    summary='Потоковое получение всех меню с подменю и блюдами',
+    response_description='список меню с подменю и блюдами',
+    response_model=MenuFullListOutSchema,
+    response_class=StreamingResponse,
+    status_code=200,
+)
+async def get_menus_whole_stream_handler(
+    response: MenuService = Depends(),
+    conditional: ConditionalGet = Depends(),
+) -> Response:
+    """
+    Эндпоинт возвращает все меню с подменю и блюдами, формируя json по частям
+    \f
+    :param response: MenuService
+         Обьект ответа на запрос из сервиса меню
+    :param conditional: ConditionalGet
+         Проверка If-None-Match по версии ресурса
+
+    :return: StreamingResponse
+        Поток json с меню с подменю и блюдами
+    """
+    if await conditional.is_not_modified():
+        return conditional.not_modified_response()
+    return StreamingResponse(
+        response.stream_menus_whole(),
+        media_type='application/json',
+        headers=conditional.headers,
+    )
@@ -1,7 +1,14 @@
+import json
+from functools import partial
+from typing import AsyncIterator
+
 import redis.asyncio as redis
 from fastapi import BackgroundTasks, Depends
+from project.config import settings
 from project.database import get_async_redis_client
+from project.pagination import Page, get_page_key
 from project.service_redis import AsyncRedisCache
+from project.versions import EntityVersions, get_version_paths
 
 from .repository import MenuRepository
 from .schemas import MenuFullListOutSchema, MenuInSchema, MenuOutSchema
@@ -16,43 +23,43 @@ class MenuService:
     ):
         self.menu_repository = menu_repository
         self.cache = AsyncRedisCache(redis_client)
+        self.versions = EntityVersions(redis_client)
         self.background_tasks = background_tasks
 
     async def read_menu(self, target_menu_id: str) -> MenuOutSchema:
-        data = await self.cache.get_data_from_cache(key=target_menu_id)
-        if data is not None:
-            return data
-        result = await self.menu_repository.read_menu(target_menu_id=target_menu_id)
-        await self.cache.set_data_to_cache(
-            key=target_menu_id, value=result, background_tasks=self.background_tasks
+        return await self.cache.get_or_load(
+            key=target_menu_id,
+            loader=partial(
+                self.menu_repository.read_menu, target_menu_id=target_menu_id
+            ),
         )
-        return result
 
-    async def read_menus(self) -> list[MenuOutSchema]:
-        data = await self.cache.get_data_from_cache(key='all_menus')
-        if data is not None:
-            return data
-        result = await self.menu_repository.read_menus()
-        await self.cache.set_data_to_cache(
-            key='all_menus', value=result, background_tasks=self.background_tasks
+    async def read_menus(self, limit: int, after_id: str | None) -> Page:
+        return await self.cache.get_or_load(
+            key=get_page_key('all_menus', limit, after_id),
+            loader=partial(
+                self.menu_repository.read_menus, limit=limit, after_id=after_id
+            ),
         )
-        return result
 
     async def create_menu(self, menu: MenuInSchema) -> MenuOutSchema:
         result = await self.menu_repository.create_menu(menu=menu)
         await self.cache.delete_data_from_cache(
-            'all_menus', 'all_menus_whole', background_tasks=self.background_tasks
+            'all_menus_whole', background_tasks=None
         )
+        await self.cache.clear_namespace_from_cache('all_menus', background_tasks=None)
+        await self.versions.bump(*get_version_paths())
         return result
 
     async def del_menu(self, target_menu_id: str) -> dict[str, str | bool]:
         result = await self.menu_repository.del_menu(target_menu_id=target_menu_id)
         await self.cache.delete_data_from_cache(
-            'all_menus', 'all_menus_whole', background_tasks=self.background_tasks
+            'all_menus_whole', background_tasks=None
         )
         await self.cache.clear_namespace_from_cache(
-            target_menu_id, background_tasks=self.background_tasks
+            'all_menus', target_menu_id, background_tasks=None
         )
+        await self.versions.bump(*get_version_paths(target_menu_id))
         return result
 
     async def update_menu(
@@ -62,22 +69,33 @@ class MenuService:
             target_menu_id=target_menu_id, menu=menu
         )
         await self.cache.delete_data_from_cache(
-            target_menu_id,
-            'all_menus',
-            'all_menus_whole',
-            background_tasks=self.background_tasks,
+            target_menu_id, 'all_menus_whole', background_tasks=None
         )
+        await self.cache.clear_namespace_from_cache('all_menus', background_tasks=None)
+        await self.versions.bump(*get_version_paths(target_menu_id))
         return changed_menu
 
     async def read_menus_whole(self) -> MenuFullListOutSchema:
-        data = await self.cache.get_data_from_cache(key='all_menus_whole')
-        if data is not None:
-            return data
-        result = await self.menu_repository.read_menus_whole()
-        all_menus_whole = MenuFullListOutSchema(menus=result)
-        await self.cache.set_data_to_cache(
-            key='all_menus_whole',
-            value=all_menus_whole,
-            background_tasks=self.background_tasks,
+        return await self.cache.get_or_load(
+            key='all_menus_whole', loader=self._load_menus_whole
         )
-        return all_menus_whole
+
+    async def _load_menus_whole(self) -> MenuFullListOutSchema:
+        if settings.menus_whole_mode == 'sql':
+            result = await self.menu_repository.read_menus_whole_sql()
+            return MenuFullListOutSchema.construct(menus=result)
+        result = await self.menu_repository.read_menus_whole()
+        return MenuFullListOutSchema(menus=result)
+
+    async def stream_menus_whole(self) -> AsyncIterator[bytes]:
+        """
+        Отдает json дерева меню по частям, не собирая его целиком в памяти.
+        Кеш не используется: закешированное дерево хранится целиком.
+        """
+        yield b'{"menus":['
+        separator = b''
+        async for menus in self.menu_repository.stream_menus_whole():
+            for menu in menus:
+                yield separator + json.dumps(menu, ensure_ascii=False).encode()
+                separator = b','
+        yield b']}'
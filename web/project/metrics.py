@@ -0,0 +1,468 @@
+"""
+metrics.py
+----------
+Модуль собирает метрики запросов к API и отдает их в текстовом формате
+Prometheus для эндпоинта /metrics.
+
+ASGI-middleware MetricsMiddleware считает по маршрутам (шаблонам путей,
+а не самим путям) гистограммы времени ответа, количество ответов по кодам
+и число запросов, обрабатываемых сейчас. Время запросов к postgres и redis
+внутри запроса копится в RequestTimings текущего запроса через contextvar:
+для postgres - события cursor_execute движка, для redis - клиент TimedRedis,
+которым пользуются AsyncRedisCache и версии сущностей. Вне запроса к API
+(celery, скрипты) хуки ничего не считают.
+
+Кроме времени считается количество sql-запросов. Если один и тот же текст
+запроса выполнился за запрос к API n_plus_one_threshold раз и больше,
+это вероятный N+1: в лог пишется предупреждение и растет счетчик маршрута.
+С debug_query_headers количество запросов и время postgres и redis
+отдаются в заголовках ответа X-DB-Queries и Server-Timing.
+
+Вместе с метриками запросов отдаются счетчики кеша по семействам ключей
+из cache_stats и загрузка пула соединений с postgres: TimedQueuePool
+считает выдачи соединений, их время (ожидание свободного соединения,
+открытие нового и pre-ping) и выдачи, не дождавшиеся соединения.
+
+Метрики хранятся в памяти процесса: каждый процесс сервера отдает свои.
+
+"""
+
+import contextvars
+import logging
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Callable
+
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .cache_stats import CacheStats, cache_stats
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'menu_app'
+# границы корзин гистограмм в секундах, как у клиентов Prometheus по умолчанию
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# границы корзин гистограммы количества sql-запросов за запрос к API
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+# границы корзин гистограммы времени выдачи соединения из пула postgres
+POOL_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+# счетчики кеша по семействам ключей: атрибут CacheFamilyStats и описание
+CACHE_COUNTERS = (
+    ('local_hits', 'Process cache hits'),
+    ('hits', 'Redis cache hits'),
+    ('misses', 'Cache misses'),
+    ('sets', 'Values written to redis'),
+    ('invalidations', 'Invalidated keys and namespaces'),
+    ('read_bytes', 'Bytes of values read from redis'),
+    ('written_bytes', 'Bytes of values written to redis'),
+    ('get_seconds', 'Time spent reading values from redis'),
+    ('decode_seconds', 'Time spent decoding values'),
+)
+# маршрут запросов, не попавших ни в один эндпоинт
+UNMATCHED_ROUTE = 'unmatched'
+QUERY_STARTED_KEY = 'metrics_query_started'
+
+
+@dataclass
+class RequestTimings:
+    """
+    время запросов к postgres и redis, накопленное одним запросом к API,
+    и сколько раз выполнился каждый текст sql-запроса
+    """
+
+    db: float = 0.0
+    redis: float = 0.0
+    db_queries: int = 0
+    statements: dict[str, int] = field(default_factory=dict)
+
+    def get_most_repeated(self) -> tuple[str, int]:
+        """самый частый текст sql-запроса и сколько раз он выполнился"""
+        if not self.statements:
+            return '', 0
+        statement = max(self.statements, key=self.statements.__getitem__)
+        return statement, self.statements[statement]
+
+
+current_timings: contextvars.ContextVar[RequestTimings | None] = contextvars.ContextVar(
+    'request_timings', default=None
+)
+
+
+class Histogram:
+    """количество значений по корзинам buckets и их сумма"""
+
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class RouteMetrics:
+    """гистограммы запросов одного маршрута"""
+
+    __slots__ = ('durations', 'db_durations', 'redis_durations', 'db_queries')
+
+    def __init__(self) -> None:
+        self.durations = Histogram()
+        self.db_durations = Histogram()
+        self.redis_durations = Histogram()
+        self.db_queries = Histogram(QUERY_BUCKETS)
+
+
+class RequestMetrics:
+    """метрики запросов процесса по (метод, маршрут)"""
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.responses: dict[tuple[str, str, int], int] = {}
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+        self.n_plus_one: dict[tuple[str, str], int] = {}
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        timings: RequestTimings,
+    ) -> None:
+        labels = (method, route)
+        status_labels = (method, route, status)
+        self.responses[status_labels] = self.responses.get(status_labels, 0) + 1
+        route_metrics = self.routes.get(labels)
+        if route_metrics is None:
+            route_metrics = self.routes[labels] = RouteMetrics()
+        route_metrics.durations.observe(seconds)
+        route_metrics.db_durations.observe(timings.db)
+        route_metrics.redis_durations.observe(timings.redis)
+        route_metrics.db_queries.observe(timings.db_queries)
+        threshold = settings.n_plus_one_threshold
+        # повторов не больше, чем запросов: обычно дальше проверять нечего
+        if not threshold or timings.db_queries < threshold:
+            return
+        statement, repeated = timings.get_most_repeated()
+        if repeated >= threshold:
+            self.n_plus_one[labels] = self.n_plus_one.get(labels, 0) + 1
+            logger.warning(
+                'possible N+1 in %s %s: query ran %s times: %s',
+                method,
+                route,
+                repeated,
+                statement,
+            )
+
+    def clear(self) -> None:
+        self.responses.clear()
+        self.routes.clear()
+        self.n_plus_one.clear()
+
+
+request_metrics = RequestMetrics()
+
+
+def on_before_cursor_execute(
+    connection: Any, cursor: Any, statement: str, *args: Any
+) -> None:
+    timings = current_timings.get()
+    if timings is not None:
+        timings.db_queries += 1
+        timings.statements[statement] = timings.statements.get(statement, 0) + 1
+        connection.info[QUERY_STARTED_KEY] = perf_counter()
+
+
+def on_after_cursor_execute(connection: Any, *args: Any) -> None:
+    started = connection.info.pop(QUERY_STARTED_KEY, None)
+    timings = current_timings.get()
+    if started is not None and timings is not None:
+        timings.db += perf_counter() - started
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """подключает к движку подсчет количества и времени sql-запросов"""
+    event.listen(engine.sync_engine, 'before_cursor_execute', on_before_cursor_execute)
+    event.listen(engine.sync_engine, 'after_cursor_execute', on_after_cursor_execute)
+
+
+class PoolStats:
+    """выдачи соединений из пула postgres процесса"""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.checkout_seconds = Histogram(POOL_BUCKETS)
+
+    def clear(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.checkout_seconds = Histogram(POOL_BUCKETS)
+
+
+db_pool_stats = PoolStats()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """пул соединений postgres, который считает выдачи соединений и их время"""
+
+    def connect(self) -> Any:
+        started = perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            db_pool_stats.timeouts += 1
+            raise
+        db_pool_stats.checkouts += 1
+        db_pool_stats.checkout_seconds.observe(perf_counter() - started)
+        return connection
+
+
+class TimedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        timings = current_timings.get()
+        if timings is None:
+            return await super().execute(raise_on_error)
+        started = perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            timings.redis += perf_counter() - started
+
+
+class TimedRedis(redis.Redis):
+    """клиент redis, который добавляет время команд к текущему запросу к API"""
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        timings = current_timings.get()
+        if timings is None:
+            return await super().execute_command(*args, **options)
+        started = perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            timings.redis += perf_counter() - started
+
+    def pipeline(
+        self, transaction: bool = True, shard_hint: str | None = None
+    ) -> TimedPipeline:
+        return TimedPipeline(
+            self.connection_pool, self.response_callbacks, transaction, shard_hint
+        )
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware метрик запросов. Запрос учитывается, когда отправлено
+    тело ответа: фоновые задачи после ответа в его время не входят.
+    Необработанное исключение учитывается как ответ 500
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+        self.route_paths: dict[Callable, str] = {}
+
+    def get_route(self, scope: Scope) -> str:
+        """шаблон пути эндпоинта, выбранного роутером для запроса"""
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        route = self.route_paths.get(endpoint)
+        if route is None:
+            self.route_paths = {
+                app_route.endpoint: app_route.path
+                for app_route in scope['app'].routes
+                if hasattr(app_route, 'endpoint')
+            }
+            route = self.route_paths.setdefault(endpoint, UNMATCHED_ROUTE)
+        return route
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        metrics = self.metrics
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        started = perf_counter()
+        status = 500
+        finished = False
+        metrics.in_flight += 1
+
+        def finish() -> None:
+            nonlocal finished
+            finished = True
+            metrics.in_flight -= 1
+            metrics.observe(
+                scope['method'],
+                self.get_route(scope),
+                status,
+                perf_counter() - started,
+                timings,
+            )
+
+        async def send_with_metrics(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if settings.debug_query_headers:
+                    message = {
+                        **message,
+                        'headers': [
+                            *message.get('headers', []),
+                            *get_debug_headers(timings),
+                        ],
+                    }
+            await send(message)
+            if message['type'] == 'http.response.body' and not finished:
+                if not message.get('more_body', False):
+                    finish()
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if not finished:
+                finish()
+            current_timings.reset(token)
+
+
+def get_debug_headers(timings: RequestTimings) -> list[tuple[bytes, bytes]]:
+    """
+    заголовки с количеством sql-запросов и временем postgres и redis до
+    начала ответа; запросы потокового ответа после его начала не входят
+    """
+    return [
+        (b'x-db-queries', str(timings.db_queries).encode()),
+        (
+            b'server-timing',
+            f'db;dur={timings.db * 1000:.2f}, redis;dur={timings.redis * 1000:.2f}'.encode(),
+        ),
+    ]
+
+
+def render_histogram(
+    lines: list[str], name: str, labels: str, histogram: Histogram
+) -> None:
+    bucket_labels = f'{labels},' if labels else ''
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{bucket_labels}le="{bound}"}} {cumulative}')
+    cumulative += histogram.counts[-1]
+    lines.append(f'{name}_bucket{{{bucket_labels}le="+Inf"}} {cumulative}')
+    labels = f'{{{labels}}}' if labels else ''
+    lines.append(f'{name}_sum{labels} {histogram.sum}')
+    lines.append(f'{name}_count{labels} {cumulative}')
+
+
+def render_histograms(
+    lines: list[str],
+    name: str,
+    help_text: str,
+    routes: dict[tuple[str, str], RouteMetrics],
+    attribute: str,
+) -> None:
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for (method, route), route_metrics in sorted(routes.items()):
+        render_histogram(
+            lines,
+            name,
+            f'method="{method}",route="{route}"',
+            getattr(route_metrics, attribute),
+        )
+
+
+def render_cache_counters(lines: list[str], stats: CacheStats) -> None:
+    families = sorted(stats.families.items())
+    for attribute, help_text in CACHE_COUNTERS:
+        name = f'{PREFIX}_cache_{attribute}_total'
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for family, family_stats in families:
+            value = getattr(family_stats, attribute)
+            lines.append(f'{name}{{family="{family}"}} {value}')
+
+
+def render_pool(lines: list[str], pool: QueuePool, stats: PoolStats) -> None:
+    name = f'{PREFIX}_db_pool'
+    for gauge, help_text, value in (
+        ('size', 'Persistent connections of the pool', pool.size()),
+        ('checked_out', 'Connections in use', pool.checkedout()),
+        ('checked_in', 'Idle connections in the pool', pool.checkedin()),
+        ('overflow', 'Connections opened over the pool size', max(pool.overflow(), 0)),
+    ):
+        lines.append(f'# HELP {name}_{gauge} {help_text}')
+        lines.append(f'# TYPE {name}_{gauge} gauge')
+        lines.append(f'{name}_{gauge} {value}')
+    for counter, help_text, value in (
+        ('checkouts', 'Connections handed out', stats.checkouts),
+        ('timeouts', 'Checkouts that timed out waiting', stats.timeouts),
+    ):
+        lines.append(f'# HELP {name}_{counter}_total {help_text}')
+        lines.append(f'# TYPE {name}_{counter}_total counter')
+        lines.append(f'{name}_{counter}_total {value}')
+    lines.append(f'# HELP {name}_checkout_seconds Time to hand out a connection')
+    lines.append(f'# TYPE {name}_checkout_seconds histogram')
+    render_histogram(lines, f'{name}_checkout_seconds', '', stats.checkout_seconds)
+
+
+def render_metrics(
+    metrics: RequestMetrics = request_metrics,
+    stats: CacheStats = cache_stats,
+    pool: Pool | None = None,
+) -> str:
+    """
+    метрики запросов, кеша и, если передан пул postgres pool с очередью
+    соединений, его загрузки в текстовом формате Prometheus
+    """
+    lines = [
+        f'# HELP {PREFIX}_http_requests_in_flight Requests being processed',
+        f'# TYPE {PREFIX}_http_requests_in_flight gauge',
+        f'{PREFIX}_http_requests_in_flight {metrics.in_flight}',
+        f'# HELP {PREFIX}_http_responses_total Responses by route and status',
+        f'# TYPE {PREFIX}_http_responses_total counter',
+    ]
+    for (method, route, status), count in sorted(metrics.responses.items()):
+        lines.append(
+            f'{PREFIX}_http_responses_total'
+            f'{{method="{method}",route="{route}",status="{status}"}} {count}'
+        )
+    for name, help_text, attribute in (
+        ('http_request_duration_seconds', 'Response time', 'durations'),
+        ('http_request_db_seconds', 'Postgres query time per request', 'db_durations'),
+        (
+            'http_request_redis_seconds',
+            'Redis command time per request',
+            'redis_durations',
+        ),
+        ('http_request_db_queries', 'Postgres queries per request', 'db_queries'),
+    ):
+        render_histograms(
+            lines, f'{PREFIX}_{name}', help_text, metrics.routes, attribute
+        )
+    lines.append(
+        f'# HELP {PREFIX}_http_n_plus_one_total'
+        ' Requests that repeated one query n_plus_one_threshold times or more'
+    )
+    lines.append(f'# TYPE {PREFIX}_http_n_plus_one_total counter')
+    for (method, route), count in sorted(metrics.n_plus_one.items()):
+        lines.append(
+            f'{PREFIX}_http_n_plus_one_total{{method="{method}",route="{route}"}}'
+            f' {count}'
+        )
+    render_cache_counters(lines, stats)
+    if isinstance(pool, QueuePool):
+        render_pool(lines, pool, db_pool_stats)
+    return '\n'.join(lines) + '\n'
@@ -1,21 +1,95 @@
 import uuid
-
-from sqlalchemy import DECIMAL, Column, ForeignKey, String
-from sqlalchemy.orm import relationship
+from typing import Any
+
+from sqlalchemy import (
+    DDL,
+    DECIMAL,
+    Boolean,
+    CheckConstraint,
+    Column,
+    Connection,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    event,
+    func,
+    literal_column,
+    text,
+)
+from sqlalchemy.orm import column_property, relationship
+from sqlalchemy.sql.elements import ColumnElement
 
 from .database import Base
 
+# конфигурация полнотекстового поиска по блюдам
+SEARCH_TS_CONFIG = 'russian'
+
 
 def generate_uuid() -> str:
     return str(uuid.uuid4())
 
 
+def get_search_document(title: ColumnElement, description: ColumnElement) -> Any:
+    """
+    tsvector названия и описания блюда. Константы - литералы, а не параметры:
+    выражение в запросе должно совпадать с выражением индекса ix_dishes_search
+    """
+    title_text = func.coalesce(title, literal_column("''"))
+    description_text = func.coalesce(description, literal_column("''"))
+    return func.to_tsvector(
+        literal_column(f"'{SEARCH_TS_CONFIG}'::regconfig"),
+        title_text + literal_column("' '") + description_text,
+    )
+
+
+def has_pg_trgm(
+    ddl: Any,
+    target: Any,
+    bind: Connection | None,
+    tables: Any = None,
+    state: Any = None,
+    **kwargs: Any,
+) -> bool:
+    """
+    Создавать ли триграммный индекс: без соединения (генерация миграции) - да,
+    иначе - если на сервере установлено расширение pg_trgm
+    """
+    if bind is None:
+        return True
+    return bool(
+        bind.exec_driver_sql(
+            "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+        ).scalar()
+    )
+
+
+def is_pg_trgm_available(
+    ddl: Any,
+    target: Any,
+    bind: Connection | None,
+    tables: Any = None,
+    state: Any = None,
+    **kwargs: Any,
+) -> bool:
+    if bind is None:
+        return True
+    return bool(
+        bind.exec_driver_sql(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        ).scalar()
+    )
+
+
 class Menu(Base):
     __tablename__: str = 'menus'
 
     id = Column(String, primary_key=True, default=generate_uuid)
     title = Column(String, index=True)
-    description = Column(String, index=True)
+    description = Column(String)
+    submenus_count = Column(Integer, nullable=False, default=0, server_default='0')
+    dishes_count = Column(Integer, nullable=False, default=0, server_default='0')
 
     submenus = relationship(
         'Submenu',
@@ -27,11 +101,14 @@ class Menu(Base):
 
 class Submenu(Base):
     __tablename__: str = 'submenus'
+    # страницы подменю меню по порядку id, заменяет индекс по menu_id
+    __table_args__ = (Index('ix_submenus_menu_id_id', 'menu_id', 'id'),)
 
     id = Column(String, primary_key=True, default=generate_uuid)
     title = Column(String, index=True)
-    description = Column(String, index=True)
-    menu_id = Column(ForeignKey('menus.id', ondelete='CASCADE'), index=True)
+    description = Column(String)
+    menu_id = Column(ForeignKey('menus.id', ondelete='CASCADE'))
+    dishes_count = Column(Integer, nullable=False, default=0, server_default='0')
 
     menu = relationship('Menu', back_populates='submenus')
 
@@ -47,11 +124,90 @@ class Dish(Base):
     __tablename__: str = 'dishes'
 
     id = Column(String, primary_key=True, default=generate_uuid)
-    title = Column(String, index=True)
-    description = Column(String, index=True)
+    title = Column(String)
+    description = Column(String)
     price = Column(
         DECIMAL(scale=2, precision=32, asdecimal=True, decimal_return_scale=2)
     )
-    submenu_id = Column(ForeignKey('submenus.id', ondelete='CASCADE'), index=True)
+    submenu_id = Column(ForeignKey('submenus.id', ondelete='CASCADE'))
+    # цена с действующей скидкой, NULL - скидки нет; пересчитывается
+    # project.prices при изменении цены, правил скидок и их сроков
+    effective_price = Column(
+        DECIMAL(scale=2, precision=32, asdecimal=True, decimal_return_scale=2)
+    )
+    # цена для ответов API - читается из БД без расчетов
+    current_price = column_property(func.coalesce(effective_price, price))
+
+    __table_args__ = (
+        # страницы блюд подменю по порядку id, заменяет индекс по submenu_id
+        Index('ix_dishes_submenu_id_id', 'submenu_id', 'id'),
+        # полнотекстовый поиск по названию и описанию блюда
+        Index(
+            'ix_dishes_search',
+            get_search_document(title, description),
+            postgresql_using='gin',
+        ),
+        # поиск подстроки и префикса названия блюда (ILIKE) по триграммам
+        Index(
+            'ix_dishes_title_trgm',
+            title,
+            postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'},
+        ).ddl_if(callable_=has_pg_trgm),
+    )
 
     submenu = relationship('Submenu', back_populates='dishes')
+
+
+class DiscountRule(Base):
+    """
+    Скидка в процентах на блюдо, все блюда подменю или все блюда меню,
+    действующая с starts_at до ends_at; пустая граница - без ограничения.
+    Если на блюдо действует несколько правил, берется наибольшая скидка
+    """
+
+    __tablename__: str = 'discount_rules'
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    menu_id = Column(ForeignKey('menus.id', ondelete='CASCADE'), index=True)
+    submenu_id = Column(ForeignKey('submenus.id', ondelete='CASCADE'), index=True)
+    dish_id = Column(ForeignKey('dishes.id', ondelete='CASCADE'), index=True)
+    percent = Column(DECIMAL(scale=2, precision=5, asdecimal=True), nullable=False)
+    # по срокам периодическая задача находит правила, начавшие или
+    # закончившие действовать с ее прошлого запуска
+    starts_at = Column(DateTime(timezone=True), index=True)
+    ends_at = Column(DateTime(timezone=True), index=True)
+    # скидка из столбца скидок файла админской синхронизации
+    from_sheet = Column(Boolean, nullable=False, default=False, server_default='false')
+
+    __table_args__ = (
+        CheckConstraint(
+            'num_nonnulls(menu_id, submenu_id, dish_id) = 1',
+            name='ck_discount_rules_target',
+        ),
+        CheckConstraint(
+            'percent > 0 AND percent <= 100', name='ck_discount_rules_percent'
+        ),
+        CheckConstraint(
+            'starts_at IS NULL OR ends_at IS NULL OR starts_at < ends_at',
+            name='ck_discount_rules_window',
+        ),
+        # у блюда не больше одной скидки из файла
+        Index(
+            'ux_discount_rules_sheet_dish_id',
+            'dish_id',
+            unique=True,
+            postgresql_where=text('from_sheet'),
+        ),
+    )
+
+
+# расширение создается, если сервер его поставляет; без него триграммного
+# индекса нет и поиск по названию идет без индекса
+event.listen(
+    Base.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(
+        callable_=is_pg_trgm_available
+    ),
+)
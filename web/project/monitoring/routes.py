@@ -0,0 +1,159 @@
+"""
+routes.py
+----------
+Модуль реализует служебные эндпоинты FastApi для наблюдения за работой сервиса.
+
+"""
+
+from typing import Any
+
+import redis.asyncio as redis
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from project.admin_sync_state import get_sync_stats
+from project.cache_local import local_cache
+from project.cache_stats import cache_stats
+from project.config import settings
+from project.database import (
+    engine,
+    get_async_redis_client,
+    get_db_pool_stats,
+    get_redis_pool_stats,
+)
+from project.metrics import render_metrics
+from project.service_redis import redis_tier_stats
+
+from .schemas import (
+    AdminSyncStatsSchema,
+    CacheFamiliesStatsSchema,
+    CacheTiersStatsSchema,
+    DbPoolStatsSchema,
+    RedisPoolStatsSchema,
+)
+
+router = APIRouter(prefix='/monitoring', tags=['Monitoring'])
+# /metrics подключается к приложению без префикса API, как ждет Prometheus
+metrics_router = APIRouter(tags=['Monitoring'])
+
+
+@router.get(
+    '/redis_pool',
+    summary='Загрузка пула соединений с redis',
+    response_description='Данные о пуле соединений',
+    response_model=RedisPoolStatsSchema,
+    status_code=200,
+)
+async def get_redis_pool_stats_handler() -> dict[str, int]:
+    """
+    Эндпоинт возвращает данные о загрузке пула соединений с redis
+    \f
+    :return: RedisPoolStatsSchema
+        Pydantic-схема с данными о пуле соединений
+    """
+    return get_redis_pool_stats()
+
+
+@router.get(
+    '/db_pool',
+    summary='Загрузка пула соединений с postgres',
+    response_description='Данные о пуле соединений',
+    response_model=DbPoolStatsSchema,
+    status_code=200,
+)
+async def get_db_pool_stats_handler() -> dict[str, int | float]:
+    """
+    Эндпоинт возвращает данные о загрузке пула соединений с postgres
+    \f
+    :return: DbPoolStatsSchema
+        Pydantic-схема с данными о пуле соединений
+    """
+    return get_db_pool_stats()
+
+
+def get_tier_stats(hits: int, misses: int) -> dict[str, int | float]:
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0}
+
+
+@router.get(
+    '/cache_tiers',
+    summary='Попадания в кеш процесса и в redis',
+    response_description='Данные о попаданиях в кеш',
+    response_model=CacheTiersStatsSchema,
+    status_code=200,
+)
+async def get_cache_tiers_stats_handler() -> dict[str, Any]:
+    """
+    Эндпоинт возвращает количество попаданий и промахов по уровням кеша
+    \f
+    :return: CacheTiersStatsSchema
+        Pydantic-схема с данными о попаданиях в кеш
+    """
+    return {
+        'local_enabled': settings.cache_l1_enabled,
+        'local_size': len(local_cache.data),
+        'local': get_tier_stats(local_cache.hits, local_cache.misses),
+        'redis': get_tier_stats(redis_tier_stats['hits'], redis_tier_stats['misses']),
+    }
+
+
+@router.get(
+    '/cache_families',
+    summary='Статистика кеша по семействам ключей',
+    response_description='Данные о кеше по семействам ключей',
+    response_model=CacheFamiliesStatsSchema,
+    status_code=200,
+)
+async def get_cache_families_stats_handler() -> dict[str, Any]:
+    """
+    Эндпоинт возвращает по семействам ключей кеша попадания, промахи,
+    записи, сбросы, объем значений и время чтения и декодирования
+    \f
+    :return: CacheFamiliesStatsSchema
+        Pydantic-схема со статистикой кеша по семействам ключей
+    """
+    return {'families': cache_stats.as_dict()}
+
+
+@router.get(
+    '/admin_sync',
+    summary='Запуски синхронизации меню с файлом',
+    response_description='Данные о запусках синхронизации',
+    response_model=AdminSyncStatsSchema,
+    status_code=200,
+)
+async def get_admin_sync_stats_handler(
+    redis_client: redis.Redis = Depends(get_async_redis_client),
+) -> dict[str, Any]:
+    """
+    Эндпоинт возвращает количество и время примененных и пропущенных
+    запусков синхронизации меню с google sheets или Excel
+    \f
+    :param redis_client: redis.Redis
+        Клиент redis, в котором хранится статистика
+
+    :return: AdminSyncStatsSchema
+        Pydantic-схема с данными о запусках синхронизации
+    """
+    return await get_sync_stats(redis_client)
+
+
+@metrics_router.get(
+    '/metrics',
+    summary='Метрики запросов в формате Prometheus',
+    response_class=PlainTextResponse,
+    status_code=200,
+)
+async def get_metrics_handler() -> PlainTextResponse:
+    """
+    Эндпоинт возвращает метрики запросов к API этого процесса: время ответа,
+    время запросов к postgres и redis по маршрутам, ответы по кодам, число
+    обрабатываемых запросов и загрузку пула соединений с postgres
+    \f
+    :return: PlainTextResponse
+        Метрики в текстовом формате Prometheus
+    """
+    return PlainTextResponse(
+        render_metrics(pool=engine.pool),
+        media_type='text/plain; version=0.0.4; charset=utf-8',
+    )
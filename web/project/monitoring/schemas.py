@@ -0,0 +1,187 @@
+"""
+schemas.py
+----------
+Модуль реализует pydantic-схемы для вывода служебных данных о работе сервиса.
+
+"""
+
+from pydantic import BaseModel
+
+
+class RedisPoolStatsSchema(BaseModel):
+    """
+    Pydantic-схема данных о загрузке пула соединений с redis
+
+    Parameters
+    ----------
+    max_connections: int
+        максимальное количество соединений в пуле
+    created_connections: int
+        количество открытых пулом соединений
+    in_use_connections: int
+        количество соединений, занятых запросами
+    available_connections: int
+        количество свободных открытых соединений
+    """
+
+    max_connections: int
+    created_connections: int
+    in_use_connections: int
+    available_connections: int
+
+
+class DbPoolStatsSchema(BaseModel):
+    """
+    Pydantic-схема данных о загрузке пула соединений с postgres
+
+    Parameters
+    ----------
+    pool_size: int
+        количество постоянных соединений пула
+    max_overflow: int
+        сколько соединений пул может открыть сверх pool_size
+    checked_out_connections: int
+        количество соединений, занятых запросами
+    checked_in_connections: int
+        количество свободных открытых соединений
+    overflow_connections: int
+        количество открытых соединений сверх pool_size
+    checkouts: int
+        сколько раз пул выдал соединение
+    timeouts: int
+        сколько раз соединение не дождались за DB_POOL_TIMEOUT
+    checkout_seconds: float
+        суммарное время выдачи соединений
+    """
+
+    pool_size: int
+    max_overflow: int
+    checked_out_connections: int
+    checked_in_connections: int
+    overflow_connections: int
+    checkouts: int
+    timeouts: int
+    checkout_seconds: float
+
+
+class CacheTierStatsSchema(BaseModel):
+    """
+    Pydantic-схема попаданий в один уровень кеша
+
+    Parameters
+    ----------
+    hits: int
+        количество попаданий
+    misses: int
+        количество промахов
+    hit_ratio: float
+        доля попаданий
+    """
+
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class CacheTiersStatsSchema(BaseModel):
+    """
+    Pydantic-схема попаданий в кеш процесса и в redis
+
+    Parameters
+    ----------
+    local_enabled: bool
+        включен ли кеш процесса
+    local_size: int
+        количество ключей в кеше процесса
+    local: CacheTierStatsSchema
+        попадания в кеш процесса
+    redis: CacheTierStatsSchema
+        попадания в redis среди запросов, не найденных в кеше процесса
+    """
+
+    local_enabled: bool
+    local_size: int
+    local: CacheTierStatsSchema
+    redis: CacheTierStatsSchema
+
+
+class CacheFamilyStatsSchema(BaseModel):
+    """
+    Pydantic-схема статистики кеша одного семейства ключей
+
+    Parameters
+    ----------
+    local_hits: int
+        попадания в кеш процесса
+    hits: int
+        попадания в redis
+    misses: int
+        промахи
+    sets: int
+        записи значений в redis
+    invalidations: int
+        сбросы ключей и пространств имен семейства
+    read_bytes: int
+        байты значений, прочитанных из redis
+    written_bytes: int
+        байты значений, записанных в redis
+    get_seconds: float
+        суммарное время чтения из redis
+    decode_seconds: float
+        суммарное время декодирования прочитанных значений
+    hit_ratio: float
+        доля попаданий в кеш процесса и в redis
+    """
+
+    local_hits: int
+    hits: int
+    misses: int
+    sets: int
+    invalidations: int
+    read_bytes: int
+    written_bytes: int
+    get_seconds: float
+    decode_seconds: float
+    hit_ratio: float
+
+
+class CacheFamiliesStatsSchema(BaseModel):
+    """
+    Pydantic-схема статистики кеша по семействам ключей
+
+    Parameters
+    ----------
+    families: dict[str, CacheFamilyStatsSchema]
+        статистика по названию семейства: all_menus, all_menus_whole, menu,
+        submenus, submenu, dishes, dish, search
+    """
+
+    families: dict[str, CacheFamilyStatsSchema]
+
+
+class AdminSyncStatsSchema(BaseModel):
+    """
+    Pydantic-схема статистики запусков админской синхронизации
+
+    Parameters
+    ----------
+    applied_runs: int
+        количество запусков, сверивших файл с БД
+    applied_seconds: float
+        суммарное время таких запусков
+    skipped_runs: int
+        количество запусков, пропущенных из-за неизмененного файла
+    skipped_seconds: float
+        суммарное время пропущенных запусков
+    last_status: str | None
+        итог последнего запуска: applied или skipped
+    last_seconds: float | None
+        время последнего запуска
+    """
+
+    applied_runs: int
+    applied_seconds: float
+    skipped_runs: int
+    skipped_seconds: float
+    last_status: str | None
+    last_seconds: float | None
@@ -0,0 +1,100 @@
+"""
+pagination.py
+----------
+Модуль реализует постраничную выдачу списков по ключу (keyset pagination).
+
+Строки списка упорядочены по id, страница - не больше limit строк с id
+больше последнего id предыдущей страницы. Курсор следующей страницы -
+непрозрачная строка (base64 последнего id), отдается в заголовке
+X-Next-Cursor; на последней странице заголовка нет. Каждая страница
+кешируется под своим ключом в пространстве имен списка.
+
+"""
+
+import base64
+import binascii
+from typing import Any, Callable, Sequence, TypedDict
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import Select
+from sqlalchemy.sql.elements import ColumnElement
+
+from .config import settings
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+class Page(TypedDict):
+    items: list[Any]
+    next_cursor: str | None
+
+
+def encode_cursor(last_id: str) -> str:
+    return base64.urlsafe_b64encode(last_id.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> str:
+    """id, после которого начинается страница; 400 для чужой строки"""
+    try:
+        last_id = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        last_id = None
+    if not last_id or encode_cursor(last_id) != cursor:
+        raise HTTPException(status_code=400, detail='invalid cursor')
+    return last_id
+
+
+def paginate(
+    query: Select, id_column: ColumnElement, limit: int, after_id: str | None
+) -> Select:
+    """
+    Запрос страницы: строки с id после after_id по порядку id. Берется на
+    одну строку больше limit, чтобы узнать, есть ли следующая страница
+    """
+    if after_id is not None:
+        query = query.where(id_column > after_id)
+    return query.order_by(id_column).limit(limit + 1)
+
+
+def get_page(rows: Sequence[Any], limit: int, get_id: Callable[[Any], str]) -> Page:
+    """обрезает лишнюю строку запроса paginate и считает курсор"""
+    if len(rows) <= limit:
+        return {'items': list(rows), 'next_cursor': None}
+    items = list(rows[:limit])
+    return {'items': items, 'next_cursor': encode_cursor(get_id(items[-1]))}
+
+
+def get_page_key(list_key: str, limit: int, after_id: str | None) -> str:
+    """ключ кеша страницы в пространстве имен списка list_key"""
+    return f'{list_key}/page:{limit}:{after_id or ""}'
+
+
+class PageParams:
+    """
+    Параметры страницы из запроса для эндпоинтов списков
+
+    Parameters
+    ----------
+    response: Response
+        ответ, в который пишется заголовок X-Next-Cursor
+    limit: int
+        наибольшее количество строк на странице
+    cursor: str | None
+        курсор из X-Next-Cursor предыдущей страницы, без него - первая страница
+    """
+
+    def __init__(
+        self,
+        response: Response,
+        limit: int = Query(default=settings.page_size, ge=1, le=settings.page_size_max),
+        cursor: str | None = Query(default=None),
+    ) -> None:
+        self.response = response
+        self.limit = limit
+        self.after_id = decode_cursor(cursor) if cursor is not None else None
+
+    def get_items(self, page: Page) -> list[Any]:
+        """строки страницы; курсор следующей страницы уходит в заголовок"""
+        if page['next_cursor']:
+            self.response.headers[NEXT_CURSOR_HEADER] = page['next_cursor']
+        return page['items']
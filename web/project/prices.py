@@ -0,0 +1,212 @@
+"""
+prices.py
+----------
+Модуль пересчитывает цены блюд со скидкой (dishes.effective_price) по
+правилам скидок discount_rules.
+
+Цена со скидкой хранится в БД точным decimal и читается репозиториями
+как есть. Пересчет идет в транзакции записи, изменившей цены блюд или
+правила скидок, а правила, начавшие или закончившие действовать по сроку,
+пересчитывает периодическая задача admin_task.refresh_discounts.
+
+Пересчет цен всей базы:
+    python -m project.prices
+
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Collection, Iterable, TypedDict
+
+import redis.asyncio as redis
+from sqlalchemy import DateTime, and_, func, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from .database import async_session, get_async_redis_client
+from .models import DiscountRule, Dish, Submenu
+from .service_redis import AsyncRedisCache
+from .services_overal import id_in
+from .versions import EntityVersions, get_version_paths
+
+# время, до которого периодическая задача учла начало и конец сроков правил
+REFRESHED_AT_KEY = 'discounts:refreshed_at'
+
+DishPathType = tuple[str, str, str]
+
+
+class PriceScope(TypedDict, total=False):
+    menu_ids: set[str]
+    submenu_ids: set[str]
+    dish_ids: set[str]
+
+
+def is_rule_active(now: ColumnElement) -> ColumnElement:
+    return and_(
+        or_(DiscountRule.starts_at.is_(None), DiscountRule.starts_at <= now),
+        or_(DiscountRule.ends_at.is_(None), DiscountRule.ends_at > now),
+    )
+
+
+def get_rules_scope(rules: Iterable[Any]) -> PriceScope:
+    """меню, подменю и блюда, на которые действуют правила rules"""
+    rules = list(rules)
+    return {
+        'menu_ids': {rule.menu_id for rule in rules if rule.menu_id is not None},
+        'submenu_ids': {
+            rule.submenu_id for rule in rules if rule.submenu_id is not None
+        },
+        'dish_ids': {rule.dish_id for rule in rules if rule.dish_id is not None},
+    }
+
+
+async def refresh_effective_prices(
+    db: AsyncSession,
+    menu_ids: Collection[str] | None = None,
+    submenu_ids: Collection[str] | None = None,
+    dish_ids: Collection[str] | None = None,
+    now: datetime | None = None,
+) -> set[DishPathType]:
+    """
+    Пересчитывает одним UPDATE цены со скидкой блюд из меню menu_ids,
+    подменю submenu_ids и блюд dish_ids, без них - всех блюд. Записываются
+    только изменившиеся цены. Возвращает пути (меню, подменю, блюдо) блюд,
+    цена которых изменилась, для сброса кеша
+    """
+    dishes, submenus = Dish.__table__, Submenu.__table__
+    source = dishes.alias('source')
+    now_value = func.now() if now is None else literal(now, DateTime(timezone=True))
+    # наибольшая скидка правил блюда, подменю и меню: действующие правила
+    # группируются по цели один раз и присоединяются к блюдам. Подзапрос на
+    # каждое блюдо перебирал бы правила заново для каждой строки
+    active_rules = (
+        select(DiscountRule).where(is_rule_active(now_value)).cte('active_rules')
+    )
+    percents = [
+        select(
+            active_rules.c[name].label('target_id'),
+            func.max(active_rules.c.percent).label('percent'),
+        )
+        .where(active_rules.c[name].is_not(None))
+        .group_by(active_rules.c[name])
+        .subquery(f'{name}_percents')
+        for name in ('dish_id', 'submenu_id', 'menu_id')
+    ]
+    dish_percents, submenu_percents, menu_percents = percents
+    percent = func.greatest(*[rule_percents.c.percent for rule_percents in percents])
+    prices = select(
+        source.c.id,
+        submenus.c.menu_id,
+        func.round(source.c.price * (100 - percent) / 100, 2).label('price'),
+    ).select_from(
+        source.join(submenus, source.c.submenu_id == submenus.c.id)
+        .outerjoin(dish_percents, dish_percents.c.target_id == source.c.id)
+        .outerjoin(
+            submenu_percents, submenu_percents.c.target_id == source.c.submenu_id
+        )
+        .outerjoin(menu_percents, menu_percents.c.target_id == submenus.c.menu_id)
+    )
+    filters = [
+        id_in(target_column, ids)
+        for target_column, ids in (
+            (submenus.c.menu_id, menu_ids),
+            (source.c.submenu_id, submenu_ids),
+            (source.c.id, dish_ids),
+        )
+        if ids is not None
+    ]
+    if filters:
+        prices = prices.where(or_(*filters))
+    prices = prices.subquery('prices')
+    changed = await db.execute(
+        update(dishes)
+        .where(
+            dishes.c.id == prices.c.id,
+            dishes.c.effective_price.is_distinct_from(prices.c.price),
+        )
+        .values(effective_price=prices.c.price)
+        .returning(prices.c.menu_id, dishes.c.submenu_id, dishes.c.id)
+    )
+    return {(menu_id, submenu_id, dish_id) for menu_id, submenu_id, dish_id in changed}
+
+
+async def invalidate_prices(
+    redis_client: redis.Redis, paths: Collection[DishPathType]
+) -> None:
+    """
+    Сбрасывает кеш и версии ответов с ценами блюд paths: самих блюд,
+    страниц блюд их подменю и дерева всех меню
+    """
+    if not paths:
+        return
+    cache = AsyncRedisCache(redis_client)
+    await cache.delete_data_from_cache(
+        'all_menus_whole',
+        *sorted('/'.join(path) for path in paths),
+        background_tasks=None,
+    )
+    await cache.clear_namespace_from_cache(
+        *sorted(
+            {
+                '/'.join([menu_id, submenu_id, 'dishes'])
+                for menu_id, submenu_id, _ in paths
+            }
+        ),
+        background_tasks=None,
+    )
+    await EntityVersions(redis_client).bump(
+        *sorted(
+            {
+                version_path
+                for path in paths
+                for version_path in get_version_paths(*path)
+            }
+        )
+    )
+
+
+async def refresh_rule_windows(redis_client: redis.Redis) -> set[DishPathType]:
+    """
+    Пересчитывает цены блюд под правилами, срок которых начался или
+    закончился после прошлого запуска; первый запуск пересчитывает все цены.
+    Возвращает пути блюд с изменившейся ценой
+    """
+    async with async_session() as session:
+        now = (await session.execute(select(func.now()))).scalar_one()
+        refreshed_at = await redis_client.get(REFRESHED_AT_KEY)
+        if refreshed_at is None:
+            paths = await refresh_effective_prices(session, now=now)
+        else:
+            since = datetime.fromisoformat(refreshed_at.decode())
+            rules = await session.execute(
+                select(
+                    DiscountRule.menu_id, DiscountRule.submenu_id, DiscountRule.dish_id
+                ).where(
+                    or_(
+                        and_(
+                            DiscountRule.starts_at > since,
+                            DiscountRule.starts_at <= now,
+                        ),
+                        and_(DiscountRule.ends_at > since, DiscountRule.ends_at <= now),
+                    )
+                )
+            )
+            scope = get_rules_scope(rules)
+            paths = set()
+            if any(scope.values()):
+                paths = await refresh_effective_prices(session, now=now, **scope)
+        await session.commit()
+    await redis_client.set(REFRESHED_AT_KEY, now.isoformat())
+    await invalidate_prices(redis_client, paths)
+    return paths
+
+
+async def main() -> None:
+    async with async_session() as session:
+        paths = await refresh_effective_prices(session)
+        await session.commit()
+    await invalidate_prices(await get_async_redis_client(), paths)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
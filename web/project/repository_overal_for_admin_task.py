@@ -1,150 +1,531 @@
-import pickle
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, AsyncIterable, Collection, NamedTuple
 
-from project.database import async_session, get_async_redis_client
-from project.models import Dish, Menu, Submenu
-from sqlalchemy import delete, select
+import redis.asyncio as redis
+from project.counters import recount_counters
+from project.database import async_session
+from project.models import DiscountRule, Dish, Menu, Submenu
+from project.prices import DishPathType, PriceScope, refresh_effective_prices
+from project.service_redis import AsyncRedisCache
+from project.services_overal import id_in
+from project.versions import EntityVersions, get_version_paths
+from sqlalchemy import ARRAY, String, Table, all_, delete, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
 
-MenuType = tuple[str, str, str]
-SubmenuType = tuple[str, str, str, str]
-DishType = tuple[str, str, str, str, str, str, str | float | None]
 
+class MenuType(NamedTuple):
+    id: str
+    title: str
+    description: str
 
-def get_menus_ids_from_data(menus: list[MenuType]) -> list[str]:
-    ids = []
-    for menu in menus:
-        ids.append(menu[0])
-    return ids
 
+class SubmenuType(NamedTuple):
+    menu_id: str
+    id: str
+    title: str
+    description: str
 
-async def update_menu_data_from_file_to_db(menus: list[MenuType]) -> None:
-    for menu in menus:
-        await update_or_create_menu(menu=menu)
-    await delete_menus_not_in_data(menus=menus)
 
+class DishType(NamedTuple):
+    menu_id: str
+    submenu_id: str
+    id: str
+    title: str
+    description: str
+    price: str
+    discount: str | float | None
 
-async def update_or_create_menu(menu: MenuType) -> None:
-    async with async_session() as session:
-        result = await session.execute(select(Menu).filter(Menu.id == menu[0]))
-        db_menu = result.scalar_one_or_none()
-        if db_menu:
-            db_menu.title = menu[1]
-            db_menu.description = menu[2]
-            await session.commit()
-        else:
-            db_menu = Menu(title=menu[1], description=menu[2], id=menu[0])
-            session.add(db_menu)
-            await session.commit()
 
+RecordType = MenuType | SubmenuType | DishType
 
-async def delete_menus_not_in_data(menus: list[MenuType]) -> None:
-    menus_ids_from_data = get_menus_ids_from_data(menus=menus)
-    async with async_session() as session:
-        result = await session.execute(select(Menu.id))
-    menus_ids_from_db = result.scalars().all()
-    async with async_session() as session:
-        for menu_id in menus_ids_from_db:
-            if menu_id not in menus_ids_from_data:
-                await session.execute(delete(Menu).where(Menu.id == menu_id))
-        await session.commit()
+# строка таблицы: id -> (путь из id родителей и самой строки, значения колонок)
+RowsType = dict[str, tuple[tuple[str, ...], dict[str, Any]]]
 
+PRICE_SCALE = Decimal('0.01')
+# строк в одном INSERT: у postgres не больше 32767 параметров в запросе
+UPSERT_CHUNK_SIZE = 1000
 
-def get_submenus_ids_from_data(submenus: list[SubmenuType]) -> list[str]:
-    ids = []
-    for submenu in submenus:
-        ids.append(submenu[1])
-    return ids
 
+@dataclass
+class TableChanges:
+    """Изменения одной таблицы между БД и файлом"""
 
-async def update_submenu_data_from_file_to_db(submenus: list[SubmenuType]) -> None:
-    for submenu in submenus:
-        await update_or_create_submenu(submenu=submenu)
-    await delete_submenus_not_in_data(submenus=submenus)
+    inserted: set[str] = field(default_factory=set)
+    updated: set[str] = field(default_factory=set)
+    # id удаленной строки -> ее путь
+    deleted: dict[str, tuple[str, ...]] = field(default_factory=dict)
+    # старые и новые пути всех затронутых строк
+    paths: set[tuple[str, ...]] = field(default_factory=set)
+    # значения вставляемых и изменяемых строк текущей пачки
+    rows: dict[str, dict[str, Any]] = field(default_factory=dict)
 
+    def __bool__(self) -> bool:
+        return bool(self.inserted or self.updated or self.deleted)
 
-async def update_or_create_submenu(submenu: SubmenuType) -> None:
-    async with async_session() as session:
-        result = await session.execute(
-            select(Submenu).filter(
-                Submenu.id == submenu[1], Submenu.menu_id == submenu[0]
+    def merge(self, other: 'TableChanges') -> None:
+        """добавляет изменения примененной пачки, без значений строк"""
+        self.inserted |= other.inserted
+        self.updated |= other.updated
+        self.deleted |= other.deleted
+        self.paths |= other.paths
+
+    def summary(self) -> dict[str, int]:
+        return {
+            'inserted': len(self.inserted),
+            'updated': len(self.updated),
+            'deleted': len(self.deleted),
+        }
+
+
+@dataclass
+class ChangeSet:
+    """Все изменения одного запуска синхронизации"""
+
+    menus: TableChanges = field(default_factory=TableChanges)
+    submenus: TableChanges = field(default_factory=TableChanges)
+    dishes: TableChanges = field(default_factory=TableChanges)
+    # id блюда -> новая скидка из файла, None - скидку нужно удалить
+    discounts: dict[str, Decimal | None] = field(default_factory=dict)
+    # пути блюд, цена со скидкой которых изменилась после пересчета
+    price_paths: set[DishPathType] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return bool(self.menus or self.submenus or self.dishes or self.discounts)
+
+    def merge(self, other: 'ChangeSet') -> None:
+        self.menus.merge(other.menus)
+        self.submenus.merge(other.submenus)
+        self.dishes.merge(other.dishes)
+        self.discounts |= other.discounts
+        self.price_paths |= other.price_paths
+
+    def affected_menu_ids(self) -> set[str]:
+        """меню, счетчики которых могли измениться"""
+        return {
+            path[0]
+            for changes in (self.menus, self.submenus, self.dishes)
+            for path in changes.paths
+        }
+
+    def cache_keys(self) -> set[str]:
+        """ключи кеша ответов, которые затрагивают изменения"""
+        keys = set()
+        for changes in (self.menus, self.submenus, self.dishes):
+            for path in changes.paths:
+                keys.update(get_path_cache_keys(path))
+        for menu_id, submenu_id, dish_id in self.price_paths:
+            keys.update(['all_menus_whole', '/'.join([menu_id, submenu_id, dish_id])])
+        return keys
+
+    def cache_namespaces(self) -> set[str]:
+        """
+        пространства имен кеша страниц затронутых списков и удаленных
+        меню и подменю
+        """
+        namespaces = {
+            '/'.join(path)
+            for changes in (self.menus, self.submenus)
+            for path in changes.deleted.values()
+        }
+        for changes in (self.menus, self.submenus, self.dishes):
+            for path in changes.paths:
+                namespaces.update(get_path_list_namespaces(path))
+        for menu_id, submenu_id, _ in self.price_paths:
+            namespaces.add('/'.join([menu_id, submenu_id, 'dishes']))
+        return namespaces
+
+    def version_paths(self) -> set[str]:
+        """пути, версии которых нужно увеличить"""
+        paths = self.price_paths.union(
+            self.menus.paths, self.submenus.paths, self.dishes.paths
+        )
+        return {
+            version_path for path in paths for version_path in get_version_paths(*path)
+        }
+
+    def price_scope(self) -> PriceScope:
+        """
+        подменю и блюда, цены со скидкой которых нужно пересчитать: блюда с
+        новой ценой, подменю или скидкой из файла и перенесенные подменю
+        """
+        return {
+            'submenu_ids': self.submenus.updated,
+            'dish_ids': self.dishes.inserted.union(self.dishes.updated, self.discounts),
+        }
+
+    def summary(self) -> dict[str, dict[str, int] | int]:
+        return {
+            'menus': self.menus.summary(),
+            'submenus': self.submenus.summary(),
+            'dishes': self.dishes.summary(),
+            'discounts': len(self.discounts),
+        }
+
+
+def get_path_cache_keys(path: tuple[str, ...]) -> list[str]:
+    """
+    Ключи кеша, которые нужно удалить при изменении строки с путем path:
+    ее собственный ключ и ключи родителей, у которых меняются счетчики
+    """
+    return ['all_menus_whole', *['/'.join(path[:i]) for i in range(1, len(path) + 1)]]
+
+
+def get_path_list_namespaces(path: tuple[str, ...]) -> list[str]:
+    """
+    Пространства имен страниц списков, в которых есть строка с путем path
+    или ее родители со счетчиками
+    """
+    namespaces = ['all_menus']
+    if len(path) > 1:
+        namespaces.append('/'.join([path[0], 'submenus']))
+    if len(path) > 2:
+        namespaces.append('/'.join([*path[:2], 'dishes']))
+    return namespaces
+
+
+def id_not_in(column: ColumnElement, ids: Collection[str]) -> ColumnElement:
+    """column <> ALL(:ids) - список передается одним параметром-массивом"""
+    return column != all_(literal(list(ids), ARRAY(String)))
+
+
+def normalize_price(price: str | Decimal) -> Decimal:
+    return Decimal(str(price)).quantize(PRICE_SCALE)
+
+
+def normalize_discount(discount: str | float | Decimal | None) -> Decimal | None:
+    """скидка в процентах с точностью до сотых, пустая и нулевая - None"""
+    if not discount:
+        return None
+    return Decimal(str(discount)).quantize(PRICE_SCALE) or None
+
+
+def menus_to_rows(menus: list[MenuType]) -> RowsType:
+    return {
+        menu.id: ((menu.id,), {'title': menu.title, 'description': menu.description})
+        for menu in menus
+    }
+
+
+def submenus_to_rows(submenus: list[SubmenuType]) -> RowsType:
+    return {
+        submenu.id: (
+            (submenu.menu_id, submenu.id),
+            {
+                'menu_id': submenu.menu_id,
+                'title': submenu.title,
+                'description': submenu.description,
+            },
+        )
+        for submenu in submenus
+    }
+
+
+def dishes_to_rows(dishes: list[DishType]) -> RowsType:
+    return {
+        dish.id: (
+            (dish.menu_id, dish.submenu_id, dish.id),
+            {
+                'submenu_id': dish.submenu_id,
+                'title': dish.title,
+                'description': dish.description,
+                'price': normalize_price(dish.price),
+            },
+        )
+        for dish in dishes
+    }
+
+
+def diff_rows(current: RowsType, incoming: RowsType) -> TableChanges:
+    """Сравнивает строки БД и файла"""
+    changes = TableChanges()
+    for row_id, (path, values) in incoming.items():
+        if row_id not in current:
+            changes.inserted.add(row_id)
+            changes.rows[row_id] = values
+            changes.paths.add(path)
+            continue
+        current_path, current_values = current[row_id]
+        if values != current_values:
+            changes.updated.add(row_id)
+            changes.rows[row_id] = values
+            changes.paths.update([current_path, path])
+    for row_id, (path, _) in current.items():
+        if row_id not in incoming:
+            changes.deleted[row_id] = path
+            changes.paths.add(path)
+    return changes
+
+
+def diff_discounts(
+    current: dict[str, Decimal | None], dishes: list[DishType]
+) -> dict[str, Decimal | None]:
+    """
+    Сравнивает скидки из файла, сохраненные в БД, со скидками файла.
+    current - скидки блюд, которые есть в БД или в файле.
+    """
+    incoming = {dish.id: normalize_discount(dish.discount) for dish in dishes}
+    return {
+        dish_id: incoming.get(dish_id)
+        for dish_id, discount in current.items()
+        if incoming.get(dish_id) != discount
+    }
+
+
+async def load_db_rows(
+    db: AsyncSession,
+    menu_ids: Collection[str],
+    submenu_ids: Collection[str],
+    dish_ids: Collection[str],
+) -> tuple[RowsType, RowsType, RowsType]:
+    """Загружает из БД строки с переданными id"""
+    menus = await db.execute(
+        select(Menu.id, Menu.title, Menu.description).where(id_in(Menu.id, menu_ids))
+    )
+    submenus = await db.execute(
+        select(Submenu.id, Submenu.menu_id, Submenu.title, Submenu.description).where(
+            id_in(Submenu.id, submenu_ids)
+        )
+    )
+    dishes = await db.execute(
+        select(
+            Dish.id,
+            Submenu.menu_id,
+            Dish.submenu_id,
+            Dish.title,
+            Dish.description,
+            Dish.price,
+        )
+        .join(Submenu, Dish.submenu_id == Submenu.id)
+        .where(id_in(Dish.id, dish_ids))
+    )
+    return (
+        {
+            row.id: ((row.id,), {'title': row.title, 'description': row.description})
+            for row in menus
+        },
+        {
+            row.id: (
+                (row.menu_id, row.id),
+                {
+                    'menu_id': row.menu_id,
+                    'title': row.title,
+                    'description': row.description,
+                },
+            )
+            for row in submenus
+        },
+        {
+            row.id: (
+                (row.menu_id, row.submenu_id, row.id),
+                {
+                    'submenu_id': row.submenu_id,
+                    'title': row.title,
+                    'description': row.description,
+                    'price': normalize_price(row.price),
+                },
             )
+            for row in dishes
+        },
+    )
+
+
+async def load_discounts(
+    db: AsyncSession, dish_ids: list[str]
+) -> dict[str, Decimal | None]:
+    """скидки из файла, сохраненные в БД правилами скидок блюд"""
+    rules = await db.execute(
+        select(DiscountRule.dish_id, DiscountRule.percent).where(
+            DiscountRule.from_sheet, id_in(DiscountRule.dish_id, dish_ids)
         )
-        db_submenu = result.scalar_one_or_none()
-        if db_submenu:
-            db_submenu.title = submenu[2]
-            db_submenu.description = submenu[3]
-            await session.commit()
+    )
+    discounts = {row.dish_id: row.percent for row in rules}
+    return {dish_id: discounts.get(dish_id) for dish_id in dish_ids}
+
+
+def split_records(
+    records: list[RecordType],
+) -> tuple[list[MenuType], list[SubmenuType], list[DishType]]:
+    menus, submenus, dishes = [], [], []
+    for record in records:
+        if isinstance(record, MenuType):
+            menus.append(record)
+        elif isinstance(record, SubmenuType):
+            submenus.append(record)
         else:
-            db_submenu = Submenu(
-                title=submenu[2],
-                description=submenu[3],
-                id=submenu[1],
-                menu_id=submenu[0],
-            )
-            session.add(db_submenu)
-            await session.commit()
+            dishes.append(record)
+    return menus, submenus, dishes
 
 
-async def delete_submenus_not_in_data(submenus: list[SubmenuType]) -> None:
-    submenus_ids_from_data = get_submenus_ids_from_data(submenus=submenus)
-    async with async_session() as session:
-        result = await session.execute(select(Submenu.id))
-    submenus_ids_from_db = result.scalars().all()
-    async with async_session() as session:
-        for submenu_id in submenus_ids_from_db:
-            if submenu_id not in submenus_ids_from_data:
-                await session.execute(delete(Submenu).where(Submenu.id == submenu_id))
-        await session.commit()
+async def compute_batch_changes(
+    db: AsyncSession, records: list[RecordType]
+) -> ChangeSet:
+    """Сравнивает пачку записей файла с теми же строками БД"""
+    menus, submenus, dishes = split_records(records)
+    incoming_menus = menus_to_rows(menus)
+    incoming_submenus = submenus_to_rows(submenus)
+    incoming_dishes = dishes_to_rows(dishes)
+    current_menus, current_submenus, current_dishes = await load_db_rows(
+        db, incoming_menus.keys(), incoming_submenus.keys(), incoming_dishes.keys()
+    )
+    return ChangeSet(
+        menus=diff_rows(current_menus, incoming_menus),
+        submenus=diff_rows(current_submenus, incoming_submenus),
+        dishes=diff_rows(current_dishes, incoming_dishes),
+        discounts=diff_discounts(
+            await load_discounts(db, list(incoming_dishes)), dishes
+        ),
+    )
 
 
-def get_dishes_ids_from_data(dishes: list[DishType]) -> list[str]:
-    ids = []
-    for dish in dishes:
-        ids.append(dish[2])
-    return ids
+async def upsert_rows(
+    db: AsyncSession, table: Table, rows: dict[str, dict[str, Any]]
+) -> None:
+    if not rows:
+        return
+    values = [{'id': row_id, **row} for row_id, row in rows.items()]
+    for start in range(0, len(values), UPSERT_CHUNK_SIZE):
+        end = start + UPSERT_CHUNK_SIZE
+        query = insert(table).values(values[start:end])
+        await db.execute(
+            query.on_conflict_do_update(
+                index_elements=[table.c.id],
+                set_={
+                    column: query.excluded[column]
+                    for column in values[0]
+                    if column != 'id'
+                },
+            )
+        )
 
 
-async def update_dish_data_from_file_to_db(dishes: list[DishType]) -> None:
-    for dish in dishes:
-        await update_or_create_dish(dish=dish)
-    await delete_dishes_not_in_data(dishes=dishes)
+async def apply_batch_changes(db: AsyncSession, change_set: ChangeSet) -> None:
+    """Вставляет и обновляет строки пачки, от родителей к потомкам"""
+    await upsert_rows(db, Menu.__table__, change_set.menus.rows)
+    await upsert_rows(db, Submenu.__table__, change_set.submenus.rows)
+    await upsert_rows(db, Dish.__table__, change_set.dishes.rows)
 
 
-async def update_or_create_dish(dish: DishType) -> None:
-    redis_client = await get_async_redis_client()
-    if dish[6]:
-        key_discount = '/'.join([dish[2], 'discount'])
-        val_bytes = pickle.dumps(dish[6])
-        await redis_client.set(key_discount, val_bytes)
+async def delete_unseen_rows(db: AsyncSession, seen: dict[type, set[str]]) -> ChangeSet:
+    """
+    Удаляет строки, которых не было в файле, от потомков к родителям, чтобы
+    каскадное удаление меню не задело перенесенные из него подменю.
+    Правила скидок удаленных строк удаляются каскадно.
+    """
+    change_set = ChangeSet()
+    menus, submenus, dishes = Menu.__table__, Submenu.__table__, Dish.__table__
+    deleted_dishes = await db.execute(
+        delete(dishes)
+        .where(
+            dishes.c.submenu_id == submenus.c.id,
+            id_not_in(dishes.c.id, seen[DishType]),
+        )
+        .returning(dishes.c.id, submenus.c.menu_id, dishes.c.submenu_id)
+    )
+    for dish_id, menu_id, submenu_id in deleted_dishes:
+        change_set.dishes.deleted[dish_id] = (menu_id, submenu_id, dish_id)
+    deleted_submenus = await db.execute(
+        delete(submenus)
+        .where(id_not_in(submenus.c.id, seen[SubmenuType]))
+        .returning(submenus.c.id, submenus.c.menu_id)
+    )
+    for submenu_id, menu_id in deleted_submenus:
+        change_set.submenus.deleted[submenu_id] = (menu_id, submenu_id)
+    deleted_menus = await db.execute(
+        delete(menus).where(id_not_in(menus.c.id, seen[MenuType])).returning(menus.c.id)
+    )
+    for (menu_id,) in deleted_menus:
+        change_set.menus.deleted[menu_id] = (menu_id,)
+    for changes in (change_set.menus, change_set.submenus, change_set.dishes):
+        changes.paths.update(changes.deleted.values())
+    return change_set
 
-    async with async_session() as session:
-        result = await session.execute(
-            select(Dish).filter(Dish.id == dish[2], Dish.submenu_id == dish[1])
+
+async def apply_discounts(
+    db: AsyncSession, discounts: dict[str, Decimal | None]
+) -> None:
+    """
+    Записывает скидки из файла правилами скидок блюд: удаляет снятые скидки
+    и вставляет или обновляет остальные
+    """
+    rules = DiscountRule.__table__
+    removed = [dish_id for dish_id, percent in discounts.items() if percent is None]
+    if removed:
+        await db.execute(
+            delete(rules).where(rules.c.from_sheet, id_in(rules.c.dish_id, removed))
         )
-        db_dish = result.scalar_one_or_none()
-        if db_dish:
-            db_dish.title = dish[3]
-            db_dish.description = dish[4]
-            db_dish.price = dish[5]
-            await session.commit()
-        else:
-            db_dish = Dish(
-                title=dish[3],
-                description=dish[4],
-                id=dish[2],
-                submenu_id=dish[1],
-                price=dish[5],
+    values = [
+        {'dish_id': dish_id, 'percent': percent, 'from_sheet': True}
+        for dish_id, percent in discounts.items()
+        if percent is not None
+    ]
+    for start in range(0, len(values), UPSERT_CHUNK_SIZE):
+        end = start + UPSERT_CHUNK_SIZE
+        query = insert(rules).values(values[start:end])
+        await db.execute(
+            query.on_conflict_do_update(
+                index_elements=[rules.c.dish_id],
+                index_where=rules.c.from_sheet,
+                set_={'percent': query.excluded.percent},
             )
-            session.add(db_dish)
-            await session.commit()
+        )
 
 
-async def delete_dishes_not_in_data(dishes: list[DishType]) -> None:
-    dishes_ids_from_data = get_dishes_ids_from_data(dishes=dishes)
-    async with async_session() as session:
-        result = await session.execute(select(Dish.id))
-    dishes_ids_from_db = result.scalars().all()
+async def invalidate_change_set(
+    redis_client: redis.Redis, change_set: ChangeSet
+) -> None:
+    """
+    Удаляет из кеша только затронутые изменениями ключи, очищает
+    пространства имен страниц затронутых списков, удаленных меню и подменю
+    и увеличивает версии для ETag. Пустые изменения не трогают redis.
+    """
+    if not change_set:
+        return
+    cache = AsyncRedisCache(redis_client)
+    await cache.delete_data_from_cache(
+        *sorted(change_set.cache_keys()), background_tasks=None
+    )
+    await cache.clear_namespace_from_cache(
+        *sorted(change_set.cache_namespaces()), background_tasks=None
+    )
+    await EntityVersions(redis_client).bump(*sorted(change_set.version_paths()))
+
+
+async def sync_data_from_file_to_db(
+    redis_client: redis.Redis, batches: AsyncIterable[list[RecordType]]
+) -> ChangeSet:
+    """
+    Синхронизирует БД и скидки блюд с записями файла, записывая только
+    отличающиеся строки. Записи приходят пачками в порядке файла, родитель
+    раньше потомков; все пачки применяются в одной транзакции вместе с
+    пересчетом цен со скидкой. Из файла в памяти остаются только id
+    увиденных строк. Возвращает примененные изменения.
+    """
+    change_set = ChangeSet()
+    seen: dict[type[RecordType], set[str]] = {
+        MenuType: set(),
+        SubmenuType: set(),
+        DishType: set(),
+    }
     async with async_session() as session:
-        for dish_id in dishes_ids_from_db:
-            if dish_id not in dishes_ids_from_data:
-                await session.execute(delete(Dish).where(Dish.id == dish_id))
-        await session.commit()
+        async for records in batches:
+            for record in records:
+                seen[type(record)].add(record.id)
+            batch_changes = await compute_batch_changes(session, records)
+            await apply_batch_changes(session, batch_changes)
+            change_set.merge(batch_changes)
+        change_set.merge(await delete_unseen_rows(session, seen))
+        if change_set.submenus or change_set.dishes:
+            await recount_counters(session, menu_ids=change_set.affected_menu_ids())
+        await apply_discounts(session, change_set.discounts)
+        price_scope = change_set.price_scope()
+        if any(price_scope.values()):
+            change_set.price_paths = await refresh_effective_prices(
+                session, **price_scope
+            )
+        if change_set:
+            await session.commit()
+    await invalidate_change_set(redis_client, change_set)
+    return change_set
@@ -6,7 +6,10 @@ schemas.py
 
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, conlist
+
+# наибольшее количество элементов в одном bulk-запросе
+BULK_MAX_ITEMS = 1000
 
 
 class NotFoundSchema(BaseModel):
@@ -44,3 +47,35 @@ class CorrectDeleteSchema(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class BulkDeleteSchema(BaseModel):
+    """
+    Pydantic-схема запроса на удаление нескольких объектов
+
+    Parameters
+    ----------
+    ids: list[str]
+        идентификаторы удаляемых объектов
+    """
+
+    ids: conlist(str, min_items=1, max_items=BULK_MAX_ITEMS)  # type: ignore[valid-type]
+
+
+class BulkResultSchema(BaseModel):
+    """
+    Pydantic-схема результата bulk-операции над одним объектом
+
+    Parameters
+    ----------
+    id: str
+        идентификатор объекта
+    status: bool
+        флаг успешного выполнения операции
+    message: str
+        сообщение
+    """
+
+    id: str
+    status: bool = True
+    message: str
@@ -0,0 +1,96 @@
+import re
+from decimal import Decimal
+from typing import Any
+
+from fastapi import Depends
+from project.database import get_db
+from project.models import SEARCH_TS_CONFIG, Dish, Submenu, get_search_document
+from sqlalchemy import func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from .schemas import DishSearchOutSchema
+
+LIKE_ESCAPE = '/'
+
+
+def escape_like(value: str) -> str:
+    """экранирует символы шаблона LIKE в строке поиска"""
+    return (
+        value.replace(LIKE_ESCAPE, LIKE_ESCAPE * 2)
+        .replace('%', LIKE_ESCAPE + '%')
+        .replace('_', LIKE_ESCAPE + '_')
+    )
+
+
+def get_prefix_tsquery(query: str) -> str | None:
+    """
+    Запрос to_tsquery, в котором каждое слово строки поиска - префикс:
+    'борщ укр' -> 'борщ:* & укр:*'. Из строки берутся только буквы и цифры,
+    поэтому синтаксис tsquery из строки поиска не попадает в запрос
+    """
+    words = re.findall(r'\w+', query)
+    return ' & '.join(f'{word}:*' for word in words) or None
+
+
+class SearchRepository:
+    def __init__(self, db: AsyncSession = Depends(get_db)):
+        self.db = db
+
+    async def search_dishes(
+        self,
+        query: str,
+        limit: int,
+        target_menu_id: str | None = None,
+        target_submenu_id: str | None = None,
+        price_min: Decimal | None = None,
+        price_max: Decimal | None = None,
+    ) -> list[DishSearchOutSchema]:
+        """
+        Блюда, в названии которых есть строка поиска (ILIKE по триграммному
+        индексу) или в названии и описании которых есть слова, начинающиеся
+        со слов строки поиска (полнотекстовый индекс). Сначала идут блюда,
+        название которых начинается со строки поиска, дальше - по ts_rank.
+        Фильтр по цене - по цене со скидкой
+        """
+        title_pattern = escape_like(query)
+        title_contains = Dish.title.ilike(f'%{title_pattern}%', escape=LIKE_ESCAPE)
+        title_starts = Dish.title.ilike(f'{title_pattern}%', escape=LIKE_ESCAPE)
+        match: ColumnElement[bool] = title_contains
+        rank: ColumnElement[Any] = literal_column('0')
+        prefix_tsquery = get_prefix_tsquery(query)
+        if prefix_tsquery is not None:
+            document = get_search_document(Dish.title, Dish.description)
+            tsquery = func.to_tsquery(
+                literal_column(f"'{SEARCH_TS_CONFIG}'::regconfig"), prefix_tsquery
+            )
+            match = or_(document.op('@@')(tsquery), title_contains)
+            rank = func.ts_rank(document, tsquery)
+
+        q = (
+            select(Dish, Submenu.menu_id)
+            .join(Submenu, Dish.submenu_id == Submenu.id)
+            .where(match)
+        )
+        if target_menu_id is not None:
+            q = q.where(Submenu.menu_id == target_menu_id)
+        if target_submenu_id is not None:
+            q = q.where(Dish.submenu_id == target_submenu_id)
+        if price_min is not None:
+            q = q.where(Dish.current_price >= price_min)
+        if price_max is not None:
+            q = q.where(Dish.current_price <= price_max)
+        q = q.order_by(title_starts.desc(), rank.desc(), Dish.id).limit(limit)
+
+        res_q = await self.db.execute(q)
+        return [
+            DishSearchOutSchema(
+                id=row.Dish.id,
+                title=row.Dish.title,
+                description=row.Dish.description,
+                price=row.Dish.current_price,
+                menu_id=row.menu_id,
+                submenu_id=row.Dish.submenu_id,
+            )
+            for row in res_q
+        ]
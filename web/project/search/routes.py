@@ -0,0 +1,63 @@
+"""
+routes.py
+----------
+Модуль реализует эндпоинты FastApi для поиска блюд.
+
+"""
+
+from decimal import Decimal
+
+from fastapi import APIRouter, Depends, Query
+from project.config import settings
+
+from .schemas import DishSearchOutSchema
+from .services import SearchService
+
+router = APIRouter(prefix='/dishes', tags=['Search'])
+
+
+@router.get(
+    '/search',
+    summary='Поиск блюд',
+    response_description='Найденные блюда, сначала самые подходящие',
+    response_model=list[DishSearchOutSchema],
+    status_code=200,
+)
+async def search_dishes_handler(
+    q: str = Query(min_length=1, max_length=100),
+    menu_id: str | None = None,
+    submenu_id: str | None = None,
+    price_min: Decimal | None = Query(default=None, ge=0),
+    price_max: Decimal | None = Query(default=None, ge=0),
+    limit: int = Query(default=settings.search_limit, ge=1, le=settings.page_size_max),
+    response: SearchService = Depends(),
+) -> list[DishSearchOutSchema]:
+    """
+    Эндпоинт ищет блюда по названию и описанию
+    \f
+    :param q: str
+        Строка поиска: подстрока названия или начала слов названия и описания
+    :param menu_id: str | None
+        Искать только в меню с этим идентификатором
+    :param submenu_id: str | None
+        Искать только в подменю с этим идентификатором
+    :param price_min: Decimal | None
+        Наименьшая цена блюда со скидкой
+    :param price_max: Decimal | None
+        Наибольшая цена блюда со скидкой
+    :param limit: int
+        Наибольшее количество блюд в ответе
+    :param response: SearchService
+        Обьект ответа на запрос из сервиса поиска
+
+    :return: List[DishSearchOutSchema]
+        Pydantic-схема для фронтенда с найденными блюдами
+    """
+    return await response.search_dishes(
+        query=q,
+        limit=limit,
+        target_menu_id=menu_id,
+        target_submenu_id=submenu_id,
+        price_min=price_min,
+        price_max=price_max,
+    )
@@ -0,0 +1,24 @@
+"""
+schemas.py
+----------
+Модуль реализует pydantic-схемы для вывода результатов поиска.
+
+"""
+
+from project.dishes.schemas import DishOutSchema
+
+
+class DishSearchOutSchema(DishOutSchema):
+    """
+    Pydantic-схема найденного блюда
+
+    Parameters
+    ----------
+    menu_id: str
+        Идентификатор меню блюда в СУБД
+    submenu_id: str
+        Идентификатор подменю блюда в СУБД
+    """
+
+    menu_id: str
+    submenu_id: str
@@ -0,0 +1,59 @@
+import hashlib
+import json
+from decimal import Decimal
+from functools import partial
+
+import redis.asyncio as redis
+from fastapi import Depends
+from project.config import settings
+from project.database import get_async_redis_client
+from project.service_redis import AsyncRedisCache
+
+from .repository import SearchRepository
+from .schemas import DishSearchOutSchema
+
+
+def get_search_key(**params: str | int | Decimal | None) -> str:
+    """ключ кеша результатов поиска - хеш параметров запроса"""
+    params_json = json.dumps(params, sort_keys=True, default=str, ensure_ascii=False)
+    return '/'.join(
+        ['search', 'dishes', hashlib.sha256(params_json.encode()).hexdigest()]
+    )
+
+
+class SearchService:
+    def __init__(
+        self,
+        search_repository: SearchRepository = Depends(),
+        redis_client: redis.Redis = Depends(get_async_redis_client),
+    ):
+        self.search_repository = search_repository
+        self.cache = AsyncRedisCache(redis_client)
+
+    async def search_dishes(
+        self,
+        query: str,
+        limit: int,
+        target_menu_id: str | None = None,
+        target_submenu_id: str | None = None,
+        price_min: Decimal | None = None,
+        price_max: Decimal | None = None,
+    ) -> list[DishSearchOutSchema]:
+        """
+        Результаты поиска кешируются на search_cache_ttl секунд и не
+        сбрасываются при записи: изменения блюд и скидок видны в поиске
+        не позже, чем через search_cache_ttl
+        """
+        params: dict[str, str | int | Decimal | None] = dict(
+            query=query,
+            limit=limit,
+            target_menu_id=target_menu_id,
+            target_submenu_id=target_submenu_id,
+            price_min=price_min,
+            price_max=price_max,
+        )
+        return await self.cache.get_or_load(
+            key=get_search_key(**params),
+            loader=partial(self.search_repository.search_dishes, **params),
+            ttl=settings.search_cache_ttl,
+        )
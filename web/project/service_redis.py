@@ -1,10 +1,71 @@
-import pickle
-from typing import Any
+import asyncio
+import uuid
+from time import perf_counter
+from typing import Any, Awaitable, Callable
 
 import redis.asyncio as redis
 from fastapi import BackgroundTasks, Depends
 
+from .cache_codecs import cache_codec
+from .cache_local import local_cache, publish_invalidation
+from .cache_stats import cache_stats
+from .config import settings
 from .database import get_async_redis_client
+from .versions import drop_etag
+
+GENERATION_PREFIX = 'gen:'
+LOCK_PREFIX = 'lock:'
+STALE_PREFIX = 'stale:'
+LOCK_POLL_INTERVAL = 0.05
+# Результат загрузки, отмененной вместе с запросом: ожидавшие ее запросы
+# загружают данные сами
+RETRY_LOAD = object()
+
+# Достает поколения пространств имен ключа (KEYS), собирает из них итоговый
+# ключ и читает его - все за один запрос к redis. Возвращает {ключ, значение}.
+GET_VERSIONED_SCRIPT = """
+local key = ARGV[1]
+local generations = redis.call('MGET', unpack(KEYS))
+for i = 1, #KEYS do
+    key = key .. (i == 1 and '@' or '.') .. (generations[i] or '0')
+end
+return {key, redis.call('GET', key)}
+"""
+
+# Снимает блокировку, только если ее держит владелец токена
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Загрузки данных в кеш, выполняющиеся сейчас в этом процессе, по ключу в redis
+in_flight_loads: dict[str, asyncio.Future] = {}
+# Попадания и промахи запросов, дошедших до redis
+redis_tier_stats = {'hits': 0, 'misses': 0}
+
+
+def get_namespaces(key: str) -> list[str]:
+    """
+    Пространства имен ключа - все его префиксы по '/', включая сам ключ:
+    'menu/submenu/dishes' -> 'menu', 'menu/submenu', 'menu/submenu/dishes'
+    """
+    parts = key.split('/')
+    return ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def get_generation_keys(key: str) -> list[str]:
+    return [GENERATION_PREFIX + namespace for namespace in get_namespaces(key)]
+
+
+def get_versioned_key(key: str, generations: list[bytes | str | None]) -> str:
+    """Ключ в redis с текущими поколениями всех пространств имен ключа"""
+    suffix = '.'.join(
+        generation.decode() if isinstance(generation, bytes) else generation or '0'
+        for generation in generations
+    )
+    return f'{key}@{suffix}'
 
 
 class AsyncRedisCache:
@@ -12,42 +73,222 @@ class AsyncRedisCache:
         self, redis_client: redis.Redis = Depends(get_async_redis_client)
     ) -> None:
         self.redis_client = redis_client
+        self.get_versioned_script = redis_client.register_script(GET_VERSIONED_SCRIPT)
+        self.release_lock_script = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self.versioned_keys: dict[str, str] = {}
 
     async def get_data_from_cache(self, key: str) -> Any | None:
-        """берет данные из кеша"""
-        result = await self.redis_client.get(key)
-        if not result:
+        """берет данные из кеша процесса, если он включен, иначе из redis"""
+        stats = cache_stats[key]
+        if settings.cache_l1_enabled:
+            val = local_cache.get(key)
+            if val is not None:
+                stats.local_hits += 1
+                return val
+        started = perf_counter()
+        versioned_key, result = await self.get_versioned_script(
+            keys=get_generation_keys(key), args=[key]
+        )
+        stats.get_seconds += perf_counter() - started
+        self.versioned_keys[key] = versioned_key.decode()
+        val = None
+        if result:
+            started = perf_counter()
+            val = cache_codec.decode(result)
+            stats.decode_seconds += perf_counter() - started
+        # запись другой версии схемы или кодека - тоже промах
+        if val is None:
+            redis_tier_stats['misses'] += 1
+            stats.misses += 1
             return None
-        val = pickle.loads(result)
+        redis_tier_stats['hits'] += 1
+        stats.hits += 1
+        stats.read_bytes += len(result)
+        if settings.cache_l1_enabled:
+            local_cache.set(key, val)
         return val
 
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int | None = None,
+    ) -> Any:
+        """
+        берет данные из кеша, а при промахе загружает их loader и кладет в кеш
+        на ttl секунд, по умолчанию cache_ttl. На один ключ в процессе
+        выполняется одна загрузка, остальные запросы ждут ее результат; между
+        процессами загрузку разграничивает блокировка в redis, пока она
+        занята - отдается устаревшее значение, если оно есть. Устаревшая
+        копия хранится по ключу без поколений, поэтому переживает и сброс
+        пространства имен
+        """
+        data = await self.get_data_from_cache(key)
+        if data is not None:
+            return data
+        versioned_key = self.versioned_keys[key]
+        in_flight = in_flight_loads.get(versioned_key)
+        if in_flight is not None:
+            data = await asyncio.shield(in_flight)
+            if data is not RETRY_LOAD:
+                return data
+            return await self.get_or_load(key, loader, ttl)
+
+        in_flight = asyncio.get_running_loop().create_future()
+        in_flight_loads[versioned_key] = in_flight
+        try:
+            data = await self._load_once(key, versioned_key, loader, ttl)
+        except asyncio.CancelledError:
+            in_flight.set_result(RETRY_LOAD)
+            raise
+        except Exception as exc:
+            in_flight.set_exception(exc)
+            # ожидающих может не быть - помечаем исключение как полученное
+            in_flight.exception()
+            raise
+        else:
+            in_flight.set_result(data)
+        finally:
+            del in_flight_loads[versioned_key]
+        return data
+
+    async def _load_once(
+        self,
+        key: str,
+        versioned_key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int | None = None,
+    ) -> Any:
+        if not settings.cache_lock_lease_ms:
+            data = await loader()
+            await self._store(key, versioned_key, data, ttl)
+            return data
+
+        lock_key = LOCK_PREFIX + versioned_key
+        token = uuid.uuid4().hex
+        if await self.redis_client.set(
+            lock_key, token, nx=True, px=settings.cache_lock_lease_ms
+        ):
+            try:
+                data = await loader()
+                await self._store(key, versioned_key, data, ttl)
+            finally:
+                await self.release_lock_script(keys=[lock_key], args=[token])
+            return data
+
+        # копия другой версии схемы или кодека не читается (None) - ее не отдаем
+        stale = await self.redis_client.get(STALE_PREFIX + key)
+        if stale:
+            data = cache_codec.decode(stale)
+            if data is not None:
+                drop_etag()
+                return data
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.cache_lock_lease_ms / 1000
+        while loop.time() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            result = await self.redis_client.get(versioned_key)
+            if result:
+                data = cache_codec.decode(result)
+                if data is not None:
+                    return data
+        return await loader()
+
+    async def _store(
+        self, key: str, versioned_key: str, data: Any, ttl: int | None = None
+    ) -> None:
+        """
+        кладет в кеш значение и его копию, которая переживает удаление ключа
+        и сброс его пространств имен и живет вдвое дольше значения
+        """
+        val_bytes = cache_codec.encode(data)
+        ttl = ttl or settings.cache_ttl
+        stats = cache_stats[key]
+        stats.sets += 1
+        stats.written_bytes += len(val_bytes)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(versioned_key, val_bytes, ex=ttl)
+            pipe.set(STALE_PREFIX + key, val_bytes, ex=ttl * 2)
+            await pipe.execute()
+        if settings.cache_l1_enabled:
+            local_cache.set(key, data)
+
     async def set_data_to_cache(
         self, key: str, value: Any, background_tasks: BackgroundTasks
     ) -> None:
         """добавляет данные в кеш"""
 
-        val_bytes = pickle.dumps(value)
+        val_bytes = cache_codec.encode(value)
         background_tasks.add_task(self._set_cache, key, val_bytes)
+        if settings.cache_l1_enabled:
+            local_cache.set(key, value)
 
     async def _set_cache(self, key: str, data: Any) -> None:
-        await self.redis_client.set(key, data)
+        (versioned_key,) = await self._get_versioned_keys(key)
+        await self.redis_client.set(versioned_key, data, ex=settings.cache_ttl)
+        stats = cache_stats[key]
+        stats.sets += 1
+        stats.written_bytes += len(data)
 
     async def delete_data_from_cache(
-        self, *keys: str, background_tasks: BackgroundTasks
+        self, *keys: str, background_tasks: BackgroundTasks | None
     ) -> None:
-        """удаляет данные из кеша"""
+        """удаляет данные из кеша, без background_tasks - сразу"""
+        if background_tasks is None:
+            await self._delete_cache(*keys)
+            return
         background_tasks.add_task(self._delete_cache, *keys)
 
     async def _delete_cache(self, *keys: str) -> None:
-        await self.redis_client.delete(*keys)
+        await self.redis_client.delete(*await self._get_versioned_keys(*keys))
+        cache_stats.add_invalidations(*keys)
+        await publish_invalidation(self.redis_client, keys=keys)
 
     async def clear_namespace_from_cache(
-        self, namespace: str, background_tasks: BackgroundTasks
+        self, *namespaces: str, background_tasks: BackgroundTasks | None
     ) -> None:
-        """удаляет данные из кеша с ключами, начинающимися на namespace"""
-        background_tasks.add_task(self._clear_namespace_cache, namespace)
+        """
+        делает недоступными данные кеша с ключами из пространств имен namespaces:
+        увеличивает поколения namespaces, старые ключи истекают сами по ttl.
+        Без background_tasks - сразу
+        """
+        if background_tasks is None:
+            await self._clear_namespace_cache(*namespaces)
+            return
+        background_tasks.add_task(self._clear_namespace_cache, *namespaces)
+
+    async def _clear_namespace_cache(self, *namespaces: str) -> None:
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for namespace in namespaces:
+                generation_key = GENERATION_PREFIX + namespace
+                pipe.incr(generation_key)
+                pipe.expire(generation_key, settings.cache_ttl * 2)
+            await pipe.execute()
+        self.versioned_keys.clear()
+        cache_stats.add_invalidations(*namespaces)
+        await publish_invalidation(self.redis_client, namespaces=namespaces)
 
-    async def _clear_namespace_cache(self, namespace: str) -> None:
-        ns_keys = namespace + '*'
-        async for key in self.redis_client.scan_iter(ns_keys):
-            await self.redis_client.delete(key)
+    async def _get_versioned_keys(self, *keys: str) -> list[str]:
+        """
+        Ключи в redis с текущими поколениями; для ключей, прочитанных в этом
+        запросе, берутся поколения на момент чтения, чтобы не записать
+        устаревшие данные под новым поколением
+        """
+        unknown_keys = [key for key in keys if key not in self.versioned_keys]
+        if unknown_keys:
+            generation_keys = [get_generation_keys(key) for key in unknown_keys]
+            generations = await self.redis_client.mget(
+                [
+                    generation_key
+                    for key_generation_keys in generation_keys
+                    for generation_key in key_generation_keys
+                ]
+            )
+            position = 0
+            for key, key_generation_keys in zip(unknown_keys, generation_keys):
+                end = position + len(key_generation_keys)
+                self.versioned_keys[key] = get_versioned_key(
+                    key, generations[position:end]
+                )
+                position = end
+        return [self.versioned_keys[key] for key in keys]
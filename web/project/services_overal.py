@@ -1,57 +1,94 @@
+from typing import Collection
+
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import ARRAY, Row, Select, String, and_, any_, column, literal, select
+from sqlalchemy import values as values_clause
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Values
+from sqlalchemy.sql.elements import ColumnElement
 
-from .database import get_async_redis_client
 from .models import Dish, Menu, Submenu
-from .service_redis import AsyncRedisCache
 
 
-async def validate_menu(db: AsyncSession, target_menu_id: str) -> None:
-    res_q = await db.execute(select(Menu).where(Menu.id == target_menu_id))
-    result = res_q.one_or_none()
-    if not result:
+def select_path(
+    target_menu_id: str,
+    target_submenu_id: str | None = None,
+    target_dish_id: str | None = None,
+) -> Select:
+    """
+    Запрос, проверяющий весь путь меню -> подменю -> блюдо одним select.
+    Отсутствующий уровень пути возвращается как NULL в колонке
+    submenu_id или dish_id, если меню нет - запрос не вернет строк.
+    """
+    q = select(Menu.id.label('menu_id')).where(Menu.id == target_menu_id)
+    if target_submenu_id is not None:
+        q = q.add_columns(Submenu.id.label('submenu_id')).outerjoin(
+            Submenu,
+            and_(Submenu.menu_id == Menu.id, Submenu.id == target_submenu_id),
+        )
+    if target_dish_id is not None:
+        q = q.add_columns(Dish.id.label('dish_id')).outerjoin(
+            Dish, and_(Dish.submenu_id == Submenu.id, Dish.id == target_dish_id)
+        )
+    return q
+
+
+def check_path(
+    row: Row | None,
+    target_submenu_id: str | None = None,
+    target_dish_id: str | None = None,
+) -> None:
+    """Проверяет результат select_path и сообщает, какой уровень пути не найден"""
+    if row is None:
         raise HTTPException(status_code=404, detail='menu not found')
+    if target_submenu_id is not None and row.submenu_id is None:
+        raise HTTPException(status_code=404, detail='submenu not found')
+    if target_dish_id is not None and row.dish_id is None:
+        raise HTTPException(status_code=404, detail='dish not found')
+
+
+async def validate_menu(db: AsyncSession, target_menu_id: str) -> None:
+    res_q = await db.execute(select_path(target_menu_id=target_menu_id))
+    check_path(res_q.one_or_none())
 
 
 async def validate_submenu(
     db: AsyncSession, target_menu_id: str, target_submenu_id: str
 ) -> None:
-    await validate_menu(db=db, target_menu_id=target_menu_id)
     res_q = await db.execute(
-        select(Submenu).where(
-            Submenu.id == target_submenu_id, Submenu.menu_id == target_menu_id
-        )
+        select_path(target_menu_id=target_menu_id, target_submenu_id=target_submenu_id)
     )
-    result = res_q.one_or_none()
-    if not result:
-        raise HTTPException(status_code=404, detail='submenu not found')
+    check_path(res_q.one_or_none(), target_submenu_id=target_submenu_id)
 
 
 async def validate_dish(
     db: AsyncSession, target_menu_id: str, target_submenu_id: str, target_dish_id: str
 ) -> None:
-    await validate_submenu(
-        db=db, target_menu_id=target_menu_id, target_submenu_id=target_submenu_id
-    )
     res_q = await db.execute(
-        select(Dish).where(
-            Dish.id == target_dish_id, Dish.submenu_id == target_submenu_id
+        select_path(
+            target_menu_id=target_menu_id,
+            target_submenu_id=target_submenu_id,
+            target_dish_id=target_dish_id,
         )
     )
-    result = res_q.one_or_none()
-    if not result:
-        raise HTTPException(status_code=404, detail='dish not found')
+    check_path(
+        res_q.one_or_none(),
+        target_submenu_id=target_submenu_id,
+        target_dish_id=target_dish_id,
+    )
+
+
+def id_in(target_column: ColumnElement, ids: Collection[str]) -> ColumnElement:
+    """target_column = ANY(:ids) - список передается одним параметром-массивом"""
+    return target_column == any_(literal(list(ids), ARRAY(String)))
 
 
-async def get_dish_price_with_discount(dish_id: str, dish_price: str) -> str:
-    redis_cl = await get_async_redis_client()
-    redis_client = AsyncRedisCache(redis_cl)
-    key_discount = '/'.join([dish_id, 'discount'])
-    discount = await redis_client.get_data_from_cache(key=key_discount)
-    if discount:
-        price_float = float(dish_price) * (100 - float(discount)) / 100
-        price = str(round(price_float, 2))
-    else:
-        price = str(dish_price)
-    return price
+def values_table(name: str, *columns: str, rows: list[tuple]) -> Values:
+    """
+    VALUES-таблица из строк rows для UPDATE ... FROM: изменение многих строк
+    одним запросом. Все колонки строковые, нестроковые значения приводятся
+    к типу колонки в самом запросе.
+    """
+    return values_clause(
+        *[column(column_name, String) for column_name in columns], name=name
+    ).data(rows)
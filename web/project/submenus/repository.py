@@ -1,12 +1,22 @@
+from operator import attrgetter
+
 from fastapi import Depends
 from project.database import get_db
 from project.menus.schemas import MenuInSchema
-from project.models import Dish, Submenu
-from project.services_overal import validate_menu, validate_submenu
-from sqlalchemy import delete, distinct, func, insert, select, update
+from project.models import Menu, Submenu, generate_uuid
+from project.pagination import Page, get_page, paginate
+from project.services_overal import (
+    check_path,
+    id_in,
+    select_path,
+    validate_menu,
+    validate_submenu,
+    values_table,
+)
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .schemas import SubMenuOutSchema
+from .schemas import SubMenuBulkUpdateSchema, SubMenuOutSchema
 
 
 class SubmenuRepository:
@@ -16,50 +26,46 @@ class SubmenuRepository:
     async def read_submenu(
         self, target_menu_id: str, target_submenu_id: str
     ) -> SubMenuOutSchema:
-        await validate_submenu(
-            db=self.db,
-            target_menu_id=target_menu_id,
-            target_submenu_id=target_submenu_id,
-        )
         q = await self.db.execute(
-            select(
-                Submenu,
-                func.count(distinct(Dish.id)).label('dishes_count'),
-            )
-            .where(Submenu.id == target_submenu_id)
-            .outerjoin(Dish, Dish.submenu_id == Submenu.id)
-            .group_by(Submenu.id)
+            select_path(
+                target_menu_id=target_menu_id, target_submenu_id=target_submenu_id
+            ).add_columns(Submenu)
         )
         result = q.one_or_none()
+        check_path(result, target_submenu_id=target_submenu_id)
         return SubMenuOutSchema(
             id=result.Submenu.id,
             title=result.Submenu.title,
             description=result.Submenu.description,
-            dishes_count=result.dishes_count,
+            dishes_count=result.Submenu.dishes_count,
         )
 
-    async def read_submenus(self, target_menu_id: str) -> list[SubMenuOutSchema]:
+    async def read_submenus(
+        self, target_menu_id: str, limit: int, after_id: str | None
+    ) -> Page:
         await validate_menu(db=self.db, target_menu_id=target_menu_id)
         q = await self.db.execute(
-            select(
-                Submenu,
-                func.count(distinct(Dish.id)).label('dishes_count'),
+            paginate(
+                select(Submenu).where(Submenu.menu_id == target_menu_id),
+                Submenu.id,
+                limit,
+                after_id,
             )
-            .where(Submenu.menu_id == target_menu_id)
-            .outerjoin(Dish, Dish.submenu_id == Submenu.id)
-            .group_by(Submenu.id)
         )
-        submenus = q.all()
-        print(submenus)
-        return [
-            SubMenuOutSchema(
-                id=result.Submenu.id,
-                title=result.Submenu.title,
-                description=result.Submenu.description,
-                dishes_count=result.dishes_count,
-            )
-            for result in submenus
-        ]
+        submenus = q.scalars().all()
+        return get_page(
+            [
+                SubMenuOutSchema(
+                    id=submenu.id,
+                    title=submenu.title,
+                    description=submenu.description,
+                    dishes_count=submenu.dishes_count,
+                )
+                for submenu in submenus
+            ],
+            limit,
+            get_id=attrgetter('id'),
+        )
 
     async def create_submenu(
         self, target_menu_id: str, submenu: MenuInSchema
@@ -73,6 +79,11 @@ class SubmenuRepository:
             )
         )
         new_submenu_id = insert_submenu_query.inserted_primary_key[0]
+        await self.db.execute(
+            update(Menu)
+            .values(submenus_count=Menu.submenus_count + 1)
+            .where(Menu.id == target_menu_id)
+        )
         await self.db.commit()
         q = await self.db.execute(select(Submenu).where(Submenu.id == new_submenu_id))
         inserted_submenu = q.scalars().one_or_none()
@@ -111,6 +122,128 @@ class SubmenuRepository:
             target_menu_id=target_menu_id,
             target_submenu_id=target_submenu_id,
         )
-        await self.db.execute(delete(Submenu).where(Submenu.id == target_submenu_id))
+        deleted_submenu = await self.db.execute(
+            delete(Submenu)
+            .where(Submenu.id == target_submenu_id)
+            .returning(Submenu.dishes_count)
+        )
+        await self.db.execute(
+            update(Menu)
+            .values(
+                submenus_count=Menu.submenus_count - 1,
+                dishes_count=Menu.dishes_count - deleted_submenu.scalar_one(),
+            )
+            .where(Menu.id == target_menu_id)
+        )
         await self.db.commit()
         return {'status': True, 'message': 'The submenu has been deleted'}
+
+    async def create_submenus(
+        self, target_menu_id: str, submenus: list[MenuInSchema]
+    ) -> list[dict[str, str | bool | SubMenuOutSchema]]:
+        await validate_menu(db=self.db, target_menu_id=target_menu_id)
+        new_submenus = [(generate_uuid(), submenu) for submenu in submenus]
+        await self.db.execute(
+            insert(Submenu).values(
+                [
+                    dict(
+                        id=submenu_id,
+                        title=submenu.title,
+                        description=submenu.description,
+                        menu_id=target_menu_id,
+                    )
+                    for submenu_id, submenu in new_submenus
+                ]
+            )
+        )
+        await self.db.execute(
+            update(Menu)
+            .values(submenus_count=Menu.submenus_count + len(submenus))
+            .where(Menu.id == target_menu_id)
+        )
+        await self.db.commit()
+        return [
+            {
+                'id': submenu_id,
+                'message': 'The submenu has been created',
+                'submenu': SubMenuOutSchema(
+                    id=submenu_id,
+                    title=submenu.title,
+                    description=submenu.description,
+                    dishes_count=0,
+                ),
+            }
+            for submenu_id, submenu in new_submenus
+        ]
+
+    async def update_submenus(
+        self, target_menu_id: str, submenus: list[SubMenuBulkUpdateSchema]
+    ) -> list[dict[str, str | bool | SubMenuOutSchema | None]]:
+        await validate_menu(db=self.db, target_menu_id=target_menu_id)
+        data = values_table(
+            'data',
+            'id',
+            'title',
+            'description',
+            rows=[
+                (submenu.id, submenu.title, submenu.description) for submenu in submenus
+            ],
+        )
+        q = await self.db.execute(
+            update(Submenu.__table__)
+            .where(Submenu.id == data.c.id, Submenu.menu_id == target_menu_id)
+            .values(title=data.c.title, description=data.c.description)
+            .returning(
+                Submenu.id, Submenu.title, Submenu.description, Submenu.dishes_count
+            )
+        )
+        updated = {row.id: row for row in q}
+        await self.db.commit()
+        return [
+            (
+                {
+                    'id': submenu.id,
+                    'message': 'The submenu has been updated',
+                    'submenu': SubMenuOutSchema(
+                        id=submenu.id,
+                        title=updated[submenu.id].title,
+                        description=updated[submenu.id].description,
+                        dishes_count=updated[submenu.id].dishes_count,
+                    ),
+                }
+                if submenu.id in updated
+                else {'id': submenu.id, 'status': False, 'message': 'submenu not found'}
+            )
+            for submenu in submenus
+        ]
+
+    async def del_submenus(
+        self, target_menu_id: str, target_submenu_ids: list[str]
+    ) -> list[dict[str, str | bool]]:
+        await validate_menu(db=self.db, target_menu_id=target_menu_id)
+        q = await self.db.execute(
+            delete(Submenu.__table__)
+            .where(
+                Submenu.menu_id == target_menu_id,
+                id_in(Submenu.id, target_submenu_ids),
+            )
+            .returning(Submenu.id, Submenu.dishes_count)
+        )
+        deleted = {row.id: row.dishes_count for row in q}
+        await self.db.execute(
+            update(Menu)
+            .values(
+                submenus_count=Menu.submenus_count - len(deleted),
+                dishes_count=Menu.dishes_count - sum(deleted.values()),
+            )
+            .where(Menu.id == target_menu_id)
+        )
+        await self.db.commit()
+        return [
+            (
+                {'id': submenu_id, 'message': 'The submenu has been deleted'}
+                if submenu_id in deleted
+                else {'id': submenu_id, 'status': False, 'message': 'submenu not found'}
+            )
+            for submenu_id in target_submenu_ids
+        ]
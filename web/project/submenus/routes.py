@@ -7,16 +7,124 @@ routes.py
 
 from typing import Union
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from project.menus.schemas import MenuInSchema
-from project.schemas_overal import CorrectDeleteSchema, NotFoundSchema
+from project.pagination import PageParams
+from project.schemas_overal import (
+    BULK_MAX_ITEMS,
+    BulkDeleteSchema,
+    CorrectDeleteSchema,
+    NotFoundSchema,
+)
+from project.versions import ConditionalGet
+from pydantic import conlist
 
-from .schemas import SubMenuOutSchema
+from .schemas import SubMenuBulkResultSchema, SubMenuBulkUpdateSchema, SubMenuOutSchema
 from .services import SubmenuService
 
+# тела bulk-запросов: от 1 до BULK_MAX_ITEMS подменю
+SubmenusInBulk = conlist(MenuInSchema, min_items=1, max_items=BULK_MAX_ITEMS)
+SubmenusUpdateBulk = conlist(
+    SubMenuBulkUpdateSchema, min_items=1, max_items=BULK_MAX_ITEMS
+)
+
 router = APIRouter(prefix='/menus/{target_menu_id}/submenus', tags=['SubMenus'])
 
 
+# bulk-эндпоинты объявлены раньше эндпоинтов с {target_submenu_id},
+# иначе PATCH /bulk попадет в patch_submenu_handler
+
+
+@router.post(
+    '/bulk',
+    summary='Публикация нескольких подменю',
+    response_description='Результаты по каждому подменю в порядке запроса',
+    response_model=Union[list[SubMenuBulkResultSchema], NotFoundSchema],
+    status_code=201,
+)
+async def post_submenus_bulk_handler(
+    target_menu_id: str,
+    submenus: SubmenusInBulk,  # type: ignore[valid-type]
+    response: SubmenuService = Depends(),
+) -> list[dict[str, str | bool | SubMenuOutSchema]]:
+    """
+    Эндпоинт публикации нескольких подменю одним запросом и одной транзакцией
+    \f
+    :param target_menu_id: str
+        Идентификатор меню в БД
+    :param submenus: list[MenuInSchema]
+        данные подменю из pedantic-схемы ввода данных
+    :param response: SubmenuService
+        Обьект ответа на запрос из сервиса подменю
+
+    :return: Union[list[SubMenuBulkResultSchema], NotFoundSchema]
+        Pydantic-схема для фронтенда с подменю или ошибкой
+    """
+    return await response.create_submenus(
+        target_menu_id=target_menu_id, submenus=submenus
+    )
+
+
+@router.patch(
+    '/bulk',
+    summary='Изменение нескольких подменю',
+    response_description='Результаты по каждому подменю в порядке запроса',
+    response_model=Union[list[SubMenuBulkResultSchema], NotFoundSchema],
+    status_code=200,
+)
+async def patch_submenus_bulk_handler(
+    target_menu_id: str,
+    submenus: SubmenusUpdateBulk,  # type: ignore[valid-type]
+    response: SubmenuService = Depends(),
+) -> list[dict[str, str | bool | SubMenuOutSchema | None]]:
+    """
+    Эндпоинт изменения нескольких подменю одним запросом и одной транзакцией
+    \f
+    :param target_menu_id: str
+        Идентификатор меню в СУБД
+    :param submenus: list[SubMenuBulkUpdateSchema]
+        идентификаторы и данные подменю из pedantic-схемы ввода данных
+    :param response: SubmenuService
+        Обьект ответа на запрос из сервиса подменю
+
+    :return: Union[list[SubMenuBulkResultSchema], NotFoundSchema]
+        Pydantic-схема для фронтенда с подменю или ошибкой
+    """
+    return await response.update_submenus(
+        target_menu_id=target_menu_id, submenus=submenus
+    )
+
+
+@router.post(
+    '/bulk/delete',
+    summary='Удаление нескольких подменю',
+    response_description='Результаты по каждому подменю в порядке запроса',
+    response_model=Union[list[SubMenuBulkResultSchema], NotFoundSchema],
+    status_code=200,
+)
+async def delete_submenus_bulk_handler(
+    target_menu_id: str,
+    submenus: BulkDeleteSchema,
+    response: SubmenuService = Depends(),
+) -> list[dict[str, str | bool]]:
+    """
+    Эндпоинт удаления нескольких подменю с их блюдами по id одним запросом
+    \f
+    :param target_menu_id: str
+        Идентификатор меню в СУБД
+    :param submenus: BulkDeleteSchema
+        идентификаторы удаляемых подменю
+    :param response: SubmenuService
+        Обьект ответа на запрос из сервиса подменю
+
+    :return: Union[list[SubMenuBulkResultSchema], NotFoundSchema]
+        Pydantic-схема для фронтенда с результатами удаления или ошибкой
+    """
+    return await response.del_submenus(
+        target_menu_id=target_menu_id, target_submenu_ids=submenus.ids
+    )
+
+
 @router.get(
     '/{target_submenu_id}',
     summary='Получение подменю по id',
@@ -28,7 +136,8 @@ async def get_submenu_handler(
     target_menu_id: str,
     target_submenu_id: str,
     response: SubmenuService = Depends(),
-) -> SubMenuOutSchema:
+    conditional: ConditionalGet = Depends(),
+) -> SubMenuOutSchema | Response:
     """
      Эндпоинт возвращает подменю по идентификатору или сообщение об ошибке
      \f
@@ -38,11 +147,14 @@ async def get_submenu_handler(
          Идентификатор подменю в БД
     :param response: SubmenuService
          Обьект ответа на запрос из сервиса подменю
+    :param conditional: ConditionalGet
+         Проверка If-None-Match по версии ресурса
 
      :return: Union[SubMenuOutSchema, NotFoundSchema]
          Pydantic-схема для фронтенда с подменю или ошибкой
     """
-
+    if await conditional.is_not_modified(target_menu_id, target_submenu_id):
+        return conditional.not_modified_response()
     return await response.read_submenu(
         target_menu_id=target_menu_id, target_submenu_id=target_submenu_id
     )
@@ -58,19 +170,31 @@ async def get_submenu_handler(
 async def get_submenus_handler(
     target_menu_id: str,
     response: SubmenuService = Depends(),
-) -> list[SubMenuOutSchema]:
+    conditional: ConditionalGet = Depends(),
+    page: PageParams = Depends(),
+) -> list[SubMenuOutSchema] | Response:
     """
-     Эндпоинт возвращает все подменю
+     Эндпоинт возвращает страницу подменю по порядку id
      \f
      :param target_menu_id: str
          Идентификатор меню в БД
     :param response: SubmenuService
          Обьект ответа на запрос из сервиса подменю
+    :param conditional: ConditionalGet
+         Проверка If-None-Match по версии ресурса
+    :param page: PageParams
+         Размер страницы и курсор, курсор следующей страницы - в X-Next-Cursor
 
      :return: Union[List[SubMenuOutSchema], NotFoundSchema]
          Pydantic-схема для фронтенда с подменю или ошибка
     """
-    return await response.read_submenus(target_menu_id=target_menu_id)
+    if await conditional.is_not_modified(target_menu_id):
+        return conditional.not_modified_response()
+    return page.get_items(
+        await response.read_submenus(
+            target_menu_id=target_menu_id, limit=page.limit, after_id=page.after_id
+        )
+    )
 
 
 @router.post(
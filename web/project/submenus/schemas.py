@@ -7,6 +7,7 @@ schemas.py
 """
 
 from project.dishes.schemas import DishOutSchema
+from project.schemas_overal import BulkResultSchema
 from pydantic import BaseModel
 
 
@@ -45,6 +46,32 @@ class SubMenuOutSchema(BaseSubMenu):
         orm_mode = True
 
 
+class SubMenuBulkUpdateSchema(BaseSubMenu):
+    """
+    Pydantic-схема подменю для изменения нескольких подменю одним запросом
+
+    Parameters
+    ----------
+    id: str
+        Идентификатор изменяемого подменю в СУБД
+    """
+
+    id: str
+
+
+class SubMenuBulkResultSchema(BulkResultSchema):
+    """
+    Pydantic-схема результата bulk-операции над одним подменю
+
+    Parameters
+    ----------
+    submenu: SubMenuOutSchema | None
+        данные подменю после создания или изменения
+    """
+
+    submenu: SubMenuOutSchema | None = None
+
+
 class SubMenuFullOutSchema(BaseSubMenu):
     """
     Pydantic-схема для вывода данных о подменю c данными блюд
@@ -2,10 +2,12 @@ import redis.asyncio as redis
 from fastapi import BackgroundTasks, Depends
 from project.database import get_async_redis_client
 from project.menus.schemas import MenuInSchema
+from project.pagination import Page, get_page_key
 from project.service_redis import AsyncRedisCache
+from project.versions import EntityVersions, get_version_paths
 
 from .repository import SubmenuRepository
-from .schemas import SubMenuOutSchema
+from .schemas import SubMenuBulkUpdateSchema, SubMenuOutSchema
 
 
 class SubmenuService:
@@ -17,6 +19,7 @@ class SubmenuService:
     ):
         self.submenu_repository = submenu_repository
         self.cache = AsyncRedisCache(redis_client)
+        self.versions = EntityVersions(redis_client)
         self.background_tasks = background_tasks
 
     async def read_submenu(
@@ -34,13 +37,17 @@ class SubmenuService:
         )
         return result
 
-    async def read_submenus(self, target_menu_id: str) -> list[SubMenuOutSchema]:
-        key_submenus = '/'.join([target_menu_id, 'submenus'])
+    async def read_submenus(
+        self, target_menu_id: str, limit: int, after_id: str | None
+    ) -> Page:
+        key_submenus = get_page_key(
+            '/'.join([target_menu_id, 'submenus']), limit, after_id
+        )
         data = await self.cache.get_data_from_cache(key=key_submenus)
         if data is not None:
             return data
         submenus = await self.submenu_repository.read_submenus(
-            target_menu_id=target_menu_id
+            target_menu_id=target_menu_id, limit=limit, after_id=after_id
         )
         await self.cache.set_data_to_cache(
             key=key_submenus, value=submenus, background_tasks=self.background_tasks
@@ -55,12 +62,12 @@ class SubmenuService:
         )
         key_submenus = '/'.join([target_menu_id, 'submenus'])
         await self.cache.delete_data_from_cache(
-            'all_menus',
-            'all_menus_whole',
-            target_menu_id,
-            key_submenus,
-            background_tasks=self.background_tasks,
+            'all_menus_whole', target_menu_id, background_tasks=None
         )
+        await self.cache.clear_namespace_from_cache(
+            'all_menus', key_submenus, background_tasks=None
+        )
+        await self.versions.bump(*get_version_paths(target_menu_id))
 
         return inserted_submenu
 
@@ -73,16 +80,15 @@ class SubmenuService:
         key_submenus = '/'.join([target_menu_id, 'submenus'])
         key_submenu = '/'.join([target_menu_id, target_submenu_id])
         await self.cache.delete_data_from_cache(
-            'all_menus',
-            'all_menus_whole',
-            target_menu_id,
-            key_submenu,
-            key_submenus,
-            background_tasks=self.background_tasks,
+            'all_menus_whole', target_menu_id, background_tasks=None
         )
         await self.cache.clear_namespace_from_cache(
-            key_submenu, background_tasks=self.background_tasks
+            'all_menus',
+            key_submenus,
+            key_submenu,
+            background_tasks=None,
         )
+        await self.versions.bump(*get_version_paths(target_menu_id, target_submenu_id))
         return result
 
     async def update_submenu(
@@ -99,9 +105,66 @@ class SubmenuService:
         key_submenu = '/'.join([target_menu_id, target_submenu_id])
         key_submenus = '/'.join([target_menu_id, 'submenus'])
         await self.cache.delete_data_from_cache(
-            'all_menus_whole',
-            key_submenu,
-            key_submenus,
-            background_tasks=self.background_tasks,
+            'all_menus_whole', key_submenu, background_tasks=None
         )
+        await self.cache.clear_namespace_from_cache(key_submenus, background_tasks=None)
+        await self.versions.bump(*get_version_paths(target_menu_id, target_submenu_id))
         return changed_submenu
+
+    async def invalidate_submenus(
+        self,
+        target_menu_id: str,
+        target_submenu_ids: list[str],
+        deleted: bool = False,
+    ) -> None:
+        """один раз сбрасывает кеш и версии после bulk-операции над подменю"""
+        keys_submenu = [
+            '/'.join([target_menu_id, submenu_id]) for submenu_id in target_submenu_ids
+        ]
+        await self.cache.delete_data_from_cache(
+            'all_menus_whole',
+            target_menu_id,
+            *keys_submenu,
+            background_tasks=None,
+        )
+        await self.cache.clear_namespace_from_cache(
+            'all_menus',
+            '/'.join([target_menu_id, 'submenus']),
+            *(keys_submenu if deleted else []),
+            background_tasks=None,
+        )
+        await self.versions.bump(*get_version_paths(target_menu_id), *keys_submenu)
+
+    async def create_submenus(
+        self, target_menu_id: str, submenus: list[MenuInSchema]
+    ) -> list[dict[str, str | bool | SubMenuOutSchema]]:
+        result = await self.submenu_repository.create_submenus(
+            target_menu_id=target_menu_id, submenus=submenus
+        )
+        await self.invalidate_submenus(target_menu_id, [])
+        return result
+
+    async def update_submenus(
+        self, target_menu_id: str, submenus: list[SubMenuBulkUpdateSchema]
+    ) -> list[dict[str, str | bool | SubMenuOutSchema | None]]:
+        result = await self.submenu_repository.update_submenus(
+            target_menu_id=target_menu_id, submenus=submenus
+        )
+        await self.invalidate_submenus(
+            target_menu_id,
+            [str(item['id']) for item in result if item.get('status', True)],
+        )
+        return result
+
+    async def del_submenus(
+        self, target_menu_id: str, target_submenu_ids: list[str]
+    ) -> list[dict[str, str | bool]]:
+        result = await self.submenu_repository.del_submenus(
+            target_menu_id=target_menu_id, target_submenu_ids=target_submenu_ids
+        )
+        await self.invalidate_submenus(
+            target_menu_id,
+            [str(item['id']) for item in result if item.get('status', True)],
+            deleted=True,
+        )
+        return result
@@ -0,0 +1,132 @@
+"""
+versions.py
+----------
+Модуль реализует счетчики версий меню, подменю, блюд и списков в redis
+и условные GET-запросы по ETag, собранному из этих версий.
+
+Путь сущности - ее идентификатор вместе с идентификаторами родителей:
+'menu', 'menu/submenu', 'menu/submenu/dish'. Запись в сущность увеличивает
+версии ее пути, всех родительских путей и списка всех меню, поэтому ETag
+сущности, собранный из версий всех префиксов ее пути, меняется и при
+удалении или изменении родителя.
+
+"""
+
+import uuid
+from contextvars import ContextVar
+
+import redis.asyncio as redis
+from fastapi import Depends, Request, Response
+
+from .config import settings
+from .database import get_async_redis_client
+
+VERSION_PREFIX = 'ver:'
+EPOCH_KEY = 'ver:epoch'
+ALL_MENUS_PATH = 'menus'
+# условный GET, который обрабатывается в текущем запросе
+current_conditional: ContextVar['ConditionalGet | None'] = ContextVar(
+    'current_conditional', default=None
+)
+
+
+def get_entity_path(*ids: str | None) -> str:
+    return '/'.join(entity_id for entity_id in ids if entity_id is not None)
+
+
+def get_version_paths(
+    target_menu_id: str | None = None,
+    target_submenu_id: str | None = None,
+    target_dish_id: str | None = None,
+) -> list[str]:
+    """Пути, версии которых меняются при записи в сущность"""
+    ids = [target_menu_id, target_submenu_id, target_dish_id]
+    return [ALL_MENUS_PATH] + [
+        get_entity_path(*ids[:depth])
+        for depth in range(1, len(ids) + 1)
+        if ids[depth - 1] is not None
+    ]
+
+
+class EntityVersions:
+    def __init__(
+        self, redis_client: redis.Redis = Depends(get_async_redis_client)
+    ) -> None:
+        self.redis_client = redis_client
+
+    async def get_etag(self, path: str) -> str:
+        """
+        ETag ресурса path. Эпоха меняется, если версии пропали из redis,
+        поэтому после очистки redis старые ETag не совпадут с новыми.
+        """
+        prefixes = [path]
+        if path != ALL_MENUS_PATH:
+            parts = path.split('/')
+            prefixes = ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.set(EPOCH_KEY, uuid.uuid4().hex[:8], nx=True)
+            pipe.mget([EPOCH_KEY] + [VERSION_PREFIX + prefix for prefix in prefixes])
+            _, (epoch, *versions) = await pipe.execute()
+        parts = [epoch.decode()]
+        parts += [version.decode() if version else '0' for version in versions]
+        return 'W/"{}"'.format('-'.join(parts))
+
+    async def bump(self, *paths: str) -> None:
+        """
+        увеличивает версии путей. Вызывается после сброса кеша: GET между
+        увеличением версии и сбросом получил бы новый ETag со старыми данными
+        """
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for path in paths:
+                pipe.incr(VERSION_PREFIX + path)
+            await pipe.execute()
+
+
+class ConditionalGet:
+    """
+    Зависимость для GET-эндпоинтов: выставляет ETag и Cache-Control и
+    проверяет If-None-Match без обращения к БД и к данным кеша
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        response: Response,
+        redis_client: redis.Redis = Depends(get_async_redis_client),
+    ) -> None:
+        self.request = request
+        self.response = response
+        self.versions = EntityVersions(redis_client)
+        self.etag = ''
+
+    async def is_not_modified(self, *ids: str | None) -> bool:
+        """ids - идентификаторы пути ресурса, без них - списки всех меню"""
+        path = get_entity_path(*ids) or ALL_MENUS_PATH
+        self.etag = await self.versions.get_etag(path)
+        self.response.headers.update(self.headers)
+        current_conditional.set(self)
+        if_none_match = self.request.headers.get('if-none-match')
+        if not if_none_match:
+            return False
+        client_etags = {
+            etag.strip().removeprefix('W/') for etag in if_none_match.split(',')
+        }
+        return '*' in client_etags or self.etag.removeprefix('W/') in client_etags
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """заголовки для ответов, которые возвращаются из эндпоинта напрямую"""
+        return {'ETag': self.etag, 'Cache-Control': settings.http_cache_control}
+
+    def not_modified_response(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+
+def drop_etag() -> None:
+    """
+    Убирает ETag из ответа текущего запроса, собранного из устаревшей копии
+    кеша: ETag уже новой версии и закрепил бы за ней старые данные
+    """
+    conditional = current_conditional.get()
+    if conditional is not None and 'etag' in conditional.response.headers:
+        del conditional.response.headers['etag']
@@ -2,6 +2,7 @@ import asyncio
 import os
 from asyncio import AbstractEventLoop
 from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager
 from typing import Any, AsyncGenerator, Callable
 
 import pytest
@@ -10,7 +11,7 @@ from httpx import AsyncClient
 from project.database import Base, async_session, engine, get_async_redis_client
 from project.main import app
 from project.models import Dish, Menu, Submenu
-from sqlalchemy import insert, select
+from sqlalchemy import event, insert, select, update
 
 
 @pytest.fixture(scope='session')
@@ -22,6 +23,9 @@ def reverse() -> Callable:
             ),
             'get_menus': app.url_path_for('get_menus_handler'),
             'get_menus_whole': app.url_path_for('get_menus_whole_handler'),
+            'get_menus_whole_stream': app.url_path_for(
+                'get_menus_whole_stream_handler'
+            ),
             'post_menus': app.url_path_for('post_menus_handler'),
             'patch_menu': app.url_path_for(
                 'patch_menu_handler', target_menu_id=kwargs.get('target_menu_id')
@@ -50,6 +54,18 @@ def reverse() -> Callable:
                 target_menu_id=kwargs.get('target_menu_id'),
                 target_submenu_id=kwargs.get('target_submenu_id'),
             ),
+            'post_submenus_bulk': app.url_path_for(
+                'post_submenus_bulk_handler',
+                target_menu_id=kwargs.get('target_menu_id'),
+            ),
+            'patch_submenus_bulk': app.url_path_for(
+                'patch_submenus_bulk_handler',
+                target_menu_id=kwargs.get('target_menu_id'),
+            ),
+            'delete_submenus_bulk': app.url_path_for(
+                'delete_submenus_bulk_handler',
+                target_menu_id=kwargs.get('target_menu_id'),
+            ),
             'get_dish': app.url_path_for(
                 'get_dish_handler',
                 target_menu_id=kwargs.get('target_menu_id'),
@@ -78,6 +94,41 @@ def reverse() -> Callable:
                 target_submenu_id=kwargs.get('target_submenu_id'),
                 target_dish_id=kwargs.get('target_dish_id'),
             ),
+            'post_dishes_bulk': app.url_path_for(
+                'post_dishes_bulk_handler',
+                target_menu_id=kwargs.get('target_menu_id'),
+                target_submenu_id=kwargs.get('target_submenu_id'),
+            ),
+            'patch_dishes_bulk': app.url_path_for(
+                'patch_dishes_bulk_handler',
+                target_menu_id=kwargs.get('target_menu_id'),
+                target_submenu_id=kwargs.get('target_submenu_id'),
+            ),
+            'delete_dishes_bulk': app.url_path_for(
+                'delete_dishes_bulk_handler',
+                target_menu_id=kwargs.get('target_menu_id'),
+                target_submenu_id=kwargs.get('target_submenu_id'),
+            ),
+            'search_dishes': app.url_path_for('search_dishes_handler'),
+            'get_discounts': app.url_path_for('get_discounts_handler'),
+            'get_discount': app.url_path_for(
+                'get_discount_handler', target_rule_id=kwargs.get('target_rule_id')
+            ),
+            'post_discounts': app.url_path_for('post_discounts_handler'),
+            'patch_discount': app.url_path_for(
+                'patch_discount_handler', target_rule_id=kwargs.get('target_rule_id')
+            ),
+            'delete_discount': app.url_path_for(
+                'delete_discount_handler', target_rule_id=kwargs.get('target_rule_id')
+            ),
+            'get_redis_pool_stats': app.url_path_for('get_redis_pool_stats_handler'),
+            'get_db_pool_stats': app.url_path_for('get_db_pool_stats_handler'),
+            'get_cache_tiers_stats': app.url_path_for('get_cache_tiers_stats_handler'),
+            'get_admin_sync_stats': app.url_path_for('get_admin_sync_stats_handler'),
+            'get_cache_families_stats': app.url_path_for(
+                'get_cache_families_stats_handler'
+            ),
+            'get_metrics': app.url_path_for('get_metrics_handler'),
         }
 
         return routes.get(route_name)
@@ -121,6 +172,34 @@ async def ac() -> AsyncGenerator[AsyncClient, None]:
         yield ac
 
 
+@pytest.fixture(scope='function')
+def query_budget() -> Callable:
+    """
+    Проверка бюджета sql-запросов: блок
+        async with query_budget(3):
+            await ac.get(...)
+    падает, если в нем выполнилось больше 3 запросов, и перечисляет их
+    """
+
+    @asynccontextmanager
+    async def check_budget(max_queries: int) -> AsyncIterator[list[str]]:
+        statements: list[str] = []
+
+        def count_query(connection: Any, cursor: Any, statement: str, *args: Any):
+            statements.append(statement)
+
+        event.listen(engine.sync_engine, 'before_cursor_execute', count_query)
+        try:
+            yield statements
+        finally:
+            event.remove(engine.sync_engine, 'before_cursor_execute', count_query)
+        assert (
+            len(statements) <= max_queries
+        ), f'{len(statements)} queries, budget {max_queries}:\n' + '\n'.join(statements)
+
+    return check_budget
+
+
 @pytest.fixture(scope='function')
 async def create_menu(monkeypatch: MonkeyPatch) -> None:
     async with async_session() as session:
@@ -151,6 +230,11 @@ async def create_submenu(create_menu: Callable, monkeypatch: MonkeyPatch) -> Non
             )
         )
         new_submenu_id = insert_submenu_query.inserted_primary_key[0]
+        await session.execute(
+            update(Menu)
+            .values(submenus_count=Menu.submenus_count + 1)
+            .where(Menu.id == os.getenv('target_menu_id'))
+        )
         await session.commit()
         q = await session.execute(select(Submenu).where(Submenu.id == new_submenu_id))
         inserted_submenu = q.scalars().one_or_none()
@@ -172,6 +256,16 @@ async def create_dish(create_submenu: Callable, monkeypatch: MonkeyPatch) -> Non
             )
         )
         new_dish_id = insert_dish_query.inserted_primary_key[0]
+        await session.execute(
+            update(Submenu)
+            .values(dishes_count=Submenu.dishes_count + 1)
+            .where(Submenu.id == os.getenv('target_submenu_id'))
+        )
+        await session.execute(
+            update(Menu)
+            .values(dishes_count=Menu.dishes_count + 1)
+            .where(Menu.id == os.getenv('target_menu_id'))
+        )
         await session.commit()
         q = await session.execute(select(Dish).where(Dish.id == new_dish_id))
         inserted_dish = q.scalars().one_or_none()
@@ -0,0 +1,154 @@
+from pathlib import Path
+from typing import Callable
+
+import openpyxl
+from httpx import AsyncClient
+from project.admin_sources import iter_excel_records, iter_record_batches
+from project.database import async_session, get_async_redis_client
+from project.models import DiscountRule, Dish, Menu
+from project.repository_overal_for_admin_task import (
+    ChangeSet,
+    DishType,
+    MenuType,
+    RecordType,
+    SubmenuType,
+    diff_rows,
+    menus_to_rows,
+    sync_data_from_file_to_db,
+)
+from sqlalchemy import select
+
+MENU = MenuType('m1', 'Menu 1', 'Menu description 1')
+SUBMENU = SubmenuType('m1', 's1', 'Submenu 1', 'Submenu description 1')
+DISH_1 = DishType('m1', 's1', 'd1', 'Dish 1', 'Dish description 1', '12.5', 10)
+DISH_2 = DishType('m1', 's1', 'd2', 'Dish 2', 'Dish description 2', '20.00', None)
+RECORDS: list[RecordType] = [MENU, SUBMENU, DISH_1, DISH_2]
+
+
+async def sync(records: list[RecordType]) -> ChangeSet:
+    redis_client = await get_async_redis_client()
+    return await sync_data_from_file_to_db(
+        redis_client, iter_record_batches(records, batch_size=2)
+    )
+
+
+class TestAdminSync:
+    def test_diff_rows(self) -> None:
+        current = menus_to_rows([MenuType('m1', 'Menu 1', ''), MenuType('m2', '', '')])
+        incoming = menus_to_rows(
+            [MenuType('m1', 'Menu 1 new', ''), MenuType('m3', '', '')]
+        )
+        changes = diff_rows(current, incoming)
+        assert changes.inserted == {'m3'}
+        assert changes.updated == {'m1'}
+        assert changes.rows['m1'] == {'title': 'Menu 1 new', 'description': ''}
+        assert changes.deleted == {'m2': ('m2',)}
+        assert changes.paths == {('m1',), ('m2',), ('m3',)}
+
+    def test_iter_excel_records(self, tmp_path: Path) -> None:
+        wb = openpyxl.Workbook()
+        wb.active.append(['m1', 'Menu 1', 'Menu description 1'])
+        wb.active.append([None, 's1', 'Submenu 1', 'Submenu description 1'])
+        wb.active.append([None, None, 'd1', 'Dish 1', 'Dish description 1', 12.5, 10])
+        wb.active.append([None, None, 'd2', 'Dish 2', 'Dish description 2', '20.00'])
+        wb.save(tmp_path / 'Menu.xlsx')
+
+        records = list(iter_excel_records(str(tmp_path / 'Menu.xlsx')))
+        assert records[:2] == RECORDS[:2]
+        assert records[2] == DISH_1._replace(price='12.5')
+        assert records[3] == DISH_2
+
+    async def test_iter_record_batches_is_bounded(self) -> None:
+        batches = [batch async for batch in iter_record_batches(RECORDS, 3)]
+        assert batches == [RECORDS[:3], RECORDS[3:]]
+
+    async def test_sync_applies_only_changes(self, prepare_database: Callable) -> None:
+        change_set = await sync(RECORDS)
+        assert change_set.summary() == {
+            'menus': {'inserted': 1, 'updated': 0, 'deleted': 0},
+            'submenus': {'inserted': 1, 'updated': 0, 'deleted': 0},
+            'dishes': {'inserted': 2, 'updated': 0, 'deleted': 0},
+            'discounts': 1,
+        }
+        async with async_session() as session:
+            rule = (await session.execute(select(DiscountRule))).scalar_one()
+            dish = await session.get(Dish, 'd1')
+        assert (rule.dish_id, rule.percent, rule.from_sheet) == ('d1', 10, True)
+        assert str(dish.current_price) == '11.25'
+
+        assert not await sync(RECORDS)
+
+        change_set = await sync([MENU, SUBMENU, DISH_2._replace(price='21')])
+        assert change_set.summary()['dishes'] == {
+            'inserted': 0,
+            'updated': 1,
+            'deleted': 1,
+        }
+        async with async_session() as session:
+            menu = (await session.execute(select(Menu))).scalar_one()
+            dish = (await session.execute(select(Dish))).scalar_one()
+            rules = (await session.execute(select(DiscountRule))).all()
+        assert rules == []
+        assert menu.submenus_count == 1
+        assert menu.dishes_count == 1
+        assert str(dish.price) == '21.00'
+
+    async def test_sync_updates_discounts_and_prices(
+        self, prepare_database: Callable
+    ) -> None:
+        await sync(RECORDS)
+        change_set = await sync(
+            [
+                *RECORDS[:2],
+                DISH_1._replace(discount=None),
+                DISH_2._replace(discount='50'),
+            ]
+        )
+        assert change_set.discounts == {'d1': None, 'd2': 50}
+        assert {path[-1] for path in change_set.price_paths} == {'d1', 'd2'}
+        async with async_session() as session:
+            rule = (await session.execute(select(DiscountRule))).scalar_one()
+            dishes = (await session.execute(select(Dish).order_by(Dish.id))).scalars()
+            assert rule.dish_id == 'd2'
+            assert [str(dish.current_price) for dish in dishes] == ['12.50', '10.00']
+
+    async def test_sync_moves_submenu_out_of_deleted_menu(
+        self, prepare_database: Callable
+    ) -> None:
+        await sync(RECORDS)
+        change_set = await sync(
+            [
+                MenuType('m2', 'Menu 2', 'Menu description 2'),
+                SUBMENU._replace(menu_id='m2'),
+                *[dish._replace(menu_id='m2') for dish in (DISH_1, DISH_2)],
+            ]
+        )
+        assert list(change_set.menus.deleted) == ['m1']
+        async with async_session() as session:
+            menu = (await session.execute(select(Menu))).scalar_one()
+        assert menu.id == 'm2'
+        assert menu.dishes_count == 2
+
+    async def test_sync_invalidates_only_changed_keys(
+        self, prepare_database: Callable, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        redis_client = await get_async_redis_client()
+        await sync(RECORDS)
+        dish_url = reverse(
+            'get_dish', target_menu_id='m1', target_submenu_id='s1', target_dish_id='d2'
+        )
+        await ac.get(reverse('get_menus'))
+        etag = (await ac.get(dish_url)).headers['etag']
+
+        keys = await redis_client.keys('*')
+        snapshot = dict(zip(keys, await redis_client.mget(keys)))
+        assert not await sync(RECORDS)
+        keys = await redis_client.keys('*')
+        assert dict(zip(keys, await redis_client.mget(keys))) == snapshot
+
+        await sync([MENU, SUBMENU, DISH_1, DISH_2._replace(price='21')])
+        response = await ac.get(dish_url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.json()['price'] == '21.00'
+        response = await ac.get(reverse('get_menus'))
+        assert response.json()[0]['dishes_count'] == 2
@@ -0,0 +1,64 @@
+from pathlib import Path
+from typing import Callable
+
+from httpx import AsyncClient
+from project.admin_sync_state import (
+    get_data_fingerprint,
+    get_file_stat,
+    is_data_unchanged,
+    is_file_unchanged,
+    record_run,
+    save_file_stat,
+    save_fingerprint,
+)
+from project.database import get_async_redis_client
+from project.repository_overal_for_admin_task import MenuType
+
+DATA = [MenuType('m1', 'Menu 1', 'Menu description 1')]
+
+
+class TestAdminSyncState:
+    async def test_fingerprint_detects_changes(
+        self, prepare_database: Callable
+    ) -> None:
+        redis_client = await get_async_redis_client()
+        fingerprint = get_data_fingerprint(DATA)
+        assert not await is_data_unchanged(redis_client, fingerprint)
+
+        await save_fingerprint(redis_client, fingerprint)
+        assert await is_data_unchanged(redis_client, get_data_fingerprint(iter(DATA)))
+        changed_data = [DATA[0]._replace(description='Changed')]
+        assert not await is_data_unchanged(
+            redis_client, get_data_fingerprint(changed_data)
+        )
+
+    async def test_file_stat_keeps_fingerprint_expiry(
+        self, prepare_database: Callable, tmp_path: Path
+    ) -> None:
+        redis_client = await get_async_redis_client()
+        path = tmp_path / 'Menu.xlsx'
+        path.write_bytes(b'menu')
+        file_stat = get_file_stat(str(path))
+
+        await save_file_stat(redis_client, file_stat)
+        assert not await is_file_unchanged(redis_client, file_stat)
+
+        await save_fingerprint(redis_client, get_data_fingerprint(DATA))
+        await save_file_stat(redis_client, file_stat)
+        assert await is_file_unchanged(redis_client, file_stat)
+        assert await redis_client.ttl('admin_sync:file_stat') > 0
+
+    async def test_get_admin_sync_stats_handler_counts_runs(
+        self, prepare_database: Callable, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        redis_client = await get_async_redis_client()
+        await record_run(redis_client, True, 0.5)
+        await record_run(redis_client, False, 0.01)
+        await record_run(redis_client, False, 0.02)
+
+        response = await ac.get(reverse('get_admin_sync_stats'))
+        assert response.status_code == 200
+        assert response.json()['applied_runs'] == 1
+        assert response.json()['skipped_runs'] == 2
+        assert response.json()['skipped_seconds'] == 0.03
+        assert response.json()['last_status'] == 'skipped'
@@ -0,0 +1,39 @@
+import pytest
+
+from project.cache_codecs import CacheCodec
+from project.dishes.schemas import DishOutSchema
+
+DISHES = [
+    DishOutSchema(id=str(i), title='dish', description='описание', price='12.50')
+    for i in range(100)
+]
+
+
+class TestCacheCodecs:
+    @pytest.mark.parametrize('codec', ['json', 'msgpack', 'pickle'])
+    def test_encode_decode_roundtrip(self, codec: str) -> None:
+        cache_codec = CacheCodec(codec=codec, schema_version='1', compress_min_size=0)
+        decoded = cache_codec.decode(cache_codec.encode(DISHES))
+        assert decoded is not None
+        assert [DishOutSchema.parse_obj(dish) for dish in decoded] == DISHES
+
+    def test_large_values_are_compressed(self) -> None:
+        plain = CacheCodec(codec='json', schema_version='1', compress_min_size=0)
+        compressed = CacheCodec(
+            codec='json', schema_version='1', compress_min_size=1024
+        )
+        raw = compressed.encode(DISHES)
+        assert len(raw) < len(plain.encode(DISHES))
+        assert compressed.decode(raw) == plain.decode(plain.encode(DISHES))
+
+    def test_other_schema_version_is_a_miss(self) -> None:
+        old = CacheCodec(codec='json', schema_version='1', compress_min_size=0)
+        new = CacheCodec(codec='json', schema_version='2', compress_min_size=0)
+        assert new.decode(old.encode(DISHES)) is None
+
+    def test_reads_entries_written_by_another_codec(self) -> None:
+        msgpack_codec = CacheCodec(
+            codec='msgpack', schema_version='1', compress_min_size=0
+        )
+        json_codec = CacheCodec(codec='json', schema_version='1', compress_min_size=0)
+        assert json_codec.decode(msgpack_codec.encode({'a': 1})) == {'a': 1}
@@ -0,0 +1,38 @@
+import time
+
+from project.cache_local import LocalCache, apply_invalidation, local_cache
+
+
+class TestLocalCache:
+    def test_evicts_least_recently_used_key(self) -> None:
+        cache = LocalCache(max_size=2, ttl=60)
+        cache.set('all_menus', 1)
+        cache.set('menu', 2)
+        cache.get('all_menus')
+        cache.set('menu/submenus', 3)
+        assert cache.get('menu') is None
+        assert cache.get('all_menus') == 1
+        assert cache.get('menu/submenus') == 3
+
+    def test_expired_value_is_a_miss(self) -> None:
+        cache = LocalCache(max_size=2, ttl=0.01)
+        cache.set('all_menus', 1)
+        time.sleep(0.02)
+        assert cache.get('all_menus') is None
+        assert cache.misses == 1
+
+    def test_clear_namespace_keeps_other_keys(self) -> None:
+        cache = LocalCache(max_size=10, ttl=60)
+        for key in ['menu', 'menu/submenus', 'menu/submenu/dishes', 'menu2']:
+            cache.set(key, key)
+        cache.clear_namespace('menu')
+        assert list(cache.data) == ['menu2']
+
+    def test_apply_invalidation_message(self) -> None:
+        local_cache.clear()
+        for key in ['all_menus', 'menu', 'menu/submenus', 'other']:
+            local_cache.set(key, key)
+        apply_invalidation({'keys': ['all_menus'], 'namespaces': ['menu']})
+        assert list(local_cache.data) == ['other']
+        apply_invalidation({'clear': True})
+        assert not local_cache.data
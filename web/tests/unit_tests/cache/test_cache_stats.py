@@ -0,0 +1,83 @@
+import uuid
+from typing import Callable
+
+from fastapi import BackgroundTasks
+from httpx import AsyncClient
+from project.cache_local import local_cache
+from project.cache_stats import cache_stats, get_key_family
+from project.database import get_async_redis_client
+from project.metrics import render_metrics
+from project.pagination import get_page_key
+from project.search.services import get_search_key
+from project.service_redis import AsyncRedisCache, get_versioned_key
+
+
+class TestCacheStats:
+    def test_get_key_family(self) -> None:
+        menu_id, submenu_id, dish_id = 'menu-id', 'submenu-id', 'dish-id'
+        assert get_key_family(get_page_key('all_menus', 100, None)) == 'all_menus'
+        assert get_key_family('all_menus_whole') == 'all_menus_whole'
+        assert get_key_family(menu_id) == 'menu'
+        assert get_key_family(f'{menu_id}/submenus') == 'submenus'
+        assert get_key_family(get_page_key(f'{menu_id}/submenus', 10, 'x')) == (
+            'submenus'
+        )
+        assert get_key_family(f'{menu_id}/{submenu_id}') == 'submenu'
+        assert get_key_family(f'{menu_id}/{submenu_id}/dishes') == 'dishes'
+        assert get_key_family(f'{menu_id}/{submenu_id}/{dish_id}') == 'dish'
+        assert get_key_family(get_search_key(query='борщ', limit=20)) == 'search'
+
+    async def test_counts_cache_operations_by_family(self) -> None:
+        cache_stats.clear()
+        menu_id = str(uuid.uuid4())
+        cache = AsyncRedisCache(await get_async_redis_client())
+        background_tasks = BackgroundTasks()
+
+        assert await cache.get_data_from_cache(menu_id) is None
+        await cache.set_data_to_cache(
+            menu_id, {'id': menu_id}, background_tasks=background_tasks
+        )
+        await background_tasks()
+        assert await cache.get_data_from_cache(menu_id) == {'id': menu_id}
+        await cache.clear_namespace_from_cache(
+            menu_id, f'{menu_id}/submenus', background_tasks=None
+        )
+
+        menu_stats = cache_stats.as_dict()['menu']
+        assert menu_stats['misses'] == 1
+        assert menu_stats['hits'] == 1
+        assert menu_stats['sets'] == 1
+        assert menu_stats['invalidations'] == 1
+        assert menu_stats['read_bytes'] == menu_stats['written_bytes'] > 0
+        assert menu_stats['hit_ratio'] == 0.5
+        assert cache_stats.as_dict()['submenus']['invalidations'] == 1
+
+        lines = render_metrics().splitlines()
+        assert 'menu_app_cache_hits_total{family="menu"} 1' in lines
+        assert 'menu_app_cache_invalidations_total{family="submenus"} 1' in lines
+
+    async def test_undecodable_value_is_counted_as_miss(self) -> None:
+        cache_stats.clear()
+        menu_id = str(uuid.uuid4())
+        cache = AsyncRedisCache(await get_async_redis_client())
+        # запись прежней версии схемы кеша
+        await cache.redis_client.set(get_versioned_key(menu_id, [None]), b'old')
+
+        assert await cache.get_data_from_cache(menu_id) is None
+        assert local_cache.get(menu_id) is None
+        menu_stats = cache_stats.as_dict()['menu']
+        assert menu_stats['misses'] == 1
+        assert menu_stats['hits'] == 0
+        assert menu_stats['read_bytes'] == 0
+
+    async def test_get_cache_families_stats_handler_success(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        cache_stats.clear()
+        cache = AsyncRedisCache(await get_async_redis_client())
+        await cache.get_data_from_cache('all_menus_whole')
+
+        response = await ac.get(reverse('get_cache_families_stats'))
+        assert response.status_code == 200
+        assert response.json()['families']['all_menus_whole']['misses'] == 1
+        assert response.json()['families']['all_menus_whole']['hit_ratio'] == 0
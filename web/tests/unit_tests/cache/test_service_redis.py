@@ -0,0 +1,176 @@
+import asyncio
+import uuid
+
+from _pytest.monkeypatch import MonkeyPatch
+from fastapi import BackgroundTasks
+from project.config import settings
+from project.database import get_async_redis_client
+from project.service_redis import (
+    LOCK_PREFIX,
+    STALE_PREFIX,
+    AsyncRedisCache,
+    get_versioned_key,
+)
+
+
+async def get_cache() -> AsyncRedisCache:
+    return AsyncRedisCache(await get_async_redis_client())
+
+
+async def set_data(key: str, value: str) -> None:
+    cache = await get_cache()
+    background_tasks = BackgroundTasks()
+    await cache.set_data_to_cache(key, value, background_tasks=background_tasks)
+    await background_tasks()
+
+
+class TestAsyncRedisCache:
+    async def test_clear_namespace_hides_keys_in_namespace(self) -> None:
+        menu_id, other_menu_id = str(uuid.uuid4()), str(uuid.uuid4())
+        await set_data(menu_id, 'menu')
+        await set_data('/'.join([menu_id, 'submenu', 'dishes']), 'dishes')
+        await set_data(other_menu_id, 'other menu')
+
+        cache = await get_cache()
+        background_tasks = BackgroundTasks()
+        await cache.clear_namespace_from_cache(
+            menu_id, background_tasks=background_tasks
+        )
+        await background_tasks()
+
+        cache = await get_cache()
+        assert await cache.get_data_from_cache(menu_id) is None
+        assert (
+            await cache.get_data_from_cache('/'.join([menu_id, 'submenu', 'dishes']))
+            is None
+        )
+        assert await cache.get_data_from_cache(other_menu_id) == 'other menu'
+
+    async def test_set_after_clear_does_not_store_data_read_before_clear(
+        self,
+    ) -> None:
+        menu_id = str(uuid.uuid4())
+        reader = await get_cache()
+        assert await reader.get_data_from_cache(menu_id) is None
+
+        background_tasks = BackgroundTasks()
+        await (await get_cache()).clear_namespace_from_cache(
+            menu_id, background_tasks=background_tasks
+        )
+        await background_tasks()
+
+        background_tasks = BackgroundTasks()
+        await reader.set_data_to_cache(
+            menu_id, 'stale menu', background_tasks=background_tasks
+        )
+        await background_tasks()
+        assert await (await get_cache()).get_data_from_cache(menu_id) is None
+
+    async def test_delete_data_from_cache(self) -> None:
+        menu_id = str(uuid.uuid4())
+        await set_data(menu_id, 'menu')
+
+        cache = await get_cache()
+        background_tasks = BackgroundTasks()
+        await cache.delete_data_from_cache(menu_id, background_tasks=background_tasks)
+        await background_tasks()
+        assert await (await get_cache()).get_data_from_cache(menu_id) is None
+
+    async def test_get_or_load_runs_one_load_for_concurrent_misses(self) -> None:
+        key = str(uuid.uuid4())
+        loads = []
+
+        async def loader() -> str:
+            loads.append(key)
+            await asyncio.sleep(0.05)
+            return 'menus'
+
+        results = await asyncio.gather(
+            *[(await get_cache()).get_or_load(key, loader) for _ in range(10)]
+        )
+        assert results == ['menus'] * 10
+        assert len(loads) == 1
+        assert await (await get_cache()).get_data_from_cache(key) == 'menus'
+
+    async def test_get_or_load_serves_stale_value_while_locked(self) -> None:
+        key = str(uuid.uuid4())
+
+        async def loader() -> str:
+            return 'fresh menus'
+
+        async def old_loader() -> str:
+            return 'old menus'
+
+        await (await get_cache()).get_or_load(key, old_loader)
+        background_tasks = BackgroundTasks()
+        await (await get_cache()).delete_data_from_cache(
+            key, background_tasks=background_tasks
+        )
+        await background_tasks()
+
+        cache = await get_cache()
+        redis_client = await get_async_redis_client()
+        await redis_client.set(LOCK_PREFIX + get_versioned_key(key, [None]), 'other')
+        assert await cache.get_or_load(key, loader) == 'old menus'
+
+    async def test_get_or_load_serves_stale_value_after_namespace_clear(
+        self,
+    ) -> None:
+        key = '/'.join([str(uuid.uuid4()), 'submenus'])
+
+        async def loader() -> str:
+            return 'fresh submenus'
+
+        async def old_loader() -> str:
+            return 'old submenus'
+
+        await (await get_cache()).get_or_load(key, old_loader)
+        await (await get_cache()).clear_namespace_from_cache(key, background_tasks=None)
+
+        cache = await get_cache()
+        assert await cache.get_data_from_cache(key) is None
+        redis_client = await get_async_redis_client()
+        await redis_client.set(LOCK_PREFIX + cache.versioned_keys[key], 'other')
+        assert await cache.get_or_load(key, loader) == 'old submenus'
+
+    async def test_get_or_load_skips_undecodable_copies_while_locked(
+        self, monkeypatch: MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(settings, 'cache_lock_lease_ms', 200)
+        key = str(uuid.uuid4())
+
+        async def loader() -> str:
+            return 'fresh menus'
+
+        cache = await get_cache()
+        versioned_key = get_versioned_key(key, [None])
+        redis_client = await get_async_redis_client()
+        await redis_client.set(STALE_PREFIX + key, b'v0|j-|"old menus"')
+        await redis_client.set(LOCK_PREFIX + versioned_key, 'other')
+
+        async def write_old_value() -> None:
+            await asyncio.sleep(0.05)
+            await redis_client.set(versioned_key, b'v0|j-|"old menus"')
+
+        writer = asyncio.create_task(write_old_value())
+        assert await cache.get_or_load(key, loader) == 'fresh menus'
+        await writer
+
+    async def test_cancelled_load_does_not_cancel_waiting_requests(self) -> None:
+        key = str(uuid.uuid4())
+        loads = []
+
+        async def loader() -> str:
+            loads.append(key)
+            await asyncio.sleep(0.05)
+            return 'menus'
+
+        first = asyncio.create_task((await get_cache()).get_or_load(key, loader))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task((await get_cache()).get_or_load(key, loader))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await waiter == 'menus'
+        assert first.cancelled()
+        assert len(loads) == 2
@@ -0,0 +1,8 @@
+from typing import Callable
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+async def prepare_for_catalog_tests(prepare_database: Callable) -> None:
+    pass
@@ -0,0 +1,56 @@
+import random
+from dataclasses import replace
+from pathlib import Path
+
+from project.admin_sources import iter_excel_records, iter_record_batches
+from project.database import async_session, get_async_redis_client
+from project.models import DiscountRule, Dish, Menu
+from project.repository_overal_for_admin_task import (
+    DishType,
+    sync_data_from_file_to_db,
+)
+from sqlalchemy import func, select
+
+from benchmarks.gen_catalog import CatalogSpec, SyntheticCatalog, allocate, load_catalog
+
+SPEC = CatalogSpec(menus=3, submenus=4, dishes=5, skew=1.5, discount_ratio=0.3, seed=7)
+
+
+class TestGenCatalog:
+    def test_allocate_is_exact_and_skewed(self) -> None:
+        counts = allocate(1000, 10, 1.5, random.Random(0))
+        assert sum(counts) == 1000
+        assert max(counts) > 3 * min(counts)
+        assert allocate(10, 5, 0, random.Random(0)) == [2] * 5
+
+    def test_catalog_is_deterministic(self) -> None:
+        records = list(SyntheticCatalog(SPEC).iter_records())
+        assert records == list(SyntheticCatalog(SPEC).iter_records())
+        dishes = [record for record in records if isinstance(record, DishType)]
+        assert len(dishes) == 3 * 4 * 5
+        assert any(dish.discount for dish in dishes)
+        assert records != list(SyntheticCatalog(replace(SPEC, seed=8)).iter_records())
+
+    def test_excel_matches_records(self, tmp_path: Path) -> None:
+        catalog = SyntheticCatalog(SPEC)
+        filename = str(tmp_path / 'Menu.xlsx')
+        catalog.write_excel(filename)
+        assert list(iter_excel_records(filename)) == list(catalog.iter_records())
+
+    async def test_loaded_catalog_matches_admin_sync(self) -> None:
+        catalog = SyntheticCatalog(SPEC)
+        await load_catalog(catalog)
+        async with async_session() as session:
+            dishes_count = await session.scalar(func.sum(Menu.dishes_count))
+            rules_count = await session.scalar(func.count(DiscountRule.id))
+            discounted = await session.scalar(
+                select(func.count(Dish.id)).where(Dish.effective_price.is_not(None))
+            )
+        assert dishes_count == 3 * 4 * 5
+        assert rules_count == discounted > 0
+
+        redis_client = await get_async_redis_client()
+        change_set = await sync_data_from_file_to_db(
+            redis_client, iter_record_batches(catalog.iter_records(), batch_size=10)
+        )
+        assert not change_set
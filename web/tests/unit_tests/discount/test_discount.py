@@ -0,0 +1,222 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from httpx import AsyncClient
+from project.database import async_session, get_async_redis_client
+from project.models import DiscountRule, Dish
+from project.prices import (
+    REFRESHED_AT_KEY,
+    refresh_effective_prices,
+    refresh_rule_windows,
+)
+from sqlalchemy import event, insert, select
+
+
+async def get_dish_price(ac: AsyncClient, reverse: Callable) -> str:
+    response = await ac.get(
+        reverse(
+            'get_dish',
+            target_menu_id=os.getenv('target_menu_id'),
+            target_submenu_id=os.getenv('target_submenu_id'),
+            target_dish_id=os.getenv('target_dish_id'),
+        )
+    )
+    assert response.status_code == 200
+    return response.json()['price']
+
+
+async def post_rule(ac: AsyncClient, reverse: Callable, **rule: Any) -> dict:
+    response = await ac.post(reverse('post_discounts'), json=rule)
+    assert response.status_code == 201
+    return response.json()
+
+
+class TestDiscounts:
+    async def test_largest_active_rule_wins(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        assert await get_dish_price(ac, reverse) == '12.50'
+
+        await post_rule(ac, reverse, menu_id=os.getenv('target_menu_id'), percent='10')
+        assert await get_dish_price(ac, reverse) == '11.25'
+
+        await post_rule(
+            ac, reverse, submenu_id=os.getenv('target_submenu_id'), percent='33.33'
+        )
+        assert await get_dish_price(ac, reverse) == '8.33'
+
+        future = datetime.now(timezone.utc) + timedelta(days=1)
+        await post_rule(
+            ac,
+            reverse,
+            dish_id=os.getenv('target_dish_id'),
+            percent='50',
+            starts_at=future.isoformat(),
+        )
+        assert await get_dish_price(ac, reverse) == '8.33'
+
+        response = await ac.get(reverse('get_discounts'))
+        assert response.status_code == 200
+        assert len(response.json()) == 3
+
+    async def test_update_and_delete_rule(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        rule = await post_rule(
+            ac, reverse, dish_id=os.getenv('target_dish_id'), percent='20'
+        )
+        assert await get_dish_price(ac, reverse) == '10.00'
+
+        response = await ac.patch(
+            reverse('patch_discount', target_rule_id=rule['id']),
+            json={'menu_id': os.getenv('target_menu_id'), 'percent': '50'},
+        )
+        assert response.status_code == 200
+        assert response.json()['dish_id'] is None
+        assert await get_dish_price(ac, reverse) == '6.25'
+
+        response = await ac.delete(
+            reverse('delete_discount', target_rule_id=rule['id'])
+        )
+        assert response.status_code == 200
+        assert await get_dish_price(ac, reverse) == '12.50'
+
+        response = await ac.get(reverse('get_discount', target_rule_id=rule['id']))
+        assert response.status_code == 404
+        assert response.json()['detail'] == 'discount rule not found'
+
+    async def test_update_dish_price_keeps_discount(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        await post_rule(ac, reverse, dish_id=os.getenv('target_dish_id'), percent='20')
+        response = await ac.patch(
+            reverse(
+                'patch_dish',
+                target_menu_id=os.getenv('target_menu_id'),
+                target_submenu_id=os.getenv('target_submenu_id'),
+                target_dish_id=os.getenv('target_dish_id'),
+            ),
+            json={'title': 'My dish 1', 'description': '', 'price': '20.00'},
+        )
+        assert response.status_code == 200
+        assert response.json()['price'] == '16.00'
+
+    async def test_invalid_rules(self, ac: AsyncClient, reverse: Callable) -> None:
+        response = await ac.post(
+            reverse('post_discounts'),
+            json={
+                'menu_id': os.getenv('target_menu_id'),
+                'dish_id': os.getenv('target_dish_id'),
+                'percent': '10',
+            },
+        )
+        assert response.status_code == 422
+        response = await ac.post(
+            reverse('post_discounts'), json={'dish_id': 'unknown', 'percent': '10'}
+        )
+        assert response.status_code == 404
+        assert response.json()['detail'] == 'dish not found'
+        response = await ac.post(
+            reverse('post_discounts'),
+            json={
+                'dish_id': os.getenv('target_dish_id'),
+                'percent': '10',
+                'starts_at': '2030-01-02T00:00:00',
+                'ends_at': '2030-01-01T00:00:00',
+            },
+        )
+        assert response.status_code == 422
+
+    async def test_refresh_rule_windows(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        redis_client = await get_async_redis_client()
+        assert await refresh_rule_windows(redis_client) == set()
+        assert await redis_client.get(REFRESHED_AT_KEY) is not None
+
+        # правило, срок которого начался после прошлого запуска, записано
+        # мимо API и без пересчета цен
+        async with async_session() as session:
+            await session.execute(
+                insert(DiscountRule).values(
+                    dish_id=os.getenv('target_dish_id'),
+                    percent=20,
+                    starts_at=datetime.now(timezone.utc),
+                )
+            )
+            await session.commit()
+        assert await get_dish_price(ac, reverse) == '12.50'
+
+        paths = await refresh_rule_windows(redis_client)
+        assert paths == {
+            (
+                os.getenv('target_menu_id'),
+                os.getenv('target_submenu_id'),
+                os.getenv('target_dish_id'),
+            )
+        }
+        assert await get_dish_price(ac, reverse) == '10.00'
+        async with async_session() as session:
+            dish = await session.get(Dish, os.getenv('target_dish_id'))
+        assert str(dish.effective_price) == '10.00'
+
+    async def test_refresh_effective_prices_joins_rules_per_target(self) -> None:
+        now = datetime.now(timezone.utc)
+        menu_id = os.getenv('target_menu_id')
+        submenu_id = os.getenv('target_submenu_id')
+        dish_id, other_dish_id = os.getenv('target_dish_id'), str(uuid.uuid4())
+        statements = []
+
+        def on_execute(*args: Any) -> None:
+            statements.append(args[2:4])
+
+        async with async_session() as session:
+            await session.execute(
+                insert(Dish).values(
+                    id=other_dish_id, title='other', submenu_id=submenu_id, price=20
+                )
+            )
+            await session.execute(
+                insert(DiscountRule),
+                [
+                    {'menu_id': menu_id, 'percent': 10},
+                    {'dish_id': dish_id, 'percent': 40},
+                    {'dish_id': other_dish_id, 'percent': 5},
+                    # закончившееся и еще не начавшееся правила не действуют
+                    {
+                        'submenu_id': submenu_id,
+                        'percent': 20,
+                        'ends_at': now - timedelta(days=1),
+                    },
+                    {
+                        'dish_id': other_dish_id,
+                        'percent': 30,
+                        'starts_at': now + timedelta(days=1),
+                    },
+                ],
+            )
+            connection = await session.connection()
+            event.listen(connection.sync_engine, 'before_cursor_execute', on_execute)
+            try:
+                paths = await refresh_effective_prices(session, now=now)
+            finally:
+                event.remove(
+                    connection.sync_engine, 'before_cursor_execute', on_execute
+                )
+            ((statement, parameters),) = statements
+            # правила не перебираются заново подзапросом на каждое блюдо
+            plan = await connection.exec_driver_sql(f'EXPLAIN {statement}', parameters)
+            prices = dict(
+                (await session.execute(select(Dish.id, Dish.effective_price))).all()
+            )
+            await session.rollback()
+
+        assert 'SubPlan' not in '\n'.join(row[0] for row in plan)
+        assert paths == {
+            (menu_id, submenu_id, dish_id),
+            (menu_id, submenu_id, other_dish_id),
+        }
+        assert str(prices[dish_id]) == '7.50'
+        assert str(prices[other_dish_id]) == '18.00'
@@ -1,10 +1,15 @@
 import os
+import uuid
 from typing import Callable
 
+import pytest
+from fastapi import HTTPException
 from httpx import AsyncClient
 from project.database import async_session
-from project.models import Dish
-from sqlalchemy import select
+from project.models import Dish, Menu, Submenu
+from project.pagination import NEXT_CURSOR_HEADER
+from project.services_overal import validate_dish
+from sqlalchemy import select, update
 
 
 class TestDishes:
@@ -34,6 +39,29 @@ class TestDishes:
         assert response.status_code == 200
         assert response.json() == []
 
+    async def test_get_dishes_handler_with_discount(
+        self, create_dish: Callable, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        response = await ac.post(
+            reverse('post_discounts'),
+            json={'dish_id': os.getenv('target_dish_id'), 'percent': '20'},
+        )
+        assert response.status_code == 201
+        response = await ac.get(
+            reverse(
+                'get_dishes',
+                target_menu_id=os.getenv('target_menu_id'),
+                target_submenu_id=os.getenv('target_submenu_id'),
+            )
+        )
+        assert response.status_code == 200
+        assert response.json()[0]['price'] == '10.00'
+
+        response = await ac.get(reverse('get_menus_whole'))
+        assert response.status_code == 200
+        dishes = response.json()['menus'][0]['submenus'][0]['dishes']
+        assert dishes[0]['price'] == '10.00'
+
     async def test_post_dish_handler_success(
         self, ac: AsyncClient, reverse: Callable
     ) -> None:
@@ -82,6 +110,30 @@ class TestDishes:
         assert response.json()['price'] == os.getenv('target_dish_price')
         assert response.json()['id'] == os.getenv('target_dish_id')
 
+    async def test_get_dish_handler_etag_changes_with_parent(
+        self, create_dish: Callable, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        url = reverse(
+            'get_dish',
+            target_menu_id=os.getenv('target_menu_id'),
+            target_submenu_id=os.getenv('target_submenu_id'),
+            target_dish_id=os.getenv('target_dish_id'),
+        )
+        etag = (await ac.get(url)).headers['etag']
+        response = await ac.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+
+        await ac.delete(
+            reverse(
+                'delete_submenu',
+                target_menu_id=os.getenv('target_menu_id'),
+                target_submenu_id=os.getenv('target_submenu_id'),
+            )
+        )
+        response = await ac.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 404
+        assert response.json()['detail'] == 'submenu not found'
+
     async def test_get_dish_handler_not_found(
         self, ac: AsyncClient, reverse: Callable
     ) -> None:
@@ -175,3 +227,171 @@ class TestDishes:
         )
         assert response.status_code == 404
         assert response.json()['detail'] == 'dish not found'
+
+    async def test_bulk_dishes_handlers(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        ids = dict(
+            target_menu_id=os.getenv('target_menu_id'),
+            target_submenu_id=os.getenv('target_submenu_id'),
+        )
+        response = await ac.post(
+            reverse('post_dishes_bulk', **ids),
+            json=[
+                {'title': f'dish {i}', 'description': 'bulk', 'price': f'1{i}.50'}
+                for i in range(3)
+            ],
+        )
+        assert response.status_code == 201
+        created = response.json()
+        assert [item['dish']['title'] for item in created] == [
+            'dish 0',
+            'dish 1',
+            'dish 2',
+        ]
+        response = await ac.get(reverse('get_dishes', **ids))
+        assert len(response.json()) == 3
+
+        response = await ac.patch(
+            reverse('patch_dishes_bulk', **ids),
+            json=[
+                {
+                    'id': created[1]['id'],
+                    'title': 'updated dish 1',
+                    'description': 'bulk',
+                    'price': '20',
+                },
+                {'id': 'missing', 'title': 'x', 'description': 'x', 'price': '1'},
+            ],
+        )
+        assert response.status_code == 200
+        assert response.json()[0]['dish']['title'] == 'updated dish 1'
+        assert response.json()[0]['dish']['price'] == '20.00'
+        assert response.json()[1]['status'] is False
+        assert response.json()[1]['message'] == 'dish not found'
+
+        response = await ac.post(
+            reverse('delete_dishes_bulk', **ids),
+            json={'ids': ['missing', created[0]['id'], created[1]['id']]},
+        )
+        assert response.status_code == 200
+        assert [item['status'] for item in response.json()] == [False, True, True]
+        response = await ac.get(reverse('get_dishes', **ids))
+        assert [dish['id'] for dish in response.json()] == [created[2]['id']]
+        async with async_session() as session:
+            menu = await session.get(Menu, ids['target_menu_id'])
+            submenu = await session.get(Submenu, ids['target_submenu_id'])
+        assert menu.dishes_count == 1
+        assert submenu.dishes_count == 1
+
+    async def test_bulk_dishes_handler_submenu_not_found(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        response = await ac.post(
+            reverse(
+                'post_dishes_bulk',
+                target_menu_id=os.getenv('target_menu_id'),
+                target_submenu_id='missing',
+            ),
+            json=[{'title': 'dish', 'description': 'bulk', 'price': '1'}],
+        )
+        assert response.status_code == 404
+        assert response.json()['detail'] == 'submenu not found'
+
+    async def test_get_dishes_handler_pages_cached_separately(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        url = reverse(
+            'get_dishes',
+            target_menu_id=os.getenv('target_menu_id'),
+            target_submenu_id=os.getenv('target_submenu_id'),
+        )
+        response = await ac.post(
+            reverse(
+                'post_dishes_bulk',
+                target_menu_id=os.getenv('target_menu_id'),
+                target_submenu_id=os.getenv('target_submenu_id'),
+            ),
+            json=[
+                {'title': f'dish {i}', 'description': 'paged', 'price': '1'}
+                for i in range(3)
+            ],
+        )
+        dish_ids = sorted(item['id'] for item in response.json())
+
+        first_page = await ac.get(url, params={'limit': 2})
+        assert [dish['id'] for dish in first_page.json()] == dish_ids[:2]
+        cursor = first_page.headers[NEXT_CURSOR_HEADER]
+        last_page = await ac.get(url, params={'limit': 2, 'cursor': cursor})
+        assert [dish['id'] for dish in last_page.json()] == dish_ids[2:]
+        assert NEXT_CURSOR_HEADER not in last_page.headers
+
+        async with async_session() as session:
+            await session.execute(update(Dish).values(title='changed in db'))
+            await session.commit()
+        response = await ac.get(url, params={'limit': 2})
+        assert response.json() == first_page.json()
+        response = await ac.get(url, params={'limit': 2, 'cursor': cursor})
+        assert response.json() == last_page.json()
+
+        await ac.delete(
+            reverse(
+                'delete_dish',
+                target_menu_id=os.getenv('target_menu_id'),
+                target_submenu_id=os.getenv('target_submenu_id'),
+                target_dish_id=dish_ids[0],
+            )
+        )
+        response = await ac.get(url, params={'limit': 2})
+        assert [dish['id'] for dish in response.json()] == dish_ids[1:]
+        assert response.json()[0]['title'] == 'changed in db'
+
+    async def test_dish_handlers_query_budget(
+        self, ac: AsyncClient, reverse: Callable, query_budget: Callable
+    ) -> None:
+        url_kwargs = {
+            'target_menu_id': os.getenv('target_menu_id'),
+            'target_submenu_id': os.getenv('target_submenu_id'),
+        }
+        async with query_budget(6):
+            response = await ac.post(
+                reverse('post_dishes', **url_kwargs),
+                json={
+                    'title': 'My dish 6',
+                    'description': 'My dish description 6',
+                    'price': '16.50',
+                },
+            )
+        assert response.status_code == 201
+        dish_url = reverse(
+            'get_dish', target_dish_id=response.json()['id'], **url_kwargs
+        )
+        async with query_budget(1):
+            response = await ac.get(dish_url)
+        assert response.status_code == 200
+
+    async def test_validate_dish_reports_missing_level_in_one_query(
+        self, create_dish: Callable, query_budget: Callable
+    ) -> None:
+        menu_id = os.getenv('target_menu_id')
+        submenu_id = os.getenv('target_submenu_id')
+        dish_id = os.getenv('target_dish_id')
+        assert menu_id is not None
+        assert submenu_id is not None
+        assert dish_id is not None
+        missing_id = str(uuid.uuid4())
+        cases = [
+            ((missing_id, submenu_id, dish_id), 'menu not found'),
+            ((menu_id, missing_id, dish_id), 'submenu not found'),
+            ((menu_id, submenu_id, missing_id), 'dish not found'),
+        ]
+        async with async_session() as session:
+            for ids, detail in cases:
+                async with query_budget(1):
+                    with pytest.raises(HTTPException) as exc_info:
+                        await validate_dish(session, *ids)
+                assert exc_info.value.status_code == 404
+                assert exc_info.value.detail == detail
+            async with query_budget(1) as statements:
+                await validate_dish(session, menu_id, submenu_id, dish_id)
+        assert len(statements) == 1
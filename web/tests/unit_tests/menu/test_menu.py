@@ -1,10 +1,20 @@
 import os
 from typing import Callable
 
+from _pytest.monkeypatch import MonkeyPatch
+from fastapi import BackgroundTasks
 from httpx import AsyncClient
-from project.database import async_session
-from project.models import Menu
-from sqlalchemy import select
+from project.cache_local import local_cache
+from project.config import settings
+from project.counters import recount_counters
+from project.database import async_session, get_async_redis_client
+from project.menus.repository import MenuRepository
+from project.menus.schemas import MenuInSchema
+from project.menus.services import MenuService
+from project.models import Dish, Menu, Submenu
+from project.pagination import NEXT_CURSOR_HEADER, get_page_key
+from project.service_redis import GENERATION_PREFIX, LOCK_PREFIX, get_versioned_key
+from sqlalchemy import select, update
 
 
 class TestMenus:
@@ -160,3 +170,229 @@ class TestMenus:
         assert response.json()['menus'] != []
         assert response.json()['menus'][0]['submenus'] != []
         assert response.json()['menus'][0]['submenus'][0]['dishes'] != []
+
+    async def test_recount_counters_repairs_menu_counts(
+        self, create_dish: Callable, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        async with async_session() as session:
+            await session.execute(
+                update(Menu).values(submenus_count=10, dishes_count=10)
+            )
+            await session.execute(update(Submenu).values(dishes_count=10))
+            await recount_counters(session)
+            await session.commit()
+
+        response = await ac.get(
+            reverse('get_menu', target_menu_id=os.getenv('target_menu_id'))
+        )
+        assert response.status_code == 200
+        assert response.json()['submenus_count'] == 1
+        assert response.json()['dishes_count'] == 1
+
+    async def test_read_menus_whole_sql_matches_orm(
+        self, create_dish: Callable
+    ) -> None:
+        async with async_session() as session:
+            menu_repository = MenuRepository(db=session)
+            menus_orm = await menu_repository.read_menus_whole()
+            menus_sql = await menu_repository.read_menus_whole_sql()
+        assert menus_sql == menus_orm
+
+    async def test_get_menus_whole_handler_sql_mode(
+        self,
+        create_dish: Callable,
+        ac: AsyncClient,
+        reverse: Callable,
+        monkeypatch: MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(settings, 'menus_whole_mode', 'sql')
+        response = await ac.get(reverse('get_menus_whole'))
+        assert response.status_code == 200
+        dishes = response.json()['menus'][0]['submenus'][0]['dishes']
+        assert dishes[0]['id'] == os.getenv('target_dish_id')
+        assert dishes[0]['price'] == os.getenv('target_dish_price')
+
+    async def test_get_menus_whole_stream_handler_matches_whole(
+        self,
+        create_dish: Callable,
+        ac: AsyncClient,
+        reverse: Callable,
+    ) -> None:
+        response_whole = await ac.get(reverse('get_menus_whole'))
+        response = await ac.get(reverse('get_menus_whole_stream'))
+        assert response.status_code == 200
+        assert response.json() == response_whole.json()
+
+    async def test_get_menus_whole_stream_handler_empty(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        response = await ac.get(reverse('get_menus_whole_stream'))
+        assert response.status_code == 200
+        assert response.json() == {'menus': []}
+
+    async def test_get_menus_handler_with_local_cache_sees_new_menu(
+        self, ac: AsyncClient, reverse: Callable, monkeypatch: MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(settings, 'cache_l1_enabled', True)
+        local_cache.clear()
+        response = await ac.get(reverse('get_menus'))
+        assert response.json() == []
+        assert get_page_key('all_menus', settings.page_size, None) in local_cache.data
+
+        await ac.post(
+            reverse('post_menus'),
+            json={'title': 'My menu 2', 'description': 'My menu description 2'},
+        )
+        response = await ac.get(reverse('get_menus'))
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+
+    async def test_get_menus_handler_not_modified(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        response = await ac.get(reverse('get_menus'))
+        etag = response.headers['etag']
+        assert response.headers['cache-control'] == settings.http_cache_control
+
+        response = await ac.get(reverse('get_menus'), headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.content == b''
+        assert response.headers['etag'] == etag
+
+        await ac.post(
+            reverse('post_menus'),
+            json={'title': 'My menu 2', 'description': 'My menu description 2'},
+        )
+        response = await ac.get(reverse('get_menus'), headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['etag'] != etag
+        assert len(response.json()) == 1
+
+    async def test_etag_changes_after_cache_invalidation(
+        self, create_menu: Callable, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        menu_id = os.getenv('target_menu_id')
+        assert menu_id is not None
+        url = reverse('get_menu', target_menu_id=menu_id)
+        await ac.get(url)
+        background_tasks = BackgroundTasks()
+        async with async_session() as session:
+            menu_service = MenuService(
+                MenuRepository(db=session),
+                await get_async_redis_client(),
+                background_tasks,
+            )
+            await menu_service.update_menu(
+                menu_id,
+                MenuInSchema(title='changed', description='changed'),
+            )
+        # фоновые задачи записи еще не выполнены
+        response = await ac.get(url)
+        assert response.json()['title'] == 'changed'
+        etag = response.headers['etag']
+        response = await ac.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        await background_tasks()
+
+    async def test_stale_menu_is_served_without_etag(
+        self, create_menu: Callable, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        menu_id = os.getenv('target_menu_id')
+        assert menu_id is not None
+        url = reverse('get_menu', target_menu_id=menu_id)
+        await ac.get(url)
+        await ac.patch(
+            reverse('patch_menu', target_menu_id=menu_id),
+            json={'title': 'changed', 'description': 'changed'},
+        )
+        # меню после изменения уже загружает другой процесс
+        redis_client = await get_async_redis_client()
+        generation = await redis_client.get(GENERATION_PREFIX + menu_id)
+        lock_key = LOCK_PREFIX + get_versioned_key(menu_id, [generation])
+        await redis_client.set(lock_key, 'other')
+        try:
+            response = await ac.get(url)
+        finally:
+            await redis_client.delete(lock_key)
+        assert response.status_code == 200
+        assert response.json()['title'] != 'changed'
+        assert 'etag' not in response.headers
+
+    async def test_get_menus_handler_pages(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        for i in range(5):
+            await ac.post(
+                reverse('post_menus'),
+                json={'title': f'menu {i}', 'description': 'paged'},
+            )
+        menu_ids: list[str] = []
+        cursor: str | None = None
+        while True:
+            params: dict[str, int | str] = {'limit': 2}
+            if cursor is not None:
+                params['cursor'] = cursor
+            response = await ac.get(reverse('get_menus'), params=params)
+            assert response.status_code == 200
+            assert len(response.json()) <= 2
+            menu_ids += [menu['id'] for menu in response.json()]
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if cursor is None:
+                break
+        assert len(menu_ids) == 5
+        assert menu_ids == sorted(menu_ids)
+
+    async def test_get_menus_handler_invalid_page(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        response = await ac.get(reverse('get_menus'), params={'cursor': '%%%'})
+        assert response.status_code == 400
+        assert response.json()['detail'] == 'invalid cursor'
+        response = await ac.get(reverse('get_menus'), params={'limit': 0})
+        assert response.status_code == 422
+
+    async def test_get_menus_whole_handler_query_budget(
+        self,
+        create_menu: Callable,
+        ac: AsyncClient,
+        reverse: Callable,
+        query_budget: Callable,
+    ) -> None:
+        async with async_session() as session:
+            for i in range(3):
+                submenu = Submenu(
+                    title=f'Submenu {i}',
+                    description='Submenu description',
+                    menu_id=os.getenv('target_menu_id'),
+                )
+                session.add(submenu)
+                await session.flush()
+                session.add_all(
+                    [
+                        Dish(
+                            title=f'Dish {i}.{j}',
+                            description='Dish description',
+                            price='10.00',
+                            submenu_id=submenu.id,
+                        )
+                        for j in range(3)
+                    ]
+                )
+            await session.commit()
+
+        # меню, подменю и блюда - по запросу на уровень дерева, не на подменю
+        async with query_budget(3):
+            response = await ac.get(reverse('get_menus_whole'))
+        submenus = response.json()['menus'][0]['submenus']
+        assert len(submenus) == 3
+        assert all(len(submenu['dishes']) == 3 for submenu in submenus)
+
+    async def test_post_menu_handler_query_budget(
+        self, ac: AsyncClient, reverse: Callable, query_budget: Callable
+    ) -> None:
+        async with query_budget(2):
+            response = await ac.post(
+                reverse('post_menus'),
+                json={'title': 'My menu 5', 'description': 'My menu description 5'},
+            )
+        assert response.status_code == 201
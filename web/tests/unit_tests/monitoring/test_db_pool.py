@@ -0,0 +1,66 @@
+from typing import Callable
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from httpx import AsyncClient
+from project.config import settings
+from project.database import async_session, get_engine_options
+from project.metrics import TimedQueuePool, db_pool_stats, render_metrics
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+
+class TestDbPool:
+    def test_get_engine_options_from_settings(self, monkeypatch: MonkeyPatch) -> None:
+        monkeypatch.setattr(settings, 'db_pool_size', 7)
+        monkeypatch.setattr(settings, 'db_command_timeout', 0)
+        monkeypatch.setattr(settings, 'db_statement_cache_size', 50)
+        options = get_engine_options()
+        assert options['poolclass'] is TimedQueuePool
+        assert options['pool_size'] == 7
+        assert options['connect_args']['command_timeout'] is None
+        assert options['connect_args']['statement_cache_size'] == 50
+        assert options['connect_args']['prepared_statement_cache_size'] == 50
+
+    def test_pgbouncer_disables_statement_caches(
+        self, monkeypatch: MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(settings, 'db_pgbouncer', True)
+        connect_args = get_engine_options()['connect_args']
+        assert connect_args['statement_cache_size'] == 0
+        assert connect_args['prepared_statement_cache_size'] == 0
+
+    async def test_counts_checkouts_and_timeouts(self) -> None:
+        db_pool_stats.clear()
+        engine = create_async_engine(
+            settings.url,
+            poolclass=TimedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.1,
+        )
+        try:
+            async with engine.connect() as connection:
+                await connection.execute(text('SELECT 1'))
+                with pytest.raises(exc.TimeoutError):
+                    async with engine.connect():
+                        pass
+                lines = render_metrics(pool=engine.pool).splitlines()
+        finally:
+            await engine.dispose()
+        assert db_pool_stats.checkouts == 1
+        assert db_pool_stats.timeouts == 1
+        assert 'menu_app_db_pool_checked_out 1' in lines
+        assert 'menu_app_db_pool_timeouts_total 1' in lines
+        assert 'menu_app_db_pool_checkout_seconds_count 1' in lines
+
+    async def test_get_db_pool_stats_handler_success(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        async with async_session() as session:
+            await session.execute(text('SELECT 1'))
+        response = await ac.get(reverse('get_db_pool_stats'))
+        assert response.status_code == 200
+        assert response.json()['pool_size'] == settings.db_pool_size
+        assert response.json()['checkouts'] > 0
+        assert response.json()['checked_out_connections'] >= 0
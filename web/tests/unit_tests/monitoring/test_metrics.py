@@ -0,0 +1,131 @@
+from typing import Callable
+
+import pytest
+from _pytest.logging import LogCaptureFixture
+from _pytest.monkeypatch import MonkeyPatch
+from httpx import AsyncClient
+from project.config import settings
+from project.database import async_session
+from project.metrics import (
+    MetricsMiddleware,
+    RequestMetrics,
+    RequestTimings,
+    current_timings,
+    render_metrics,
+    request_metrics,
+)
+from sqlalchemy import text
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+
+async def get_item(request: Request) -> PlainTextResponse:
+    return PlainTextResponse('ok')
+
+
+async def fail(request: Request) -> PlainTextResponse:
+    raise RuntimeError('boom')
+
+
+def build_app(metrics: RequestMetrics) -> MetricsMiddleware:
+    app = Starlette(routes=[Route('/items/{item_id}', get_item), Route('/fail', fail)])
+    return MetricsMiddleware(app, metrics=metrics)
+
+
+class TestMetricsMiddleware:
+    async def test_labels_requests_with_route_template(self) -> None:
+        metrics = RequestMetrics()
+        async with AsyncClient(app=build_app(metrics), base_url='http://test') as ac:
+            for item_id in ('1', '2'):
+                assert (await ac.get(f'/items/{item_id}')).status_code == 200
+            assert (await ac.get('/missing')).status_code == 404
+        assert metrics.responses == {
+            ('GET', '/items/{item_id}', 200): 2,
+            ('GET', 'unmatched', 404): 1,
+        }
+        assert sum(metrics.routes['GET', '/items/{item_id}'].durations.counts) == 2
+        assert metrics.in_flight == 0
+
+    async def test_unhandled_exception_is_counted_as_500(self) -> None:
+        metrics = RequestMetrics()
+        async with AsyncClient(app=build_app(metrics), base_url='http://test') as ac:
+            with pytest.raises(RuntimeError):
+                await ac.get('/fail')
+        assert metrics.responses == {('GET', '/fail', 500): 1}
+        assert metrics.in_flight == 0
+
+    async def test_db_time_is_added_to_current_request(self) -> None:
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            async with async_session() as session:
+                await session.execute(text('SELECT pg_sleep(0.01)'))
+        finally:
+            current_timings.reset(token)
+        assert timings.db >= 0.01
+
+    async def test_get_metrics_handler_success(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        request_metrics.clear()
+        await ac.get(reverse('get_admin_sync_stats'))
+        response = await ac.get(reverse('get_metrics'))
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/plain')
+        route = reverse('get_admin_sync_stats')
+        labels = f'method="GET",route="{route}",status="200"'
+        assert f'menu_app_http_responses_total{{{labels}}} 1' in response.text
+        assert request_metrics.routes['GET', route].redis_durations.sum > 0
+        assert 'menu_app_http_requests_in_flight 1' in response.text
+
+    def test_render_histogram_buckets_are_cumulative(self) -> None:
+        metrics = RequestMetrics()
+        for seconds in (0.001, 0.02, 20):
+            metrics.observe('GET', '/menus', 200, seconds, RequestTimings())
+        lines = render_metrics(metrics).splitlines()
+        name = 'menu_app_http_request_duration_seconds'
+        labels = 'method="GET",route="/menus"'
+        assert f'{name}_bucket{{{labels},le="0.005"}} 1' in lines
+        assert f'{name}_bucket{{{labels},le="0.025"}} 2' in lines
+        assert f'{name}_bucket{{{labels},le="10.0"}} 2' in lines
+        assert f'{name}_bucket{{{labels},le="+Inf"}} 3' in lines
+        assert f'{name}_count{{{labels}}} 3' in lines
+
+    async def test_debug_query_headers(
+        self, ac: AsyncClient, reverse: Callable, monkeypatch: MonkeyPatch
+    ) -> None:
+        response = await ac.get(reverse('get_admin_sync_stats'))
+        assert 'x-db-queries' not in response.headers
+        monkeypatch.setattr(settings, 'debug_query_headers', True)
+        response = await ac.get(reverse('get_admin_sync_stats'))
+        assert response.headers['x-db-queries'] == '0'
+        assert response.headers['server-timing'].startswith('db;dur=0.00, redis;dur=')
+
+    def test_repeated_query_is_counted_as_n_plus_one(
+        self, caplog: LogCaptureFixture, monkeypatch: MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(settings, 'n_plus_one_threshold', 5)
+        metrics = RequestMetrics()
+        metrics.observe(
+            'GET',
+            '/menus',
+            200,
+            0.01,
+            RequestTimings(db_queries=6, statements={'SELECT 1': 1, 'SELECT dish': 5}),
+        )
+        metrics.observe(
+            'GET',
+            '/menus',
+            200,
+            0.01,
+            RequestTimings(db_queries=4, statements={'SELECT dish': 4}),
+        )
+        assert metrics.n_plus_one == {('GET', '/menus'): 1}
+        assert 'query ran 5 times: SELECT dish' in caplog.text
+        assert metrics.routes['GET', '/menus'].db_queries.sum == 10
+        lines = render_metrics(metrics).splitlines()
+        labels = 'method="GET",route="/menus"'
+        assert f'menu_app_http_n_plus_one_total{{{labels}}} 1' in lines
+        assert f'menu_app_http_request_db_queries_bucket{{{labels},le="5"}} 1' in lines
@@ -0,0 +1,23 @@
+from typing import Callable
+
+from httpx import AsyncClient
+
+
+class TestMonitoring:
+    async def test_get_redis_pool_stats_handler_success(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        response = await ac.get(reverse('get_redis_pool_stats'))
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats['max_connections'] > 0
+        in_use, available = stats['in_use_connections'], stats['available_connections']
+        assert in_use + available == stats['created_connections']
+
+    async def test_get_cache_tiers_stats_handler_success(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        response = await ac.get(reverse('get_cache_tiers_stats'))
+        assert response.status_code == 200
+        assert 0 <= response.json()['redis']['hit_ratio'] <= 1
+        assert response.json()['local']['hits'] >= 0
@@ -0,0 +1,87 @@
+import os
+from typing import Callable
+
+from httpx import AsyncClient
+from project.database import async_session
+from project.models import Dish
+from sqlalchemy import update
+
+DISHES = [
+    {'title': 'Борщ', 'description': 'Суп со свеклой и сметаной', 'price': '250'},
+    {'title': 'Суп гороховый', 'description': 'С копченостями', 'price': '200'},
+    {'title': 'Салат 100%_свежий', 'description': 'Овощи', 'price': '150'},
+]
+
+
+class TestSearch:
+    async def create_dishes(self, ac: AsyncClient, reverse: Callable) -> list[str]:
+        response = await ac.post(
+            reverse(
+                'post_dishes_bulk',
+                target_menu_id=os.getenv('target_menu_id'),
+                target_submenu_id=os.getenv('target_submenu_id'),
+            ),
+            json=DISHES,
+        )
+        return [item['id'] for item in response.json()]
+
+    async def search(
+        self, ac: AsyncClient, reverse: Callable, **params: str
+    ) -> list[str]:
+        response = await ac.get(reverse('search_dishes'), params=params)
+        assert response.status_code == 200
+        return [dish['title'] for dish in response.json()]
+
+    async def test_search_dishes_handler(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        await self.create_dishes(ac, reverse)
+        response = await ac.get(reverse('search_dishes'), params={'q': 'борщ'})
+        assert response.json()[0]['menu_id'] == os.getenv('target_menu_id')
+        assert response.json()[0]['submenu_id'] == os.getenv('target_submenu_id')
+        assert response.json()[0]['price'] == '250.00'
+        # начало слова описания, слово в другой форме, подстрока названия
+        assert await self.search(ac, reverse, q='смет') == ['Борщ']
+        assert await self.search(ac, reverse, q='свекла') == ['Борщ']
+        assert await self.search(ac, reverse, q='орохов') == ['Суп гороховый']
+        # блюдо с названием на строку поиска идет первым
+        assert await self.search(ac, reverse, q='суп') == ['Суп гороховый', 'Борщ']
+        # символы шаблона LIKE ищутся как есть
+        assert await self.search(ac, reverse, q='%_') == ['Салат 100%_свежий']
+        assert await self.search(ac, reverse, q='_') == ['Салат 100%_свежий']
+
+    async def test_search_dishes_handler_filters(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        await self.create_dishes(ac, reverse)
+        submenu_id = os.getenv('target_submenu_id')
+        assert submenu_id is not None
+        assert await self.search(ac, reverse, q='суп', price_max='220') == [
+            'Суп гороховый'
+        ]
+        assert await self.search(ac, reverse, q='суп', price_min='220') == ['Борщ']
+        assert await self.search(ac, reverse, q='суп', menu_id='other') == []
+        assert await self.search(
+            ac,
+            reverse,
+            q='суп',
+            submenu_id=submenu_id,
+            limit='1',
+        ) == ['Суп гороховый']
+
+    async def test_search_dishes_handler_cached(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        await self.create_dishes(ac, reverse)
+        assert await self.search(ac, reverse, q='борщ') == ['Борщ']
+        async with async_session() as session:
+            await session.execute(update(Dish).values(title='Щи'))
+            await session.commit()
+        assert await self.search(ac, reverse, q='борщ') == ['Борщ']
+        assert await self.search(ac, reverse, q='щи') == ['Щи', 'Щи', 'Щи']
+
+    async def test_search_dishes_handler_empty_query(
+        self, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        response = await ac.get(reverse('search_dishes'), params={'q': ''})
+        assert response.status_code == 422
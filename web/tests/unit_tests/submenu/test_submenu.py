@@ -148,3 +148,64 @@ class TestSubmenus:
         )
         assert response.status_code == 404
         assert response.json()['detail'] == 'submenu not found'
+
+    async def test_bulk_submenus_handlers(
+        self, create_dish: Callable, ac: AsyncClient, reverse: Callable
+    ) -> None:
+        target_menu_id = os.getenv('target_menu_id')
+        target_submenu_id = os.getenv('target_submenu_id')
+        response = await ac.post(
+            reverse('post_submenus_bulk', target_menu_id=target_menu_id),
+            json=[{'title': f'submenu {i}', 'description': 'bulk'} for i in range(2)],
+        )
+        assert response.status_code == 201
+        created = response.json()
+        assert [item['submenu']['title'] for item in created] == [
+            'submenu 0',
+            'submenu 1',
+        ]
+        response = await ac.get(reverse('get_menu', target_menu_id=target_menu_id))
+        assert response.json()['submenus_count'] == 3
+
+        response = await ac.patch(
+            reverse('patch_submenus_bulk', target_menu_id=target_menu_id),
+            json=[
+                {'id': 'missing', 'title': 'x', 'description': 'x'},
+                {'id': target_submenu_id, 'title': 'updated', 'description': 'bulk'},
+            ],
+        )
+        assert response.status_code == 200
+        assert response.json()[0]['message'] == 'submenu not found'
+        assert response.json()[1]['submenu']['title'] == 'updated'
+        assert response.json()[1]['submenu']['dishes_count'] == 1
+
+        response = await ac.post(
+            reverse('delete_submenus_bulk', target_menu_id=target_menu_id),
+            json={'ids': [target_submenu_id, created[0]['id']]},
+        )
+        assert response.status_code == 200
+        assert [item['status'] for item in response.json()] == [True, True]
+        response = await ac.get(reverse('get_menu', target_menu_id=target_menu_id))
+        assert response.json()['submenus_count'] == 1
+        assert response.json()['dishes_count'] == 0
+        response = await ac.get(
+            reverse(
+                'get_submenu',
+                target_menu_id=target_menu_id,
+                target_submenu_id=target_submenu_id,
+            )
+        )
+        assert response.status_code == 404
+
+    async def test_post_submenu_handler_query_budget(
+        self, ac: AsyncClient, reverse: Callable, query_budget: Callable
+    ) -> None:
+        async with query_budget(4):
+            response = await ac.post(
+                reverse('post_submenus', target_menu_id=os.getenv('target_menu_id')),
+                json={
+                    'title': 'My submenu 5',
+                    'description': 'My submenu description 5',
+                },
+            )
+        assert response.status_code == 201